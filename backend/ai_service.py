@@ -4,30 +4,96 @@ Google Generative AI (Gemini) integration for generating personalized diet and e
 
 import os
 import json
-import google.generativeai as genai
+import random
+import asyncio
+import hashlib
+from functools import lru_cache
 from dotenv import load_dotenv
 
+try:
+    import google.generativeai as genai
+except ImportError:  # only needed to call Gemini; stub models and the fallbacks work without it
+    genai = None
+
+from cache import DiskCache
+from python_planner import plan_memo
+
 load_dotenv()
 
 # Configure Gemini API
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+if genai is not None:
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+# Use the latest available Gemini model
+# Based on models available as of October 2025
+MODEL_NAMES = [
+    'models/gemini-2.5-pro-preview-03-25',  # Latest recommended
+    'models/gemini-2.5-flash-lite-preview-09-2025',  # Fast alternative
+    'models/gemini-1.5-flash-latest',
+    'models/gemini-1.5-pro-latest',
+    'gemini-1.5-flash',
+    'gemini-pro'
+]
 
-def generate_diet_plan(user_data: dict, daily_calories: int, macros: dict) -> dict:
-    """
-    Generate a personalized diet and exercise plan using Google Gemini AI
-    
-    Args:
-        user_data: User profile information
-        daily_calories: Calculated daily calorie target
-        macros: Macronutrient breakdown
-    
-    Returns:
-        Dictionary with meal_plan, exercises, and grocery_list
-    """
-    
-    # Create structured prompt
-    prompt = f"""
+# Bump when the prompt changes so cached responses to the old prompt are not reused
+PROMPT_VERSION = 1
+
+# Model responses by plan_cache_key (path, size and TTL in .env.example)
+plan_cache = DiskCache()
+
+# Gemini call limits (see .env.example)
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))  # calls in flight per process (async client)
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "20"))  # seconds per plan, retries included
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))  # retries after a 429 / quota error
+GEMINI_BACKOFF = float(os.getenv("GEMINI_BACKOFF", "1.0"))  # first retry delay in seconds, doubled each retry
+
+
+@lru_cache(maxsize=1)
+def get_model():
+    """The first usable model from MODEL_NAMES, resolved once per process"""
+    if genai is None:
+        raise Exception("google-generativeai is not installed")
+    last_error = None
+    for model_name in MODEL_NAMES:
+        try:
+            model = genai.GenerativeModel(model_name)
+            print(f"✓ Using model: {model_name}")
+            return model
+        except Exception as e:
+            last_error = str(e)
+            continue
+    raise Exception(f"No compatible model found. Last error: {last_error}")
+
+
+def normalize_text(value) -> str:
+    """Lowercase, collapse whitespace and sort comma separated items, so equivalent inputs match"""
+    if value is None:
+        return "none"
+    items = sorted(" ".join(item.split()).lower() for item in str(value).split(",") if item.strip())
+    return ", ".join(items) or "none"
+
+
+def plan_cache_key(model_name: str, user_data: dict, daily_calories: int, macros: dict) -> str:
+    """Hash of everything the prompt is built from"""
+    inputs = {
+        "prompt_version": PROMPT_VERSION,
+        "model": model_name,
+        "age": int(user_data['age']),
+        "height": round(float(user_data['height']), 1),
+        "weight": round(float(user_data['weight']), 1),
+        "daily_calories": int(daily_calories),
+        "macros": {key: normalize_text(macros[key]) for key in ("protein", "carbs", "fats")},
+        **{
+            field: normalize_text(user_data.get(field))
+            for field in ("gender", "activity_level", "health_goal", "food_preferences", "allergies", "medical_conditions")
+        },
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def build_prompt(user_data: dict, daily_calories: int, macros: dict) -> str:
+    """Structured Gemini prompt for a user's profile and targets"""
+    return f"""
 You are a professional nutritionist and fitness coach. Generate a detailed 1-day personalized diet and exercise plan.
 
 **User Profile:**
@@ -87,52 +153,61 @@ Important:
 - Return ONLY valid JSON, no additional text
 """
 
+
+def parse_plan_text(text: str) -> dict:
+    """Plan dict from a model reply, tolerating a markdown code fence around the JSON"""
+    response_text = text.strip()
+    
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.startswith("```"):
+        response_text = response_text[3:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    
+    return json.loads(response_text.strip())
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True for rate limit / quota errors (HTTP 429)"""
+    error_msg = str(error).lower()
+    return "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg
+
+
+def generate_diet_plan(user_data: dict, daily_calories: int, macros: dict) -> dict:
+    """
+    Generate a personalized diet and exercise plan using Google Gemini AI
+    
+    Args:
+        user_data: User profile information
+        daily_calories: Calculated daily calorie target
+        macros: Macronutrient breakdown
+    
+    Returns:
+        Dictionary with meal_plan, exercises, and grocery_list
+    """
+    
+    prompt = build_prompt(user_data, daily_calories, macros)
+
     try:
-        # Use the latest available Gemini model
-        # Based on models available as of October 2025
-        model_names = [
-            'models/gemini-2.5-pro-preview-03-25',  # Latest recommended
-            'models/gemini-2.5-flash-lite-preview-09-2025',  # Fast alternative
-            'models/gemini-1.5-flash-latest',
-            'models/gemini-1.5-pro-latest',
-            'gemini-1.5-flash',
-            'gemini-pro'
-        ]
-        
-        model = None
-        last_error = None
-        
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                print(f"✓ Using model: {model_name}")
-                break
-            except Exception as e:
-                last_error = str(e)
-                continue
-        
-        if model is None:
-            raise Exception(f"No compatible model found. Last error: {last_error}")
+        model = get_model()
         
-        # Generate content
-        response = model.generate_content(prompt)
+        # Repeat profiles are answered from disk without calling the API
+        cache_key = plan_cache_key(model.model_name, user_data, daily_calories, macros)
+        cached_plan = plan_cache.get(cache_key)
+        if cached_plan is not None:
+            return cached_plan
         
-        # Parse the response
-        response_text = response.text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
+        # Generate content (bounded, so a stalled upstream can't hold this thread forever)
+        response = model.generate_content(prompt, request_options={"timeout": GEMINI_TIMEOUT})
+        response_text = response.text
         
         # Parse JSON
-        plan_data = json.loads(response_text)
+        plan_data = parse_plan_text(response_text)
         
+        # Only real model output is cached; the fallbacks below are not
+        plan_cache.set(cache_key, plan_data)
         return plan_data
     
     except json.JSONDecodeError as e:
@@ -160,28 +235,119 @@ Important:
         }
     
     except Exception as e:
-        error_msg = str(e)
         print(f"Error generating plan: {e}")
         
         # Check if it's a quota error
-        if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
+        if is_quota_error(e):
             print("⚠️  Quota exceeded - using fallback demo plan")
-            # Return a contextual fallback based on user goals
-            goal = user_data.get('health_goal', 'maintenance').lower()
-            preferences = user_data.get('food_preferences', '').lower()
-            
-            # Customize fallback based on goals
-            if 'weight_loss' in goal:
-                return get_weight_loss_fallback(daily_calories, macros, preferences)
-            elif 'muscle_gain' in goal:
-                return get_muscle_gain_fallback(daily_calories, macros, preferences)
-            else:
-                return get_maintenance_fallback(daily_calories, macros, preferences)
+            return get_goal_fallback(user_data, daily_calories, macros)
         
         # For other errors, re-raise
         raise
 
 
+_semaphore = None
+
+
+def gemini_semaphore() -> asyncio.Semaphore:
+    """Process-wide limit on concurrent async Gemini calls"""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+    return _semaphore
+
+
+async def _generate_with_retries(model, prompt: str) -> dict:
+    """One plan from the model, retrying quota errors with exponential backoff"""
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        try:
+            async with gemini_semaphore():
+                response = await model.generate_content_async(prompt)
+            return parse_plan_text(response.text)
+        except Exception as e:
+            if attempt == GEMINI_MAX_RETRIES or not is_quota_error(e):
+                raise
+            # Jittered, and outside the semaphore so a backing-off call doesn't hold a slot
+            await asyncio.sleep(GEMINI_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.0))
+
+
+def _report_planner_failure(task: asyncio.Task):
+    """Print the error of a local plan task that failed rather than dropping it"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️  Local planner failed ({task.exception()})")
+
+
+def _discard(task: asyncio.Task):
+    """Cancel a local plan task that is no longer needed, still reporting it if it already failed"""
+    task.cancel()
+    task.add_done_callback(_report_planner_failure)
+
+
+async def generate_diet_plan_async(user_data: dict, daily_calories: int, macros: dict, model=None,
+                                   timeout: float = GEMINI_TIMEOUT, fallback: bool = True) -> dict:
+    """
+    Async generate_diet_plan with a deadline, a concurrency limit and 429 retries
+    
+    Args:
+        model: object with model_name and generate_content_async (default: the
+            Gemini model); lets a local stub stand in for the real service
+        timeout: seconds before the call is abandoned, retries included
+        fallback: race the local Python planner against the model and return
+            its plan if the model misses the deadline, stays rate limited or
+            replies with unparseable JSON (other errors are raised)
+    
+    Returns:
+        Dictionary with meal_plan, exercises, and grocery_list
+    """
+    model = model or get_model()
+    
+    cache_key = plan_cache_key(model.model_name, user_data, daily_calories, macros)
+    cached_plan = plan_cache.get(cache_key)
+    if cached_plan is not None:
+        return cached_plan
+    
+    # Started right away so a fallback is ready the moment the deadline passes
+    local_plan = asyncio.create_task(
+        asyncio.to_thread(plan_memo.get_plan, user_data, daily_calories, macros)
+    ) if fallback else None
+    
+    try:
+        plan_data = await asyncio.wait_for(
+            _generate_with_retries(model, build_prompt(user_data, daily_calories, macros)), timeout
+        )
+    except Exception as e:
+        recoverable = isinstance(e, (asyncio.TimeoutError, json.JSONDecodeError)) or is_quota_error(e)
+        if local_plan is None or not recoverable:
+            if local_plan is not None:
+                _discard(local_plan)
+            raise
+        print(f"⚠️  Gemini unavailable ({type(e).__name__}) - using local planner")
+        try:
+            plan_data = await local_plan
+        except Exception as planner_error:
+            print(f"⚠️  Local planner failed ({planner_error}) - using fallback demo plan")
+            plan_data = None
+        return plan_data or get_goal_fallback(user_data, daily_calories, macros)
+    
+    if local_plan is not None:
+        _discard(local_plan)
+    plan_cache.set(cache_key, plan_data)
+    return plan_data
+
+
+def get_goal_fallback(user_data: dict, daily_calories: int, macros: dict) -> dict:
+    """Static fallback plan matching the user's health goal"""
+    goal = (user_data.get('health_goal') or 'maintenance').lower()
+    preferences = (user_data.get('food_preferences') or '').lower()
+    
+    if 'weight_loss' in goal:
+        return get_weight_loss_fallback(daily_calories, macros, preferences)
+    elif 'muscle_gain' in goal:
+        return get_muscle_gain_fallback(daily_calories, macros, preferences)
+    else:
+        return get_maintenance_fallback(daily_calories, macros, preferences)
+
+
 def get_weight_loss_fallback(calories: int, macros: dict, preferences: str) -> dict:
     """Fallback plan for weight loss goals"""
     is_veg = 'veg' in preferences
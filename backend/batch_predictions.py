@@ -0,0 +1,215 @@
+"""
+Offline batch prediction job
+
+Computes the /predictions/comprehensive payload for every user and stores
+it in the predictions_cache table, which the prediction endpoints read
+before falling back to computing live. Log writes and profile updates
+invalidate the affected user's cache row, so stale results are never
+served: the payload is cleared and the row's version bumped. Each chunk
+reads the versions before any data and only overwrites rows still at the
+version it read, so a write that lands while the chunk is being computed
+wins over the (now stale) result.
+
+Users are streamed in id-ordered chunks. For each chunk the main process
+reads all weight rows and the recent calorie/exercise/hydration rows with
+one range query per table, a process pool computes the predictions with
+grouped NumPy operations, and the results are upserted chunk by chunk.
+
+Usage:
+    python batch_predictions.py [--chunk-size 2000] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, case, func, select
+from sqlalchemy.engine import Connection
+
+from calculations import calculate_bmr
+from database import engine, init_db, User, WeightLog, CalorieLog, ExerciseLog, HydrationLog, PredictionCache
+from log_store import dialect_upsert
+from prediction_engine import PredictionEngine, get_prediction_report
+
+# Same windows as the live /predictions/comprehensive endpoint
+RECENT_LIMITS = {"calorie": 30, "exercise": 30, "hydration": 7}
+
+
+def recent_rows(conn: Connection, model, columns: list, limit: int, lo: int, hi: int) -> Dict[int, List[dict]]:
+    """Each user's latest `limit` rows (newest first) for users lo..hi, in one windowed query"""
+    rank = func.row_number().over(
+        partition_by=model.user_id,
+        order_by=(model.date.desc(), model.id.desc())
+    ).label("rank")
+    ranked = select(model.user_id, model.date, *columns, rank).where(
+        model.user_id.between(lo, hi)
+    ).subquery()
+
+    rows = defaultdict(list)
+    for row in conn.execute(
+        select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.user_id, ranked.c.rank)
+    ).mappings():
+        entry = dict(row)
+        user_id = entry.pop("user_id")
+        entry.pop("rank")
+        rows[user_id].append(entry)
+    return rows
+
+
+def cache_versions(conn: Connection, users: list) -> Dict[int, int]:
+    """predictions_cache version per user of the chunk (users without a row are missing)"""
+    return dict(conn.execute(
+        select(PredictionCache.user_id, PredictionCache.version)
+        .where(PredictionCache.user_id.between(users[0].id, users[-1].id))
+    ).all())
+
+
+def load_chunk(conn: Connection, users: list) -> dict:
+    """Read everything needed to predict for a chunk of id-ordered users"""
+    lo, hi = users[0].id, users[-1].id
+
+    weights = conn.execute(
+        select(WeightLog.user_id, WeightLog.date, WeightLog.weight)
+        .where(WeightLog.user_id.between(lo, hi), WeightLog.weight.is_not(None), WeightLog.date.is_not(None))
+        .order_by(WeightLog.user_id, WeightLog.date, WeightLog.id)
+    ).all()
+
+    return {
+        "users": [dict(user._mapping) for user in users],
+        "weight_user_ids": np.fromiter((row[0] for row in weights), dtype=np.int64, count=len(weights)),
+        "weight_dates": np.array([row[1] for row in weights], dtype="datetime64[D]"),
+        "weights": np.fromiter((row[2] for row in weights), dtype=np.float64, count=len(weights)),
+        "calorie_logs": recent_rows(conn, CalorieLog, [CalorieLog.calories],
+                                    RECENT_LIMITS["calorie"], lo, hi),
+        "exercise_logs": recent_rows(conn, ExerciseLog, [ExerciseLog.duration_minutes, ExerciseLog.exercise_name],
+                                     RECENT_LIMITS["exercise"], lo, hi),
+        "hydration_logs": recent_rows(conn, HydrationLog, [HydrationLog.glasses],
+                                      RECENT_LIMITS["hydration"], lo, hi),
+    }
+
+
+def compute_chunk(chunk: dict) -> List[Tuple[int, str]]:
+    """Predictions for one chunk (runs in a worker process)"""
+    engine = PredictionEngine()
+    user_ids = chunk["weight_user_ids"]
+
+    # The O(rows) parts, vectorized across the whole chunk
+    trends = engine.predict_weight_trends_grouped(user_ids, chunk["weight_dates"], chunk["weights"])
+    plateaus = engine.predict_plateau_risks_grouped(user_ids, chunk["weights"])
+    counted_ids, counts = np.unique(user_ids, return_counts=True)
+    weight_counts = dict(zip(counted_ids.tolist(), counts.tolist()))
+
+    results = []
+    for user in chunk["users"]:
+        user_id = user["id"]
+        user_data = dict(user, bmr=calculate_bmr(user["age"], user["gender"], user["weight"], user["height"]))
+        historical_data = {
+            "weight_logs": [],
+            "weight_log_count": weight_counts.get(user_id, 0),
+            "calorie_logs": chunk["calorie_logs"].get(user_id, []),
+            "exercise_logs": chunk["exercise_logs"].get(user_id, []),
+            "hydration_logs": chunk["hydration_logs"].get(user_id, []),
+        }
+        precomputed = {
+            "weight_prediction": trends.get(user_id) or engine.predict_weight_trend([]),
+            "plateau_risk": plateaus.get(user_id) or engine.predict_plateau_risk([], []),
+        }
+        report = get_prediction_report(user_data, historical_data, precomputed)
+        results.append((user_id, json.dumps(report)))
+
+    return results
+
+
+def save_results(results: List[Tuple[int, str]], versions: Dict[int, int]):
+    """
+    Upsert one chunk of results into predictions_cache
+
+    `versions` are the cache versions read before the chunk's data. A row
+    invalidated since then has a newer version (or, if it was missing, now
+    exists), so it keeps its tombstone instead of the stale result.
+    """
+    unchanged = PredictionCache.version == bindparam("read_version")
+    stmt = dialect_upsert(
+        engine.dialect.name, PredictionCache, [PredictionCache.user_id],
+        lambda excluded: {
+            "payload": case((unchanged, excluded.payload), else_=PredictionCache.payload),
+            "computed_at": case((unchanged, excluded.computed_at), else_=PredictionCache.computed_at),
+        }
+    )
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(stmt, [
+            {"user_id": user_id, "payload": payload, "computed_at": now, "version": 0,
+             "read_version": versions.get(user_id)}
+            for user_id, payload in results
+        ])
+
+
+def iter_user_chunks(conn: Connection, chunk_size: int):
+    """Yield users in id order, chunk_size at a time (keyset pagination)"""
+    last_id = 0
+    while True:
+        users = conn.execute(
+            select(User.id, User.age, User.gender, User.weight, User.height,
+                   User.activity_level, User.health_goal, User.food_preferences)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(chunk_size)
+        ).all()
+        if not users:
+            return
+        yield users
+        last_id = users[-1].id
+
+
+def run_batch(chunk_size: int = 2000, workers: int = None) -> int:
+    """
+    Recompute and store predictions for all users
+
+    Returns:
+        number of users processed
+    """
+    workers = workers or os.cpu_count() or 1
+    processed = 0
+    pending = {}  # future -> cache versions read for its chunk
+
+    def collect(done):
+        nonlocal processed
+        for future in done:
+            results = future.result()
+            save_results(results, pending.pop(future))
+            processed += len(results)
+
+    with engine.connect() as conn, ProcessPoolExecutor(max_workers=workers) as pool:
+        for users in iter_user_chunks(conn, chunk_size):
+            # Bound the chunks in flight so memory stays flat
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            # Versions first: any write committed after this point bumps them
+            versions = cache_versions(conn, users)
+            pending[pool.submit(compute_chunk, load_chunk(conn, users))] = versions
+
+        collect(list(pending))
+
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute predictions for all users")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="users per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    total = run_batch(args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Predicted {total} users in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} users/s)")
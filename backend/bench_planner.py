@@ -0,0 +1,90 @@
+"""
+Benchmark the planner's random and solver modes
+
+Generates plans for a seeded set of synthetic profiles in each mode and
+reports how far the plans land from the calorie and macro targets, and
+how long each plan takes.
+
+Usage:
+    python bench_planner.py [--profiles 500] [--budget-ms 50] [--seed 42]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from calculations import calculate_bmr, calculate_daily_calories, calculate_macros, ACTIVITY_MULTIPLIERS
+from python_planner import generate_python_diet_plan, PLANNER_MODES
+
+GOALS = ["weight_loss", "muscle_gain", "maintenance", "endurance"]
+PREFERENCES = ["balanced", "vegetarian", "high protein"]
+ALLERGIES = ["", "", "", "nuts", "dairy", "gluten", "soy, eggs"]
+NUTRIENTS = ["calories", "protein", "carbs", "fats"]
+
+
+def make_profiles(count: int, seed: int) -> list:
+    """Synthetic users with their daily calorie and macro targets"""
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(count):
+        user_data = {
+            "age": rng.randint(18, 70),
+            "gender": rng.choice(["male", "female"]),
+            "weight": rng.uniform(50, 120),
+            "height": rng.uniform(150, 200),
+            "activity_level": rng.choice(list(ACTIVITY_MULTIPLIERS)),
+            "health_goal": rng.choice(GOALS),
+            "food_preferences": rng.choice(PREFERENCES),
+            "allergies": rng.choice(ALLERGIES),
+        }
+        bmr = calculate_bmr(user_data["age"], user_data["gender"], user_data["weight"], user_data["height"])
+        daily_calories = calculate_daily_calories(bmr, user_data["activity_level"], user_data["health_goal"])
+        profiles.append((user_data, daily_calories, calculate_macros(daily_calories, user_data["health_goal"])))
+    return profiles
+
+
+def run_mode(mode: str, profiles: list, budget_ms: float, seed: int) -> dict:
+    """Absolute % error per nutrient and latency per plan for one mode"""
+    random.seed(seed)
+    errors = {nutrient: [] for nutrient in NUTRIENTS}
+    latencies = []
+    
+    for user_data, daily_calories, macros in profiles:
+        started = time.perf_counter()
+        plan = generate_python_diet_plan(user_data, daily_calories, macros, mode=mode, time_budget_ms=budget_ms)
+        latencies.append((time.perf_counter() - started) * 1000)
+        
+        targets = {"calories": daily_calories, **{k: int(v.replace("g", "")) for k, v in macros.items()}}
+        for nutrient in NUTRIENTS:
+            errors[nutrient].append(abs(plan["nutrition"][nutrient] - targets[nutrient]) / targets[nutrient] * 100)
+    
+    return {"errors": errors, "latencies": np.array(latencies)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare planner modes on accuracy and latency")
+    parser.add_argument("--profiles", type=int, default=500, help="number of synthetic users")
+    parser.add_argument("--budget-ms", type=float, default=50, help="solver time budget per plan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    profiles = make_profiles(args.profiles, args.seed)
+    # Warm-up so one-time index/combination setup isn't counted
+    for mode in PLANNER_MODES:
+        for user_data, daily_calories, macros in profiles[:20]:
+            generate_python_diet_plan(user_data, daily_calories, macros, mode=mode, time_budget_ms=args.budget_ms)
+    
+    print(f"📊 {args.profiles} plans per mode, solver budget {args.budget_ms:g} ms\n")
+    print(f"{'mode':<8} {'nutrient':<9} {'mean err %':>10} {'p95 err %':>10}")
+    results = {mode: run_mode(mode, profiles, args.budget_ms, args.seed) for mode in PLANNER_MODES}
+    for mode, result in results.items():
+        for nutrient in NUTRIENTS:
+            values = np.array(result["errors"][nutrient])
+            print(f"{mode:<8} {nutrient:<9} {values.mean():>10.1f} {np.percentile(values, 95):>10.1f}")
+    
+    print(f"\n{'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for mode, result in results.items():
+        latencies = result["latencies"]
+        print(f"{mode:<8} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} {latencies.max():>8.2f}")
@@ -0,0 +1,171 @@
+"""
+Caches
+
+TTLCache keeps recently served /predictions/comprehensive reports in
+memory, bounded by entry count (least recently used entries are evicted
+first) and by age. Writes that change a user's data invalidate that user's
+entry once their transaction commits (see
+log_store.invalidate_cached_predictions).
+
+Each entry carries a validator pair (ETag and Last-Modified) so the
+endpoint can answer conditional requests with 304 Not Modified.
+
+The cache is per process; with several workers, other processes only see
+an invalidation when their own entry expires, so PREDICTION_CACHE_TTL is
+the upper bound on staleness there.
+
+DiskCache is a small persistent key/value store (one SQLite file) with the
+same TTL and LRU bounds, used for Gemini plan responses (see ai_service.py)
+so they survive restarts and are shared by all worker processes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "./ai_plan_cache.db")
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "10000"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def report_etag(report: Dict) -> str:
+    """
+    Weak ETag for a prediction report
+    generated_at is left out so a recomputation from unchanged data keeps its tag
+    """
+    content = {key: value for key, value in report.items() if key != "generated_at"}
+    digest = hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Bumped on every invalidation so a value computed from pre-write data can't be stored afterwards
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Dict]:
+        """Entry dict (body, etag, last_modified) or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def generation(self, key) -> int:
+        """Token to pass to set() for a value about to be computed"""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def set(self, key, body: Dict, generation: int, last_modified: Optional[datetime] = None) -> Dict:
+        """
+        Store a value and return its entry
+        The value is not stored if the key was invalidated since generation() was taken
+        """
+        entry = {
+            "body": body,
+            "etag": report_etag(body),
+            "last_modified": (last_modified or datetime.now(timezone.utc)).replace(microsecond=0),
+            "expires": time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+prediction_cache = TTLCache()
+
+
+class DiskCache:
+    """Persistent LRU + TTL cache of JSON values in a SQLite file, safe across threads and processes"""
+
+    def __init__(self, path: str = AI_CACHE_PATH, max_entries: int = AI_CACHE_SIZE, ttl: float = AI_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        """Cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value, evicting expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                conn.execute("DELETE FROM entries WHERE created <= ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM entries")
@@ -2,6 +2,12 @@
 Calorie and nutrition calculation utilities
 """
 
+from typing import List, Sequence
+
+import numpy as np
+
+from metrics import timed
+
 # Activity level multipliers
 ACTIVITY_MULTIPLIERS = {
     "sedentary": 1.2,
@@ -20,6 +26,7 @@ HEALTH_GOAL_ADJUSTMENTS = {
 }
 
 
+@timed
 def calculate_bmr(age: int, gender: str, weight: float, height: float) -> float:
     """
     Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation
@@ -41,6 +48,7 @@ def calculate_bmr(age: int, gender: str, weight: float, height: float) -> float:
     return round(bmr, 2)
 
 
+@timed
 def calculate_daily_calories(bmr: float, activity_level: str, health_goal: str) -> int:
     """
     Calculate total daily calorie needs based on BMR, activity level, and health goal
@@ -62,6 +70,15 @@ def calculate_daily_calories(bmr: float, activity_level: str, health_goal: str)
     return int(daily_calories)
 
 
+# Protein and fat share of calories per goal (carbs get the rest)
+MACRO_SPLITS = {
+    "muscle_gain": (0.30, 0.25),
+    "weight_loss": (0.25, 0.30),
+}
+DEFAULT_MACRO_SPLIT = (0.20, 0.25)
+
+
+@timed
 def calculate_macros(daily_calories: int, health_goal: str) -> dict:
     """
     Calculate macronutrient distribution based on calories and health goal
@@ -73,20 +90,7 @@ def calculate_macros(daily_calories: int, health_goal: str) -> dict:
     Returns:
         Dictionary with protein, carbs, and fats in grams
     """
-    # Protein: 25-30% for muscle gain, 20-25% for weight loss, 20% for maintenance
-    # Fats: 25-30%
-    # Carbs: remainder
-    
-    if health_goal.lower() == "muscle_gain":
-        protein_percent = 0.30
-        fat_percent = 0.25
-    elif health_goal.lower() == "weight_loss":
-        protein_percent = 0.25
-        fat_percent = 0.30
-    else:
-        protein_percent = 0.20
-        fat_percent = 0.25
-    
+    protein_percent, fat_percent = MACRO_SPLITS.get(health_goal.lower(), DEFAULT_MACRO_SPLIT)
     carb_percent = 1 - protein_percent - fat_percent
     
     # Calculate grams (protein: 4 cal/g, carbs: 4 cal/g, fats: 9 cal/g)
@@ -99,3 +103,49 @@ def calculate_macros(daily_calories: int, health_goal: str) -> dict:
         "carbs": f"{carbs_grams}g",
         "fats": f"{fat_grams}g"
     }
+
+
+@timed
+def calculate_bmr_batch(ages: Sequence[int], genders: Sequence[str],
+                        weights: Sequence[float], heights: Sequence[float]) -> np.ndarray:
+    """
+    calculate_bmr for many people at once
+    
+    Returns:
+        BMR per person, rounded to 2 decimals like calculate_bmr
+    """
+    is_male = np.array([gender.lower() == "male" for gender in genders])
+    bmr = (
+        10 * np.asarray(weights, dtype=np.float64)
+        + 6.25 * np.asarray(heights, dtype=np.float64)
+        - 5 * np.asarray(ages, dtype=np.float64)
+        + np.where(is_male, 5, -161)
+    )
+    return np.round(bmr, 2)
+
+
+@timed
+def calculate_daily_calories_batch(bmrs: Sequence[float], activity_levels: Sequence[str],
+                                   health_goals: Sequence[str]) -> np.ndarray:
+    """calculate_daily_calories for many people at once (int array)"""
+    multipliers = np.array([ACTIVITY_MULTIPLIERS.get(level.lower(), 1.2) for level in activity_levels])
+    adjustments = np.array([HEALTH_GOAL_ADJUSTMENTS.get(goal.lower(), 0) for goal in health_goals])
+    return np.trunc(np.asarray(bmrs, dtype=np.float64) * multipliers + adjustments).astype(np.int64)
+
+
+@timed
+def calculate_macros_batch(daily_calories: Sequence[int], health_goals: Sequence[str]) -> List[dict]:
+    """calculate_macros for many people at once"""
+    splits = np.array([MACRO_SPLITS.get(goal.lower(), DEFAULT_MACRO_SPLIT) for goal in health_goals])
+    calories = np.asarray(daily_calories, dtype=np.float64)
+    protein_percent, fat_percent = splits[:, 0], splits[:, 1]
+    carb_percent = 1 - protein_percent - fat_percent
+    
+    protein_grams = np.trunc(calories * protein_percent / 4).astype(np.int64).tolist()
+    carbs_grams = np.trunc(calories * carb_percent / 4).astype(np.int64).tolist()
+    fat_grams = np.trunc(calories * fat_percent / 9).astype(np.int64).tolist()
+    
+    return [
+        {"protein": f"{protein}g", "carbs": f"{carbs}g", "fats": f"{fats}g"}
+        for protein, carbs, fats in zip(protein_grams, carbs_grams, fat_grams)
+    ]
@@ -1,12 +1,125 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime, ForeignKey, Date
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Text, DateTime, ForeignKey, Date, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime, date
+import os
+from dotenv import load_dotenv
 
-DATABASE_URL = "sqlite:///./diet_fitness.db"
+from metrics import instrument_engine
+from query_stats import SQL_INSTRUMENTATION, instrument_queries
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+load_dotenv()
+
+# Connection settings (see .env.example)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./diet_fitness.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # seconds, -1 = never
+
+# Opt-in SQLite profile for bursty concurrent logging: WAL journal, tuned
+# pragmas and a single writer connection (see write_queue.py)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_HIGH_CONCURRENCY = DATABASE_URL.startswith("sqlite") and SQLITE_PROFILE == "high_concurrency"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers no longer block behind the writer
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),  # safe with WAL, far fewer fsyncs
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),  # negative = KiB, so 64 MB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+
+# Async drivers for the sync URLs we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_url(url: str) -> str:
+    """Derive the async driver URL from a sync database URL"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", get_async_url(DATABASE_URL))
+
+# Bulk inserts (executemany ... RETURNING in row order) and the upserts need
+# RETURNING, so MySQL/MariaDB and other backends without it are refused up front
+SUPPORTED_BACKENDS = ("sqlite", "postgresql")
+for _url in (DATABASE_URL, ASYNC_DATABASE_URL):
+    if make_url(_url).get_backend_name() not in SUPPORTED_BACKENDS:
+        raise RuntimeError(f"Unsupported database {make_url(_url).get_backend_name()}; use SQLite or PostgreSQL")
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool and driver options for an engine on the given URL"""
+    options = {}
+    if url.startswith("sqlite"):
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+        if url.endswith(":memory:") or url.endswith("://"):
+            # In-memory SQLite uses a single shared connection; no pool to tune
+            return options
+        if is_async:
+            # aiosqlite defaults to NullPool, which would ignore the settings below
+            options["poolclass"] = AsyncAdaptedQueuePool
+    
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the log ingestion endpoints
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Dedicated one-connection engine for the single-writer queue, only built
+# when the high-concurrency profile is on (write_queue.py)
+writer_engine = None
+WriterSessionLocal = None
+if SQLITE_HIGH_CONCURRENCY:
+    writer_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    WriterSessionLocal = async_sessionmaker(writer_engine, autoflush=False, expire_on_commit=False)
+
+ENGINES = [engine, async_engine.sync_engine] + ([writer_engine.sync_engine] if writer_engine else [])
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the high-concurrency pragmas to every new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+if SQLITE_HIGH_CONCURRENCY:
+    for _engine in ENGINES:
+        event.listen(_engine, "connect", apply_sqlite_pragmas)
+
+# Statement timings feed the "db" stage in /metrics; per-request query stats are opt-in
+for _engine in ENGINES:
+    instrument_engine(_engine)
+    if SQL_INSTRUMENTATION:
+        instrument_queries(_engine)
+
 Base = declarative_base()
 
 
@@ -28,20 +141,52 @@ class User(Base):
 
 class Plan(Base):
     __tablename__ = "plans"
+    __table_args__ = (
+        Index("ix_plans_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     bmr = Column(Float)
     daily_calories = Column(Integer)
-    meal_plan = Column(Text)  # JSON string
-    macros = Column(Text)  # JSON string
-    exercises = Column(Text)  # JSON string
-    grocery_list = Column(Text)  # JSON string
+    protein_g = Column(Integer)
+    carbs_g = Column(Integer)
+    fats_g = Column(Integer)
+    # Legacy JSON strings; no longer written. Migration 4 copied them into
+    # the columns above and the plan_meals/plan_items tables.
+    meal_plan = Column(Text, nullable=True)
+    macros = Column(Text, nullable=True)
+    exercises = Column(Text, nullable=True)
+    grocery_list = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class PlanMeal(Base):
+    """One meal of a plan (breakfast, lunch, dinner, snacks)"""
+    __tablename__ = "plan_meals"
+    
+    plan_id = Column(Integer, ForeignKey('plans.id'), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    meal_type = Column(String, nullable=False)
+    description = Column(Text, nullable=False)
+
+
+class PlanItem(Base):
+    """One exercise or grocery list entry of a plan, in list order"""
+    __tablename__ = "plan_items"
+    
+    plan_id = Column(Integer, ForeignKey('plans.id'), primary_key=True)
+    kind = Column(String, primary_key=True)  # exercise, grocery
+    position = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+
+
 class WeightLog(Base):
     __tablename__ = "weight_logs"
+    __table_args__ = (
+        # Covers the per-user history and trend queries (filter + order + value)
+        Index("ix_weight_logs_user_date", "user_id", "date", "weight"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -53,6 +198,10 @@ class WeightLog(Base):
 
 class HydrationLog(Base):
     __tablename__ = "hydration_logs"
+    __table_args__ = (
+        # One row per user per day; logging again adds to that day's glasses
+        Index("uq_hydration_logs_user_date", "user_id", "date", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -63,6 +212,9 @@ class HydrationLog(Base):
 
 class CalorieLog(Base):
     __tablename__ = "calorie_logs"
+    __table_args__ = (
+        Index("ix_calorie_logs_user_date", "user_id", "date", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -75,6 +227,9 @@ class CalorieLog(Base):
 
 class ExerciseLog(Base):
     __tablename__ = "exercise_logs"
+    __table_args__ = (
+        Index("ix_exercise_logs_user_date", "user_id", "date", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -85,8 +240,34 @@ class ExerciseLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class DailyUserSummary(Base):
+    """Per-user daily totals, updated incrementally by every log write"""
+    __tablename__ = "daily_user_summary"
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    hydration_glasses = Column(Integer, default=0, nullable=False)
+    calories = Column(Integer, default=0, nullable=False)
+    exercise_minutes = Column(Integer, default=0, nullable=False)
+
+
+class PredictionCache(Base):
+    """Precomputed /predictions/comprehensive payloads (see batch_predictions.py)"""
+    __tablename__ = "predictions_cache"
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    payload = Column(Text)  # JSON string, NULL once invalidated
+    computed_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped by every invalidation; the batch job only overwrites rows whose version it read
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+
 def init_db():
+    """Create missing tables, then bring existing databases up to date"""
+    from migrations import run_migrations
+    
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 
 def get_db():
@@ -95,3 +276,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
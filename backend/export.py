@@ -0,0 +1,95 @@
+"""
+Streaming log export
+
+Yields a user's weight, calorie, hydration and exercise rows as NDJSON or
+CSV, oldest first. Rows are read through a streaming cursor with
+yield_per, so only EXPORT_BATCH_SIZE rows are held at a time: memory stays
+flat however long the history is, and the first bytes go out as soon as
+the first batch is read.
+
+The generators open their own connection because a streaming response
+outlives the request's get_db session.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+from database import engine
+from log_store import LOG_TYPES
+from pagination import date_window
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Log type -> exported columns (user_id is implied by the export)
+EXPORT_COLUMNS = {
+    log_type: [column.name for column in model.__table__.columns if column.name != "user_id"]
+    for log_type, (model, _) in LOG_TYPES.items()
+}
+# One CSV header covering every type; columns a type doesn't have stay empty
+CSV_COLUMNS = ["type"] + list(dict.fromkeys(name for columns in EXPORT_COLUMNS.values() for name in columns))
+
+# One shared encoder (json.dumps with options builds a new one per call); dates go out as ISO 8601
+encode_json = json.JSONEncoder(default=lambda value: value.isoformat()).encode
+
+
+def parse_export_types(types: Optional[str]) -> List[str]:
+    """Comma separated log types (all when empty); raises ValueError for unknown ones"""
+    if not types:
+        return list(LOG_TYPES)
+    requested = [name.strip() for name in types.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in LOG_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown log type(s) {', '.join(unknown)}; expected {', '.join(LOG_TYPES)}")
+    return list(dict.fromkeys(requested))
+
+
+def iter_log_batches(user_id: int, log_types: List[str], since: Optional[date] = None,
+                     until: Optional[date] = None) -> Iterator[tuple]:
+    """(log type, list of row tuples in EXPORT_COLUMNS order) batches, each type oldest first"""
+    with engine.connect() as conn:
+        for log_type in log_types:
+            model, _ = LOG_TYPES[log_type]
+            result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(
+                select(*(model.__table__.c[name] for name in EXPORT_COLUMNS[log_type]))
+                .where(model.user_id == user_id, *date_window(model.date, since, until))
+                .order_by(model.date, model.id)
+            )
+            for partition in result.partitions():
+                yield log_type, partition
+
+
+def iter_ndjson(user_id: int, log_types: List[str], since: Optional[date] = None,
+                until: Optional[date] = None) -> Iterator[str]:
+    """One JSON object per line, tagged with its log type"""
+    for log_type, rows in iter_log_batches(user_id, log_types, since, until):
+        columns = ["type", *EXPORT_COLUMNS[log_type]]
+        yield "".join(encode_json(dict(zip(columns, (log_type, *row)))) + "\n" for row in rows)
+
+
+def iter_csv(user_id: int, log_types: List[str], since: Optional[date] = None,
+             until: Optional[date] = None) -> Iterator[str]:
+    """CSV with a header row and a `type` column"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+
+    for log_type, rows in iter_log_batches(user_id, log_types, since, until):
+        # Where each of this type's columns sits in the shared header
+        positions = [CSV_COLUMNS.index(name) for name in EXPORT_COLUMNS[log_type]]
+        line = [""] * len(CSV_COLUMNS)
+        line[0] = log_type
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            for position, value in zip(positions, row):
+                line[position] = value
+            writer.writerow(line)
+        yield buffer.getvalue()
@@ -0,0 +1,276 @@
+"""
+Synthetic dataset generator for performance work
+
+Fills the database with users and multi-year weight, calorie, hydration
+and exercise histories, so benchmarks and index work run against
+production-sized data (init_db.py only creates one default user).
+
+Each user gets a profile and a log history ending today:
+
+  - weight follows the user's goal (loss, gain or maintenance) in segments
+    of a few weeks to months, some of them plateaus, with day-to-day noise
+  - calories scatter around the user's target from calculations.py, a bit
+    higher on weekends, split over breakfast/lunch/dinner and some snacks
+  - hydration and exercise frequency vary per user, exercise with activity level
+  - logging stops for a few days to weeks at a time (holidays, lapses),
+    and each user logs weight/hydration on only part of the other days
+
+Histories are drawn from a generator seeded with (--seed, user number), so
+the same arguments always produce the same rows. Rows are written with one
+executemany per table every --batch-size rows, then daily_user_summary is
+rebuilt once from the log tables. Roughly 4,000 log rows per user and 3
+years; --rows adds users until at least that many log rows are written
+(10M rows take a couple of minutes on SQLite).
+
+Usage:
+    python generate_dataset.py [--users 1000 | --rows 10000000] [--years 3] [--seed 42] [--batch-size 50000]
+"""
+
+import argparse
+import time
+from datetime import date, datetime, time as clock, timedelta
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import insert
+
+from calculations import ACTIVITY_MULTIPLIERS, calculate_bmr, calculate_daily_calories
+from database import DATABASE_URL, engine, init_db, User, WeightLog, CalorieLog, HydrationLog, ExerciseLog
+from log_store import rebuild_daily_summaries
+
+GENERATE_BATCH_SIZE = 50000
+# Users whose profiles are inserted (and ids fetched) together
+USER_CHUNK_SIZE = 200
+
+GOALS = {"weight_loss": 0.5, "maintenance": 0.3, "muscle_gain": 0.2}
+# Trend in kg/day before plateaus and segment variation
+GOAL_TRENDS = {"weight_loss": -0.06, "maintenance": 0.0, "muscle_gain": 0.02}
+PREFERENCES = ["balanced", "vegetarian", "high protein", "vegan", "keto"]
+ALLERGIES = [None, None, None, None, "nuts", "dairy", "gluten", "soy, eggs"]
+
+# Meal -> (chance it is logged on an active day, share of the day's calories)
+MEALS = {"breakfast": (0.8, 0.25), "lunch": (0.9, 0.35), "dinner": (0.95, 0.3), "snack": (0.4, 0.1)}
+MEAL_DESCRIPTIONS = {
+    "breakfast": ["Oatmeal with berries", "Eggs and toast", "Greek yogurt", "Smoothie", "Pancakes"],
+    "lunch": ["Chicken salad", "Turkey sandwich", "Rice bowl", "Lentil soup", "Pasta"],
+    "dinner": ["Salmon and vegetables", "Steak and potatoes", "Stir fry", "Pizza", "Curry with rice"],
+    "snack": ["Apple", "Protein bar", "Nuts", "Chips", "Cookies"],
+}
+# Exercise -> kcal per minute for a 70 kg person
+EXERCISES = {"Running": 11.0, "Cycling": 8.0, "Swimming": 9.0, "Walking": 4.5, "Yoga": 3.0,
+             "Strength Training": 6.0, "HIIT": 12.0}
+# Activity level -> chance of a workout on an active day
+EXERCISE_CHANCE = {"sedentary": 0.1, "lightly_active": 0.25, "moderately_active": 0.45,
+                   "very_active": 0.65, "extremely_active": 0.8}
+
+
+def make_user(rng: np.random.Generator, first_day: date) -> dict:
+    """Random profile for the users table"""
+    gender = "male" if rng.random() < 0.5 else "female"
+    height = rng.normal(176 if gender == "male" else 163, 7)
+    bmi = rng.uniform(19, 36)
+    return {
+        "age": int(rng.integers(18, 71)),
+        "gender": gender,
+        "height": round(float(height), 1),
+        "weight": round(float(bmi * (height / 100) ** 2), 1),
+        "activity_level": str(rng.choice(list(ACTIVITY_MULTIPLIERS))),
+        "health_goal": str(rng.choice(list(GOALS), p=list(GOALS.values()))),
+        "food_preferences": str(rng.choice(PREFERENCES)),
+        "allergies": ALLERGIES[rng.integers(len(ALLERGIES))],
+        "medical_conditions": None,
+        "created_at": datetime.combine(first_day, clock(9)),
+    }
+
+
+def weight_curve(rng: np.random.Generator, start_weight: float, goal: str, days: int) -> np.ndarray:
+    """Daily true weight: goal trend in segments (some flat plateaus) plus a random walk"""
+    factors = np.empty(days)
+    position = 0
+    while position < days:
+        length = int(rng.integers(14, 121))
+        factors[position:position + length] = 0.0 if rng.random() < 0.35 else rng.uniform(0.3, 1.5)
+        position += length
+    # Progress slows down the longer someone has been at it
+    trend = GOAL_TRENDS[goal] * factors * np.exp(-np.arange(days) / 540)
+    if goal == "maintenance":
+        trend += rng.normal(0, 0.01)
+    return np.clip(start_weight + np.cumsum(trend + rng.normal(0, 0.05, days)), 40, 250)
+
+
+def active_days(rng: np.random.Generator, days: int) -> np.ndarray:
+    """Mask of days the user logs anything, with gaps of 3-45 days"""
+    active = np.ones(days, dtype=bool)
+    for _ in range(rng.poisson(days / 180)):
+        start = int(rng.integers(0, days))
+        active[start:start + int(rng.integers(3, 46))] = False
+    return active
+
+
+def make_logs(rng: np.random.Generator, user: dict, dates: list, stamps: list,
+              weekend: np.ndarray) -> Dict[type, List[dict]]:
+    """
+    Log rows per model for one user, one entry of `dates`/`stamps` (the
+    stored date and created_at values) per day. user_id is filled in once
+    the user is inserted.
+    """
+    days = len(dates)
+    active = active_days(rng, days)
+    logs = {}
+
+    weights = weight_curve(rng, user["weight"], user["health_goal"], days)
+    observed = np.round(weights + rng.normal(0, 0.35, days), 1).tolist()
+    logged = np.flatnonzero(active & (rng.random(days) < rng.uniform(0.3, 0.95)))
+    logs[WeightLog] = [
+        {"weight": observed[i], "date": dates[i], "notes": None, "created_at": stamps[i]}
+        for i in logged.tolist()
+    ]
+
+    target = calculate_daily_calories(
+        calculate_bmr(user["age"], user["gender"], user["weight"], user["height"]),
+        user["activity_level"], user["health_goal"],
+    )
+    intake = target * (1 + rng.normal(0, 0.12, days)) * np.where(weekend, 1.08, 1.0)
+    calorie_rows = []
+    for meal_type, (chance, share) in MEALS.items():
+        calories = np.maximum(50, intake * share * (1 + rng.normal(0, 0.15, days))).astype(int).tolist()
+        descriptions = rng.integers(0, len(MEAL_DESCRIPTIONS[meal_type]), days).tolist()
+        calorie_rows.extend(
+            {"calories": calories[i], "meal_type": meal_type,
+             "description": MEAL_DESCRIPTIONS[meal_type][descriptions[i]], "date": dates[i], "created_at": stamps[i]}
+            for i in np.flatnonzero(active & (rng.random(days) < chance)).tolist()
+        )
+    logs[CalorieLog] = calorie_rows
+
+    glasses = np.clip(np.round(rng.normal(rng.uniform(5, 10), 2, days)), 1, 16).astype(int).tolist()
+    logs[HydrationLog] = [
+        {"glasses": glasses[i], "date": dates[i], "created_at": stamps[i]}
+        for i in np.flatnonzero(active & (rng.random(days) < rng.uniform(0.5, 0.95))).tolist()
+    ]
+
+    names = list(EXERCISES)
+    choices = rng.integers(0, len(names), days).tolist()
+    durations = (np.clip(np.round(rng.normal(45, 15, days) / 5) * 5, 10, 150)).astype(int).tolist()
+    logs[ExerciseLog] = [
+        {"exercise_name": names[choices[i]], "duration_minutes": durations[i],
+         "calories_burned": int(durations[i] * EXERCISES[names[choices[i]]] * weights[i] / 70),
+         "date": dates[i], "created_at": stamps[i]}
+        for i in np.flatnonzero(active & (rng.random(days) < EXERCISE_CHANCE[user["activity_level"]])).tolist()
+    ]
+    return logs
+
+
+def generate(users: int = None, rows: int = None, years: float = 3, seed: int = 42,
+             batch_size: int = GENERATE_BATCH_SIZE, progress=None) -> dict:
+    """
+    Insert `users` users (or as many as it takes to write `rows` log rows)
+
+    Returns:
+        counts of users and rows per table, and elapsed seconds
+    """
+    days = int(years * 365)
+    today = date.today()
+    all_dates = [today - timedelta(days=days - 1 - i) for i in range(days)]
+    all_stamps = [datetime.combine(day, clock(20)) for day in all_dates]
+    weekend = np.array([day.weekday() >= 5 for day in all_dates])
+    sqlite = DATABASE_URL.startswith("sqlite")
+    if sqlite:
+        # Stored the way SQLAlchemy stores them, so rows can skip its per-row bind processing
+        date_values = [day.isoformat() for day in all_dates]
+        stamp_values = [stamp.strftime("%Y-%m-%d %H:%M:%S.%f") for stamp in all_stamps]
+    else:
+        date_values, stamp_values = all_dates, all_stamps
+    counts = {"users": 0, **{model.__tablename__: 0 for model in (WeightLog, CalorieLog, HydrationLog, ExerciseLog)}}
+    pending: Dict[type, List[dict]] = {model: [] for model in (WeightLog, CalorieLog, HydrationLog, ExerciseLog)}
+    started = time.perf_counter()
+
+    generated = 0  # log rows generated so far, written or pending
+
+    def flush():
+        with engine.begin() as conn:
+            if sqlite:
+                # Bulk load: skip the fsync per commit (a crash only loses generated data)
+                conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            for model, model_rows in pending.items():
+                if not model_rows:
+                    continue
+                if sqlite:
+                    # Straight to the driver's executemany: values are already in storage format
+                    columns = list(model_rows[0])
+                    conn.exec_driver_sql(
+                        f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join(':' + name for name in columns)})",
+                        model_rows,
+                    )
+                else:
+                    conn.execute(insert(model), model_rows)
+                counts[model.__tablename__] += len(model_rows)
+                model_rows.clear()
+        if progress:
+            progress(counts, time.perf_counter() - started)
+
+    def done() -> bool:
+        return counts["users"] >= users if users is not None else generated >= rows
+
+    index = 0
+    while not done():
+        chunk = []
+        while len(chunk) < USER_CHUNK_SIZE and not (users is not None and counts["users"] + len(chunk) >= users):
+            # One generator per user, so histories don't depend on chunk or batch sizes
+            rng = np.random.default_rng([seed, index])
+            index += 1
+            first = int(rng.integers(0, days // 4))
+            profile = make_user(rng, all_dates[first])
+            logs = make_logs(rng, profile, date_values[first:], stamp_values[first:], weekend[first:])
+            chunk.append((profile, logs))
+            generated += sum(map(len, logs.values()))
+            if rows is not None and generated >= rows:
+                break
+
+        with engine.begin() as conn:
+            user_ids = conn.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True), [profile for profile, _ in chunk]
+            ).scalars().all()
+        for user_id, (_, logs) in zip(user_ids, chunk):
+            for model, model_rows in logs.items():
+                for row in model_rows:
+                    row["user_id"] = user_id
+                pending[model].extend(model_rows)
+            counts["users"] += 1
+            if sum(map(len, pending.values())) >= batch_size:
+                flush()
+
+    flush()
+    with engine.begin() as conn:
+        rebuild_daily_summaries(conn)
+    counts["elapsed_seconds"] = round(time.perf_counter() - started, 1)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic users and log histories")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--users", type=int, default=None, help="number of users (default 1000)")
+    size.add_argument("--rows", type=int, default=None, help="add users until this many log rows are written")
+    parser.add_argument("--years", type=float, default=3, help="length of each history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=GENERATE_BATCH_SIZE, help="log rows per transaction")
+    args = parser.parse_args()
+    if args.users is None and args.rows is None:
+        args.users = 1000
+
+    def show_progress(counts, elapsed):
+        written = sum(counts.values()) - counts["users"]
+        print(f"   {counts['users']} users, {written} log rows ({written / elapsed:,.0f} rows/s)", end="\r", flush=True)
+
+    init_db()
+    target = f"{args.users} users" if args.users is not None else f"{args.rows:,} log rows"
+    print(f"🏗️  Generating {target} over {args.years:g} years (seed {args.seed}) into {DATABASE_URL}")
+    counts = generate(args.users, args.rows, args.years, args.seed, args.batch_size, show_progress)
+
+    elapsed = counts.pop("elapsed_seconds")
+    written = sum(counts.values()) - counts["users"]
+    print(f"\n✅ {counts['users']} users and {written:,} log rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+    for table, count in counts.items():
+        print(f"   {table:<15} {count:>12,}")
+    print("📊 daily_user_summary rebuilt")
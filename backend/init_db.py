@@ -1,11 +1,11 @@
 """
 Initialize database with a default user for testing
 """
-from database import SessionLocal, User, Base, engine
+from database import SessionLocal, User, init_db
 from datetime import datetime
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables and apply pending migrations
+init_db()
 
 # Create session
 db = SessionLocal()
@@ -62,3 +62,4 @@ print("   1. Open http://localhost:5174 in your browser")
 print("   2. The Dashboard will load user data")
 print("   3. Generate a diet plan to see recommendations")
 print("   4. Start logging weight, calories, exercise, etc.")
+print("\n📊 For production-sized test data: python generate_dataset.py --rows 10000000")
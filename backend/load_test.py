@@ -0,0 +1,302 @@
+"""
+Load test that replays the frontend's page loads
+
+Runs the FastAPI app in process (httpx over ASGI, no server needed) and
+has --concurrency virtual users open pages for --duration seconds. Each
+page issues the same requests, in the same order, as the React page:
+
+  dashboard    Dashboard.jsx   GET /dashboard
+  progress     Progress.jsx    weight log, user, calorie prediction, calorie,
+                               hydration and exercise logs, one after another
+  predictions  Predictions.jsx comprehensive predictions + recommendations, in parallel
+  plans        Plans.jsx       GET /history
+  log_entry    Dashboard.jsx   log a glass of water, then reload the dashboard
+
+Users are the first --users in the database; missing ones are created via
+/generate-plan and given LOG_HISTORY_DAYS of logs via /logs/batch. Latency
+is reported per endpoint and per page (p50/p95/p99) with throughput, and
+written to --output as JSON. With --baseline, endpoints whose p95 grew, or
+whose throughput fell, by more than --threshold are flagged and the run
+exits with status 1, so CI can gate on it.
+
+Client and app share one process and event loop, so compare results from
+the same machine and settings.
+
+Usage:
+    python load_test.py [--concurrency 10] [--users 20] [--duration 30] [--warmup 5]
+                        [--pages dashboard,progress] [--output results.json]
+                        [--baseline baseline.json] [--threshold 0.15] [--seed 42]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from sqlalchemy import select
+
+from calculations import ACTIVITY_MULTIPLIERS
+from database import SessionLocal, User
+from main import app
+
+# Page -> steps run one after another; the requests within a step run in parallel
+PAGES = {
+    "dashboard": [
+        [("GET", "/dashboard/{user_id}")],
+    ],
+    "progress": [
+        [("GET", "/weight-log/{user_id}")],
+        [("GET", "/user/{user_id}")],
+        [("GET", "/predictions/calories/{user_id}")],
+        [("GET", "/calorie-log/{user_id}")],
+        [("GET", "/hydration-log/{user_id}")],
+        [("GET", "/exercise-log/{user_id}")],
+    ],
+    "predictions": [
+        [("GET", "/predictions/comprehensive/{user_id}"), ("GET", "/recommendations/{user_id}")],
+    ],
+    "plans": [
+        [("GET", "/history/{user_id}")],
+    ],
+    "log_entry": [
+        [("POST", "/hydration-log/{user_id}")],
+        [("GET", "/dashboard/{user_id}")],
+    ],
+}
+# Relative frequency of each page: the dashboard is the landing page
+PAGE_WEIGHTS = {"dashboard": 4, "progress": 2, "predictions": 2, "plans": 1, "log_entry": 1}
+REQUEST_BODIES = {
+    ("POST", "/hydration-log/{user_id}"): {"glasses": 1},
+}
+
+LOG_HISTORY_DAYS = 60
+GOALS = ["weight_loss", "muscle_gain", "maintenance"]
+
+
+def make_profile(rng: random.Random) -> dict:
+    """Random /generate-plan body"""
+    return {
+        "age": rng.randint(18, 70),
+        "gender": rng.choice(["male", "female"]),
+        "height": round(rng.uniform(150, 200), 1),
+        "weight": round(rng.uniform(50, 120), 1),
+        "activity_level": rng.choice(list(ACTIVITY_MULTIPLIERS)),
+        "health_goal": rng.choice(GOALS),
+        "food_preferences": rng.choice(["balanced", "vegetarian", "high protein"]),
+    }
+
+
+def make_history(rng: random.Random, weight: float, days: int) -> List[dict]:
+    """/logs/batch entries for the last `days` days"""
+    entries = []
+    today = date.today()
+    for offset in range(days, 0, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        weight += rng.gauss(-0.05, 0.2)
+        entries.append({"type": "weight", "weight": round(weight, 1), "date": day})
+        entries.append({"type": "hydration", "glasses": rng.randint(4, 10), "date": day})
+        for meal_type in ("breakfast", "lunch", "dinner"):
+            entries.append({"type": "calorie", "calories": rng.randint(300, 900), "meal_type": meal_type,
+                            "description": f"{meal_type} {offset}", "date": day})
+        if rng.random() < 0.5:
+            entries.append({"type": "exercise", "exercise_name": rng.choice(["Running", "Cycling", "Yoga"]),
+                            "duration_minutes": rng.randint(20, 60), "date": day})
+    return entries
+
+
+async def prepare_users(client: httpx.AsyncClient, count: int, rng: random.Random) -> List[int]:
+    """Ids of `count` users with a plan and logs, creating the missing ones"""
+    with SessionLocal() as session:
+        user_ids = list(session.scalars(select(User.id).order_by(User.id).limit(count)))
+
+    missing = count - len(user_ids)
+    if missing > 0:
+        print(f"👤 Creating {missing} users with {LOG_HISTORY_DAYS} days of logs...")
+    for _ in range(missing):
+        profile = make_profile(rng)
+        response = await client.post("/generate-plan", json=profile)
+        response.raise_for_status()
+        user_id = response.json()["user_id"]
+        response = await client.post(f"/logs/batch/{user_id}",
+                                      json={"entries": make_history(rng, profile["weight"], LOG_HISTORY_DAYS)})
+        response.raise_for_status()
+        user_ids.append(user_id)
+    return user_ids
+
+
+class Recorder:
+    """Latencies (seconds) and error counts per endpoint and per page"""
+
+    def __init__(self):
+        self.recording = False
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, failed: bool = False):
+        if not self.recording:
+            return
+        self.latencies.setdefault(name, []).append(seconds)
+        self.errors[name] = self.errors.get(name, 0) + failed
+
+    def summary(self, names, elapsed: float) -> dict:
+        result = {}
+        for name in names:
+            if name not in self.latencies:
+                continue
+            ms = np.array(self.latencies[name]) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            result[name] = {
+                "count": len(ms),
+                "errors": self.errors[name],
+                "throughput": round(len(ms) / elapsed, 2),
+                "mean_ms": round(float(ms.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(ms.max()), 2),
+            }
+        return result
+
+
+async def call(client: httpx.AsyncClient, recorder: Recorder, method: str, route: str, user_id: int) -> bool:
+    """One request, recorded under "METHOD /route/{template}"; True when it succeeded"""
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, route.format(user_id=user_id), json=REQUEST_BODIES.get((method, route)))
+        failed = response.status_code >= 400
+    except httpx.HTTPError:
+        failed = True
+    recorder.record(f"{method} {route}", time.perf_counter() - started, failed)
+    return not failed
+
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, pages: List[str], weights: List[int],
+                       user_ids: List[int], stop_at: float, rng: random.Random):
+    """Open random pages for random users until `stop_at`"""
+    while time.perf_counter() < stop_at:
+        page = rng.choices(pages, weights)[0]
+        user_id = rng.choice(user_ids)
+        started = time.perf_counter()
+        ok = True
+        for step in PAGES[page]:
+            results = await asyncio.gather(*(call(client, recorder, method, route, user_id) for method, route in step))
+            ok = ok and all(results)
+        recorder.record(f"page {page}", time.perf_counter() - started, not ok)
+
+
+async def run(args) -> dict:
+    pages = args.pages.split(",") if args.pages else list(PAGES)
+    unknown = [page for page in pages if page not in PAGES]
+    if unknown:
+        sys.exit(f"❌ Unknown page(s) {', '.join(unknown)}; expected {', '.join(PAGES)}")
+    rng = random.Random(args.seed)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            user_ids = await prepare_users(client, args.users, rng)
+
+            recorder = Recorder()
+            started = time.perf_counter()
+            stop_at = started + args.warmup + args.duration
+            workers = [
+                virtual_user(client, recorder, pages, [PAGE_WEIGHTS[page] for page in pages], user_ids,
+                             stop_at, random.Random(args.seed + worker))
+                for worker in range(1, args.concurrency + 1)
+            ]
+
+            async def start_recording():
+                await asyncio.sleep(args.warmup)
+                recorder.recording = True
+                return time.perf_counter()
+
+            print(f"🚀 {args.concurrency} virtual users on {len(user_ids)} users: "
+                  f"{args.warmup:g}s warm-up, {args.duration:g}s measured")
+            recording_started, *_ = await asyncio.gather(start_recording(), *workers)
+            elapsed = time.perf_counter() - recording_started
+
+    endpoints = list(dict.fromkeys(f"{method} {route}" for page in pages for step in PAGES[page]
+                                   for method, route in step))
+    endpoint_stats = recorder.summary(endpoints, elapsed)
+    total = sum(stats["count"] for stats in endpoint_stats.values())
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "config": {"concurrency": args.concurrency, "users": args.users, "duration": args.duration,
+                   "warmup": args.warmup, "pages": pages, "seed": args.seed,
+                   "database": os.getenv("DATABASE_URL", "sqlite:///./diet_fitness.db")},
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(stats["errors"] for stats in endpoint_stats.values()),
+        "throughput": round(total / elapsed, 2),
+        "endpoints": endpoint_stats,
+        "pages": recorder.summary([f"page {page}" for page in pages], elapsed),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Endpoints and pages whose p95 rose, or throughput fell, by more than `threshold` (a fraction)"""
+    regressions = []
+    for section in ("endpoints", "pages"):
+        for name, stats in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            if before["p95_ms"] and stats["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms "
+                                   f"(+{(stats['p95_ms'] / before['p95_ms'] - 1) * 100:.0f}%)")
+            if stats["throughput"] < before["throughput"] * (1 - threshold):
+                regressions.append(f"{name}: throughput {before['throughput']:.1f} -> {stats['throughput']:.1f} req/s "
+                                   f"({(stats['throughput'] / before['throughput'] - 1) * 100:.0f}%)")
+            if stats["errors"] and not before["errors"]:
+                regressions.append(f"{name}: {stats['errors']} errors (none in baseline)")
+    return regressions
+
+
+def print_table(title: str, stats: dict):
+    print(f"\n{title:<42} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in stats.items():
+        print(f"{name:<42} {row['count']:>7} {row['errors']:>5} {row['throughput']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay frontend page loads against the API in process")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users opening pages at once")
+    parser.add_argument("--users", type=int, default=20, help="distinct app users the pages are opened for")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring")
+    parser.add_argument("--pages", default=None, help=f"comma separated subset of {', '.join(PAGES)}")
+    parser.add_argument("--output", default=None, help="write results as JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed p95/throughput change vs the baseline")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print_table("endpoint", results["endpoints"])
+    print_table("page", results["pages"])
+    print(f"\n📊 {results['requests']} requests in {results['elapsed_seconds']:.1f}s: "
+          f"{results['throughput']:.1f} req/s, {results['errors']} errors")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%} vs {args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%} vs {args.baseline}")
@@ -0,0 +1,250 @@
+"""
+Bulk log import
+
+Imports historical weight/calorie/hydration/exercise logs from CSV or
+NDJSON, e.g. when a user moves over from another tracker. The file is read
+line by line and handled IMPORT_CHUNK_SIZE rows at a time:
+
+  1. each row is validated against the *LogCreate schema for its type
+  2. rows already stored for the user (or repeated within the file) are
+     dropped as duplicates, see DEDUPE_COLUMNS. Hydration rows for the same
+     day add up instead, as with POST /hydration-log; only days stored
+     before the import started are duplicates
+  3. the rest are bulk-inserted with one executemany per table and the
+     chunk is committed
+
+So memory depends on the chunk size, not the file size, and an
+interrupted import keeps the chunks it finished (re-running it skips them
+as duplicates).
+
+Rows use the /logs/batch entry shape: a `type` field plus the fields of
+that log type, with a required `date`. CSV files have one column per
+field; empty cells count as missing, so /export CSV files import as is.
+Files without a `type` column need a default type (--type / ?type=).
+
+Usage:
+    python log_import.py USER_ID FILE [--format csv|ndjson] [--type weight] [--chunk-size 2000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, init_db, User
+from log_store import LOG_TYPES, validate_log_entry, format_errors, merge_hydration, on_logs_written
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+IMPORT_FORMATS = ("csv", "ndjson")
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", str(100 * 1024 * 1024)))  # upload size limit for /import
+# Only the first errors are kept in the report; the rest are counted
+MAX_REPORTED_ERRORS = 100
+
+# Log type -> columns that identify a row for a user. Weight and hydration
+# have one row per day (hydration rows in the file for one day are summed);
+# several meals or workouts a day are normal, so those only match when the
+# entry itself is the same.
+DEDUPE_COLUMNS = {
+    "weight": ("date",),
+    "hydration": ("date",),
+    "calorie": ("date", "meal_type", "calories", "description"),
+    "exercise": ("date", "exercise_name", "duration_minutes"),
+}
+
+
+def detect_format(filename: str) -> str:
+    """Import format from a file name (NDJSON unless it ends in .csv)"""
+    return "csv" if filename.lower().endswith(".csv") else "ndjson"
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(line number, record, parse error) for each row of a CSV or NDJSON stream"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Keys of None hold cells beyond the header; empty cells are missing values
+            yield reader.line_num, {
+                key: value for key, value in record.items() if key is not None and value not in ("", None)
+            }, None
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Entry must be an object"
+            continue
+        yield line_number, record, None
+
+
+def dedupe_key(log_type: str, row) -> tuple:
+    """Values of the row's DEDUPE_COLUMNS"""
+    return tuple(row[name] for name in DEDUPE_COLUMNS[log_type])
+
+
+def existing_keys(session: Session, user_id: int, log_type: str, rows: List[dict]) -> set:
+    """Dedupe keys of the user's stored rows on the dates in `rows`"""
+    model, _ = LOG_TYPES[log_type]
+    return {
+        tuple(row) for row in session.execute(
+            select(*(getattr(model, name) for name in DEDUPE_COLUMNS[log_type]))
+            .where(model.user_id == user_id, model.date.in_({row["date"] for row in rows}))
+        )
+    }
+
+
+def import_chunk(session: Session, user_id: int, rows_by_type: Dict[str, List[dict]],
+                 hydration_days: set) -> Tuple[int, int]:
+    """
+    Insert one chunk's validated rows, skipping duplicates
+
+    `hydration_days` holds the hydration dedupe keys this import has already
+    written (updated here), so later rows for those days are added to them.
+
+    Returns:
+        (rows created, duplicates skipped)
+    """
+    created = duplicates = 0
+    for log_type, rows in rows_by_type.items():
+        model, _ = LOG_TYPES[log_type]
+        seen = existing_keys(session, user_id, log_type, rows)
+
+        if log_type == "hydration":
+            seen -= hydration_days
+            new_rows = [dict(row, user_id=user_id) for row in rows if dedupe_key(log_type, row) not in seen]
+            duplicates += len(rows) - len(new_rows)
+            if new_rows:
+                merge_hydration(session, user_id, new_rows)
+                on_logs_written(session, user_id, log_type, new_rows)
+                hydration_days.update(dedupe_key(log_type, row) for row in new_rows)
+            created += len(new_rows)
+            continue
+
+        new_rows = []
+        for row in rows:
+            key = dedupe_key(log_type, row)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            new_rows.append(dict(row, user_id=user_id))
+
+        if new_rows:
+            # No RETURNING needed here, so this runs as one plain executemany
+            session.execute(insert(model), new_rows)
+            on_logs_written(session, user_id, log_type, new_rows)
+        created += len(new_rows)
+    return created, duplicates
+
+
+def import_logs(lines: Iterable[str], user_id: int, fmt: str = "ndjson", default_type: Optional[str] = None,
+                chunk_size: int = IMPORT_CHUNK_SIZE, progress=None) -> dict:
+    """
+    Import a CSV/NDJSON stream of log rows for a user, committing chunk by chunk
+
+    Returns:
+        report with counts, the first MAX_REPORTED_ERRORS row errors and throughput
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(IMPORT_FORMATS)}")
+    if default_type is not None and default_type not in LOG_TYPES:
+        raise ValueError(f"Unknown log type {default_type!r}; expected one of {', '.join(LOG_TYPES)}")
+
+    report = {"rows": 0, "created": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    started = time.perf_counter()
+
+    def reject(line_number: int, errors: List[str]):
+        report["invalid"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_number, "errors": errors})
+
+    session = SessionLocal()
+    try:
+        if session.get(User, user_id) is None:
+            raise LookupError("User not found")
+
+        hydration_days = set()
+
+        def flush(rows_by_type):
+            created, duplicates = import_chunk(session, user_id, rows_by_type, hydration_days)
+            session.commit()
+            report["created"] += created
+            report["duplicates"] += duplicates
+            if progress:
+                progress(report)
+
+        rows_by_type, pending = {}, 0
+        for line_number, record, error in iter_records(lines, fmt):
+            report["rows"] += 1
+            if error:
+                reject(line_number, [error])
+                continue
+            if default_type and "type" not in record:
+                record["type"] = default_type
+            if "date" not in record:
+                reject(line_number, ["date: Field required"])
+                continue
+            try:
+                log_type, row = validate_log_entry(record)
+            except ValueError as e:
+                reject(line_number, format_errors(e))
+                continue
+
+            rows_by_type.setdefault(log_type, []).append(row)
+            pending += 1
+            if pending >= chunk_size:
+                flush(rows_by_type)
+                rows_by_type, pending = {}, 0
+
+        if pending:
+            flush(rows_by_type)
+    finally:
+        session.close()
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed) if elapsed else None
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import historical logs for a user from CSV or NDJSON")
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("file", help="CSV or NDJSON file ('-' for stdin)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None, help="default: from the file extension")
+    parser.add_argument("--type", choices=list(LOG_TYPES), default=None, help="log type for rows without one")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.file)
+
+    def show_progress(report):
+        print(f"   {report['rows']} rows read, {report['created']} imported", end="\r", flush=True)
+
+    init_db()
+    source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+    try:
+        report = import_logs(source, args.user_id, fmt, args.type, args.chunk_size, show_progress)
+    except (LookupError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+    finally:
+        source.close()
+
+    print(f"✅ Imported {report['created']} of {report['rows']} rows in {report['elapsed_seconds']:.1f}s "
+          f"({report['rows_per_second'] or 0} rows/s): {report['duplicates']} duplicates, {report['invalid']} invalid")
+    for error in report["errors"][:20]:
+        print(f"⚠️  Line {error['line']}: {'; '.join(error['errors'])}")
+    if report["invalid"] > 20:
+        print(f"   ... and {report['invalid'] - 20} more invalid rows")
@@ -0,0 +1,264 @@
+"""
+Bulk log writes
+
+Validates mixed weight/calorie/hydration/exercise entries against the
+*LogCreate schemas and inserts each table's rows with a single executemany
+statement, so a sync of hundreds of entries costs one transaction instead
+of one request and commit per entry.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import event, insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from cache import prediction_cache
+from database import WeightLog, HydrationLog, CalorieLog, ExerciseLog, DailyUserSummary, PredictionCache
+from schemas import WeightLogCreate, HydrationLogCreate, CalorieLogCreate, ExerciseLogCreate
+
+# Log type -> (table model, create schema)
+LOG_TYPES = {
+    "weight": (WeightLog, WeightLogCreate),
+    "calorie": (CalorieLog, CalorieLogCreate),
+    "hydration": (HydrationLog, HydrationLogCreate),
+    "exercise": (ExerciseLog, ExerciseLogCreate),
+}
+
+# Log type -> (log field, daily_user_summary column) for the types rolled up per day
+SUMMARY_FIELDS = {
+    "hydration": ("glasses", "hydration_glasses"),
+    "calorie": ("calories", "calories"),
+    "exercise": ("duration_minutes", "exercise_minutes"),
+}
+
+MAX_BATCH_SIZE = 5000
+
+
+def validate_log_entry(entry: dict) -> Tuple[str, dict]:
+    """
+    Validate one batch entry
+    
+    Returns:
+        (log type, row values without user_id)
+    
+    Raises:
+        ValueError (including pydantic's ValidationError) for bad entries
+    """
+    log_type = entry.get("type")
+    if not isinstance(log_type, str) or log_type not in LOG_TYPES:
+        raise ValueError(f"Unknown log type {log_type!r}; expected one of {', '.join(LOG_TYPES)}")
+    
+    _, create_schema = LOG_TYPES[log_type]
+    data = create_schema.model_validate({k: v for k, v in entry.items() if k != "type"})
+    row = data.model_dump()
+    row["date"] = row["date"] or date.today()
+    return log_type, row
+
+
+def format_errors(error: ValueError) -> List[str]:
+    """Flatten a validation error into readable messages"""
+    if isinstance(error, ValidationError):
+        return [
+            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+            for err in error.errors()
+        ]
+    return [str(error)]
+
+
+def prepare_log_batch(entries: List[dict]) -> Tuple[Dict[str, List[Tuple[int, dict]]], List[dict]]:
+    """
+    Validate a batch of entries
+    
+    Returns:
+        rows grouped by log type as (entry index, row) pairs, and a result
+        per entry (invalid entries already carry their errors)
+    """
+    rows_by_type = defaultdict(list)
+    results = []
+    
+    for index, entry in enumerate(entries):
+        log_type = entry.get("type") if isinstance(entry, dict) else None
+        result = {
+            "index": index,
+            "type": log_type if isinstance(log_type, str) else None,
+            "status": "invalid"
+        }
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("Entry must be an object")
+            log_type, row = validate_log_entry(entry)
+        except ValueError as e:
+            result["errors"] = format_errors(e)
+        else:
+            rows_by_type[log_type].append((index, row))
+        results.append(result)
+    
+    return rows_by_type, results
+
+
+def insert_logs(session: Session, model, rows: List[dict]) -> List[int]:
+    """Insert rows into a log table with one executemany, returning ids in row order"""
+    if not rows:
+        return []
+    result = session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        rows
+    )
+    return list(result.scalars())
+
+
+def dialect_upsert(dialect_name: str, model, index_elements: list, updates):
+    """
+    INSERT ... ON CONFLICT (index_elements) DO UPDATE, in the dialect's own syntax
+
+    `updates(excluded)` returns the columns to set, where `excluded` holds
+    the values the insert proposed. Only SQLite and PostgreSQL are
+    supported: callers rely on RETURNING, which MySQL's upsert lacks.
+    """
+    if dialect_name not in ("sqlite", "postgresql"):
+        raise NotImplementedError(f"Upserts are not supported on {dialect_name}; use SQLite or PostgreSQL")
+    stmt = (sqlite if dialect_name == "sqlite" else postgresql).insert(model)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=updates(stmt.excluded))
+
+
+def hydration_upsert(dialect_name: str):
+    """
+    INSERT ... ON CONFLICT (user_id, date) DO UPDATE SET glasses = glasses + excluded.glasses
+    
+    Adds to the day's row atomically in one statement, so concurrent
+    increments can't lose updates. Relies on uq_hydration_logs_user_date.
+    """
+    return dialect_upsert(
+        dialect_name, HydrationLog, [HydrationLog.user_id, HydrationLog.date],
+        lambda excluded: {"glasses": HydrationLog.glasses + excluded.glasses}
+    )
+
+
+def summary_upsert(dialect_name: str, column: str):
+    """INSERT ... ON CONFLICT (user_id, date) DO UPDATE adding to one daily_user_summary column"""
+    return dialect_upsert(
+        dialect_name, DailyUserSummary, [DailyUserSummary.user_id, DailyUserSummary.date],
+        lambda excluded: {column: getattr(DailyUserSummary, column) + getattr(excluded, column)}
+    )
+
+
+def update_daily_summary(session: Session, user_id: int, log_type: str, rows: List[dict]):
+    """Add newly written log rows to the user's daily totals"""
+    if log_type not in SUMMARY_FIELDS:
+        return
+    field, column = SUMMARY_FIELDS[log_type]
+    
+    totals = defaultdict(int)
+    for row in rows:
+        totals[row["date"]] += row.get(field) or 0
+    
+    session.execute(
+        summary_upsert(session.get_bind().dialect.name, column),
+        [{"user_id": user_id, "date": day, column: total} for day, total in totals.items()]
+    )
+
+
+def invalidate_cached_predictions(session: Session, user_id: int):
+    """
+    Drop the user's precomputed predictions so they are recomputed from fresh data
+
+    The row is kept as a tombstone (no payload) with its version bumped, so a
+    batch job that read the user's data before this write can't put its
+    result back (see batch_predictions.save_results). The in-memory entry is
+    dropped when the session commits.
+    """
+    session.execute(
+        dialect_upsert(
+            session.get_bind().dialect.name, PredictionCache, [PredictionCache.user_id],
+            lambda excluded: {"payload": None, "computed_at": excluded.computed_at,
+                              "version": PredictionCache.version + 1}
+        ),
+        {"user_id": user_id, "payload": None, "computed_at": datetime.utcnow(), "version": 1}
+    )
+    session.info.setdefault("stale_predictions", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_stale_predictions(session: Session):
+    for user_id in session.info.pop("stale_predictions", ()):
+        prediction_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_predictions(session: Session):
+    session.info.pop("stale_predictions", None)
+
+
+def on_logs_written(session: Session, user_id: int, log_type: str, rows: List[dict]):
+    """Keep the user's derived data in step with new log rows, in the same transaction"""
+    update_daily_summary(session, user_id, log_type, rows)
+    invalidate_cached_predictions(session, user_id)
+
+
+def rebuild_daily_summaries(conn: Connection):
+    """Recompute daily_user_summary from the log tables (for migrations and bulk loads)"""
+    conn.execute(text("DELETE FROM daily_user_summary"))
+    conn.execute(text("""
+        INSERT INTO daily_user_summary (user_id, date, hydration_glasses, calories, exercise_minutes)
+        SELECT user_id, date, SUM(glasses), SUM(calories), SUM(minutes)
+        FROM (
+            SELECT user_id, date, COALESCE(glasses, 0) AS glasses, 0 AS calories, 0 AS minutes
+            FROM hydration_logs
+            UNION ALL
+            SELECT user_id, date, 0, COALESCE(calories, 0), 0 FROM calorie_logs
+            UNION ALL
+            SELECT user_id, date, 0, 0, COALESCE(duration_minutes, 0) FROM exercise_logs
+        ) AS logs
+        WHERE user_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY user_id, date
+    """))
+
+
+def merge_hydration(session: Session, user_id: int, rows: List[dict]) -> Dict[date, int]:
+    """
+    Add glasses to each day's hydration row, creating missing days
+    
+    Returns:
+        hydration log id per date
+    """
+    glasses_by_date = defaultdict(int)
+    for row in rows:
+        glasses_by_date[row["date"]] += row["glasses"]
+    
+    stmt = hydration_upsert(session.get_bind().dialect.name)
+    result = session.execute(
+        stmt.returning(HydrationLog.date, HydrationLog.id),
+        [{"user_id": user_id, "date": day, "glasses": glasses} for day, glasses in glasses_by_date.items()]
+    )
+    return dict(result.all())
+
+
+def write_log_batch(session: Session, user_id: int,
+                    rows_by_type: Dict[str, List[Tuple[int, dict]]], results: List[dict]) -> List[dict]:
+    """
+    Insert validated batch rows for a user and fill in the per-entry results
+    
+    Runs inside the caller's transaction; nothing is committed here.
+    """
+    for log_type, indexed_rows in rows_by_type.items():
+        model, _ = LOG_TYPES[log_type]
+        rows = [dict(row, user_id=user_id) for _, row in indexed_rows]
+        
+        if log_type == "hydration":
+            # One row per user per day, so entries for the same day are merged
+            ids_by_date = merge_hydration(session, user_id, rows)
+            ids = [ids_by_date[row["date"]] for row in rows]
+        else:
+            ids = insert_logs(session, model, rows)
+        
+        on_logs_written(session, user_id, log_type, rows)
+        
+        for (index, _), log_id in zip(indexed_rows, ids):
+            results[index].update(status="created", id=log_id)
+    
+    return results
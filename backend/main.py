@@ -1,28 +1,54 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, literal, null, select, union_all
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, date
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, date, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+import io
 import json
+import tempfile
 
-from database import init_db, get_db, User, Plan, WeightLog, HydrationLog, CalorieLog, ExerciseLog
+from database import (
+    init_db, get_db, get_async_db, async_engine, writer_engine, SQLITE_HIGH_CONCURRENCY,
+    User, WeightLog, HydrationLog, CalorieLog, ExerciseLog, DailyUserSummary, PredictionCache
+)
 from schemas import (
-    UserInput, PlanResponse, MealPlan, Macros,
+    UserInput, PlanResponse, MealPlan, Macros, PlanBatchRequest, PlanBatchResponse,
     WeightLogCreate, WeightLogResponse,
     HydrationLogCreate, HydrationLogResponse,
     CalorieLogCreate, CalorieLogResponse,
     ExerciseLogCreate, ExerciseLogResponse,
-    ProgressStats
+    ProgressStats,
+    LogBatchRequest, LogBatchResponse
+)
+from write_queue import write_queue, run_write
+from plan_store import save_plans, load_plan_history
+from log_import import MAX_IMPORT_BYTES, import_logs
+from export import EXPORT_FORMATS, parse_export_types, iter_ndjson, iter_csv
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, date_window, keyset_page, split_page, window_start
+from cache import prediction_cache
+from metrics import MetricsMiddleware, render_metrics, stage_timer, timed
+from query_stats import SQL_INSTRUMENTATION, QueryStatsMiddleware
+from log_store import (
+    prepare_log_batch, write_log_batch, hydration_upsert, on_logs_written,
+    invalidate_cached_predictions, MAX_BATCH_SIZE
+)
+from calculations import (
+    calculate_bmr, calculate_daily_calories, calculate_macros,
+    calculate_bmr_batch, calculate_daily_calories_batch, calculate_macros_batch
 )
-from calculations import calculate_bmr, calculate_daily_calories, calculate_macros
 # Commented out AI service - using Python-based planner instead
 # from ai_service import generate_diet_plan
-from python_planner import generate_python_diet_plan
+from python_planner import plan_memo, generate_python_diet_plan_batch, shutdown_plan_pool
 from prediction_engine import (
-    PredictionEngine,
     get_weight_prediction,
     get_calorie_prediction,
-    get_comprehensive_predictions
+    get_prediction_report
 )
 
 # Initialize FastAPI app
@@ -35,12 +61,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Link", "X-Next-Cursor", "X-DB-Query-Count", "X-DB-Query-Time-Ms"],
 )
 
+# Opt-in per-request query counts, slow-query log and N+1 warnings (see query_stats.py)
+if SQL_INSTRUMENTATION:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Per-route latency/size/status metrics, served at /metrics (added last so it also times CORS handling)
+app.add_middleware(MetricsMiddleware)
+
 # Initialize database on startup
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     init_db()
+    if SQLITE_HIGH_CONCURRENCY:
+        await write_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await write_queue.stop()
+    shutdown_plan_pool()
+    await async_engine.dispose()
+    if writer_engine is not None:
+        await writer_engine.dispose()
 
 
 @app.get("/")
@@ -120,22 +165,13 @@ def generate_plan(user_input: UserInput, db: Session = Depends(get_db)):
             "medical_conditions": user_input.medical_conditions
         }
         
-        # Use Python-based algorithm instead of AI
-        ai_plan = generate_python_diet_plan(user_data, daily_calories, macros)
+        # Use Python-based algorithm instead of AI (memoized per profile bucket)
+        ai_plan = plan_memo.get_plan(user_data, daily_calories, macros)
         
         # Step 6: Save plan to database
-        plan = Plan(
-            user_id=user.id,
-            bmr=bmr,
-            daily_calories=daily_calories,
-            meal_plan=json.dumps(ai_plan["meal_plan"]),
-            macros=json.dumps(macros),
-            exercises=json.dumps(ai_plan["exercises"]),
-            grocery_list=json.dumps(ai_plan["grocery_list"])
-        )
-        db.add(plan)
+        created_at = datetime.utcnow()
+        save_plans(db, [user.id], [bmr], [daily_calories], [macros], [ai_plan], created_at)
         db.commit()
-        db.refresh(plan)
         
         # Step 7: Prepare response
         response = PlanResponse(
@@ -146,7 +182,7 @@ def generate_plan(user_input: UserInput, db: Session = Depends(get_db)):
             macros=Macros(calories=daily_calories, **macros),
             exercises=ai_plan["exercises"],
             grocery_list=ai_plan["grocery_list"],
-            created_at=plan.created_at.isoformat()
+            created_at=created_at.isoformat()
         )
         
         return response
@@ -156,6 +192,81 @@ def generate_plan(user_input: UserInput, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error generating plan: {str(e)}")
 
 
+MAX_PLAN_BATCH = 1000
+
+
+@app.post("/generate-plans/batch", response_model=PlanBatchResponse)
+def generate_plans_batch(request: PlanBatchRequest, db: Session = Depends(get_db)):
+    """
+    Generate plans for a whole cohort in one request
+    
+    Same steps as /generate-plan, but BMR, calories and macros are computed
+    for all users at once, plans are generated in a process pool, and all
+    users and plans are inserted in a single transaction. Plans are
+    returned in request order.
+    """
+    users = request.users
+    if len(users) > MAX_PLAN_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(users)} users; the maximum is {MAX_PLAN_BATCH}"
+        )
+    if not users:
+        return PlanBatchResponse(plans=[])
+    
+    try:
+        bmrs = calculate_bmr_batch(
+            [u.age for u in users], [u.gender for u in users],
+            [u.weight for u in users], [u.height for u in users]
+        )
+        health_goals = [u.health_goal for u in users]
+        daily_calories = calculate_daily_calories_batch(bmrs, [u.activity_level for u in users], health_goals)
+        macros = calculate_macros_batch(daily_calories, health_goals)
+        bmrs, daily_calories = bmrs.tolist(), daily_calories.tolist()
+        
+        user_rows = [u.model_dump() for u in users]
+        ai_plans = generate_python_diet_plan_batch(user_rows, daily_calories, macros, memo=plan_memo)
+        
+        # One transaction for the whole cohort
+        user_ids = db.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            user_rows
+        ).scalars().all()
+        created_at = datetime.utcnow()
+        save_plans(db, user_ids, bmrs, daily_calories, macros, ai_plans, created_at)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error generating plans: {str(e)}")
+    
+    return PlanBatchResponse(plans=[
+        PlanResponse(
+            user_id=user_id,
+            bmr=bmr,
+            daily_calories=calories,
+            meal_plan=MealPlan(**ai_plan["meal_plan"]),
+            macros=Macros(calories=calories, **user_macros),
+            exercises=ai_plan["exercises"],
+            grocery_list=ai_plan["grocery_list"],
+            created_at=created_at.isoformat()
+        )
+        for user_id, bmr, calories, user_macros, ai_plan
+        in zip(user_ids, bmrs, daily_calories, macros, ai_plans)
+    ])
+
+
+@app.get("/planner/stats")
+def get_planner_stats():
+    """Plan memo size, hit rate and eviction counts"""
+    return plan_memo.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Request and stage metrics in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/user/{user_id}")
 def get_user(user_id: int, db: Session = Depends(get_db)):
     """
@@ -165,6 +276,11 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    return user_profile(user)
+
+
+def user_profile(user: User) -> dict:
+    """Serialize a user's full profile"""
     return {
         "id": user.id,
         "age": user.age,
@@ -199,6 +315,7 @@ def update_user(user_id: int, user_input: UserInput, db: Session = Depends(get_d
     user.food_preferences = user_input.food_preferences
     user.allergies = user_input.allergies
     user.medical_conditions = user_input.medical_conditions
+    invalidate_cached_predictions(db, user_id)
     
     db.commit()
     db.refresh(user)
@@ -225,32 +342,35 @@ def update_user(user_id: int, user_input: UserInput, db: Session = Depends(get_d
     }
 
 
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+
 @app.get("/history/{user_id}")
-def get_user_history(user_id: int, db: Session = Depends(get_db)):
+def get_user_history(
+    user_id: int,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Get all plans for a specific user
+    Get a user's plans, newest first, one page at a time
+    Pass the returned next_cursor as `cursor` to fetch the following page.
     """
     
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    plans = db.query(Plan).filter(Plan.user_id == user_id).order_by(Plan.created_at.desc()).all()
-    
-    history = []
-    for plan in plans:
-        history.append({
-            "id": plan.id,
-            "bmr": plan.bmr,
-            "daily_calories": plan.daily_calories,
-            "meal_plan": json.loads(plan.meal_plan),
-            "macros": json.loads(plan.macros),
-            "exercises": json.loads(plan.exercises),
-            "grocery_list": json.loads(plan.grocery_list),
-            "created_at": plan.created_at.isoformat()
-        })
+    try:
+        history, next_cursor = load_plan_history(db, user_id, limit, cursor, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {
+    # Already plain JSON types, so skip FastAPI's jsonable_encoder pass over every plan
+    return JSONResponse({
         "user": {
             "id": user.id,
             "age": user.age,
@@ -260,8 +380,9 @@ def get_user_history(user_id: int, db: Session = Depends(get_db)):
             "activity_level": user.activity_level,
             "health_goal": user.health_goal
         },
-        "plans": history
-    }
+        "plans": history,
+        "next_cursor": next_cursor
+    })
 
 
 if __name__ == "__main__":
@@ -271,194 +392,456 @@ if __name__ == "__main__":
 
 # ========== PROGRESS TRACKING ENDPOINTS ==========
 
+async def require_user(db: AsyncSession, user_id: int):
+    """Raise 404 unless the user exists"""
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+# Default `days` of the log listing endpoints (and of the matching /dashboard sections)
+WEIGHT_LOG_DAYS = 30
+LOG_DAYS = 7
+
+
+def page_params(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+) -> dict:
+    """Shared query parameters of the log listing endpoints"""
+    return {"since": since, "until": until, "limit": limit, "cursor": cursor}
+
+
+def list_logs(db: Session, model, user_id: int, days: int, page: dict, request: Request, response: Response) -> list:
+    """
+    One page of a user's logs, newest first, within the requested date window
+    The next page's cursor goes in the X-Next-Cursor and Link headers so the body stays a plain list.
+    """
+    stmt = select(model).where(
+        model.user_id == user_id,
+        *date_window(model.date, page["since"], page["until"], days)
+    )
+    try:
+        stmt = keyset_page(stmt, model.date, model.id, page["limit"], page["cursor"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logs, next_cursor = split_page(db.execute(stmt).scalars().all(), page["limit"])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return logs
+
+
 @app.post("/weight-log/{user_id}", response_model=WeightLogResponse)
-def log_weight(user_id: int, weight_log: WeightLogCreate, db: Session = Depends(get_db)):
+async def log_weight(user_id: int, weight_log: WeightLogCreate):
     """Log daily weight"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    async def write(db: AsyncSession):
+        await require_user(db, user_id)
+        
+        log = WeightLog(
+            user_id=user_id,
+            weight=weight_log.weight,
+            notes=weight_log.notes,
+            date=weight_log.date or date.today()
+        )
+        db.add(log)
+        await db.run_sync(on_logs_written, user_id, "weight", [{"date": log.date, "weight": log.weight}])
+        return log
     
-    log = WeightLog(
-        user_id=user_id,
-        weight=weight_log.weight,
-        notes=weight_log.notes,
-        date=weight_log.date or date.today()
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    return await run_write(write)
 
 
 @app.get("/weight-log/{user_id}", response_model=list[WeightLogResponse])
-def get_weight_logs(user_id: int, days: int = 30, db: Session = Depends(get_db)):
-    """Get weight logs for the last N days"""
-    logs = db.query(WeightLog).filter(
-        WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.desc()).limit(days).all()
-    return logs
+def get_weight_logs(
+    user_id: int,
+    request: Request,
+    response: Response,
+    days: int = Query(WEIGHT_LOG_DAYS, ge=1),
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    """Get weight logs for the last N days (or since/until), paginated"""
+    return list_logs(db, WeightLog, user_id, days, page, request, response)
 
 
 @app.post("/hydration-log/{user_id}", response_model=HydrationLogResponse)
-def log_hydration(user_id: int, hydration_log: HydrationLogCreate, db: Session = Depends(get_db)):
-    """Log daily hydration"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Check if log exists for today
-    today = hydration_log.date or date.today()
-    existing = db.query(HydrationLog).filter(
-        HydrationLog.user_id == user_id,
-        HydrationLog.date == today
-    ).first()
-    
-    if existing:
-        existing.glasses += hydration_log.glasses
-        db.commit()
-        db.refresh(existing)
-        return existing
+async def log_hydration(user_id: int, hydration_log: HydrationLogCreate):
+    """Log daily hydration (adds to the day's total)"""
+    async def write(db: AsyncSession):
+        await require_user(db, user_id)
+        
+        row = {"date": hydration_log.date or date.today(), "glasses": hydration_log.glasses}
+        
+        # Atomic increment of the day's row, inserting it if missing
+        stmt = hydration_upsert(db.bind.dialect.name).values(
+            user_id=user_id, **row
+        ).returning(HydrationLog)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        await db.run_sync(on_logs_written, user_id, "hydration", [row])
+        return result.scalars().one()
     
-    log = HydrationLog(
-        user_id=user_id,
-        glasses=hydration_log.glasses,
-        date=today
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    return await run_write(write)
 
 
 @app.get("/hydration-log/{user_id}", response_model=list[HydrationLogResponse])
-def get_hydration_logs(user_id: int, days: int = 7, db: Session = Depends(get_db)):
-    """Get hydration logs for the last N days"""
-    logs = db.query(HydrationLog).filter(
-        HydrationLog.user_id == user_id
-    ).order_by(HydrationLog.date.desc()).limit(days).all()
-    return logs
+def get_hydration_logs(
+    user_id: int,
+    request: Request,
+    response: Response,
+    days: int = Query(LOG_DAYS, ge=1),
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    """Get hydration logs for the last N days (or since/until), paginated"""
+    return list_logs(db, HydrationLog, user_id, days, page, request, response)
 
 
 @app.post("/calorie-log/{user_id}", response_model=CalorieLogResponse)
-def log_calories(user_id: int, calorie_log: CalorieLogCreate, db: Session = Depends(get_db)):
+async def log_calories(user_id: int, calorie_log: CalorieLogCreate):
     """Log calorie intake"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    async def write(db: AsyncSession):
+        await require_user(db, user_id)
+        
+        log = CalorieLog(
+            user_id=user_id,
+            calories=calorie_log.calories,
+            meal_type=calorie_log.meal_type,
+            description=calorie_log.description,
+            date=calorie_log.date or date.today()
+        )
+        db.add(log)
+        await db.run_sync(on_logs_written, user_id, "calorie", [{"date": log.date, "calories": log.calories}])
+        return log
     
-    log = CalorieLog(
-        user_id=user_id,
-        calories=calorie_log.calories,
-        meal_type=calorie_log.meal_type,
-        description=calorie_log.description,
-        date=calorie_log.date or date.today()
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    return await run_write(write)
 
 
 @app.get("/calorie-log/{user_id}", response_model=list[CalorieLogResponse])
-def get_calorie_logs(user_id: int, days: int = 7, db: Session = Depends(get_db)):
-    """Get calorie logs for the last N days"""
-    logs = db.query(CalorieLog).filter(
-        CalorieLog.user_id == user_id
-    ).order_by(CalorieLog.date.desc(), CalorieLog.created_at.desc()).limit(days * 10).all()
-    return logs
+def get_calorie_logs(
+    user_id: int,
+    request: Request,
+    response: Response,
+    days: int = Query(LOG_DAYS, ge=1),
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    """Get calorie logs for the last N days (or since/until), paginated"""
+    return list_logs(db, CalorieLog, user_id, days, page, request, response)
 
 
 @app.post("/exercise-log/{user_id}", response_model=ExerciseLogResponse)
-def log_exercise(user_id: int, exercise_log: ExerciseLogCreate, db: Session = Depends(get_db)):
+async def log_exercise(user_id: int, exercise_log: ExerciseLogCreate):
     """Log exercise"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    async def write(db: AsyncSession):
+        await require_user(db, user_id)
+        
+        log = ExerciseLog(
+            user_id=user_id,
+            exercise_name=exercise_log.exercise_name,
+            duration_minutes=exercise_log.duration_minutes,
+            calories_burned=exercise_log.calories_burned,
+            date=exercise_log.date or date.today()
+        )
+        db.add(log)
+        await db.run_sync(
+            on_logs_written, user_id, "exercise",
+            [{"date": log.date, "duration_minutes": log.duration_minutes}]
+        )
+        return log
     
-    log = ExerciseLog(
-        user_id=user_id,
-        exercise_name=exercise_log.exercise_name,
-        duration_minutes=exercise_log.duration_minutes,
-        calories_burned=exercise_log.calories_burned,
-        date=exercise_log.date or date.today()
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+    return await run_write(write)
 
 
 @app.get("/exercise-log/{user_id}", response_model=list[ExerciseLogResponse])
-def get_exercise_logs(user_id: int, days: int = 7, db: Session = Depends(get_db)):
-    """Get exercise logs for the last N days"""
-    logs = db.query(ExerciseLog).filter(
-        ExerciseLog.user_id == user_id
-    ).order_by(ExerciseLog.date.desc(), ExerciseLog.created_at.desc()).limit(days * 10).all()
-    return logs
+def get_exercise_logs(
+    user_id: int,
+    request: Request,
+    response: Response,
+    days: int = Query(LOG_DAYS, ge=1),
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    """Get exercise logs for the last N days (or since/until), paginated"""
+    return list_logs(db, ExerciseLog, user_id, days, page, request, response)
 
 
-@app.get("/progress/{user_id}", response_model=ProgressStats)
-def get_progress_stats(user_id: int, db: Session = Depends(get_db)):
-    """Get comprehensive progress statistics"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+@app.post("/logs/batch/{user_id}", response_model=LogBatchResponse)
+async def log_batch(user_id: int, batch: LogBatchRequest):
+    """
+    Log many weight/calorie/hydration/exercise entries in one request
     
-    today = date.today()
+    Each entry is {"type": "weight" | "calorie" | "hydration" | "exercise", ...}
+    with the same fields as the single-entry endpoints. Valid entries are
+    bulk-inserted in one transaction; invalid ones are reported per item
+    and skipped.
+    """
+    if len(batch.entries) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.entries)} entries (max {MAX_BATCH_SIZE})"
+        )
     
-    # Get latest weight
-    latest_weight = db.query(WeightLog).filter(
-        WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.desc()).first()
+    # Validate before queueing so the writer only does inserts
+    rows_by_type, results = prepare_log_batch(batch.entries)
     
-    # Get first weight for comparison
-    first_weight = db.query(WeightLog).filter(
-        WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.asc()).first()
+    if rows_by_type:
+        async def write(db: AsyncSession):
+            await require_user(db, user_id)
+            return await db.run_sync(write_log_batch, user_id, rows_by_type, results)
+        
+        results = await run_write(write)
     
-    weight_change = None
-    if latest_weight and first_weight:
-        weight_change = latest_weight.weight - first_weight.weight
+    created = sum(1 for result in results if result["status"] == "created")
+    return LogBatchResponse(
+        created=created,
+        invalid=len(results) - created,
+        results=results
+    )
+
+
+@app.post("/import/{user_id}")
+async def import_log_file(
+    user_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Import historical logs from a CSV or NDJSON request body
     
-    # Get today's hydration
-    hydration_today = db.query(func.sum(HydrationLog.glasses)).filter(
-        HydrationLog.user_id == user_id,
-        HydrationLog.date == today
-    ).scalar() or 0
+    The format comes from `format` or the Content-Type (text/csv means CSV).
+    `type` is the log type for rows without one. Rows already stored for the
+    user are skipped as duplicates; invalid rows are reported by line.
+    """
+    await require_user(db, user_id)
+    await db.close()  # don't hold a pooled connection while the upload streams in
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
     
-    # Get today's calories
-    calories_today = db.query(func.sum(CalorieLog.calories)).filter(
-        CalorieLog.user_id == user_id,
-        CalorieLog.date == today
-    ).scalar() or 0
+    # Spool the upload (to disk past 1 MB) so the importer can stream it line by line
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_IMPORT_BYTES:
+            spool.close()
+            raise HTTPException(status_code=413, detail=f"Import too large (max {MAX_IMPORT_BYTES} bytes)")
+        spool.write(chunk)
+    spool.seek(0)
     
-    # Get today's exercise
-    exercise_today = db.query(func.sum(ExerciseLog.duration_minutes)).filter(
-        ExerciseLog.user_id == user_id,
-        ExerciseLog.date == today
-    ).scalar() or 0
+    lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    try:
+        return await run_in_threadpool(import_logs, lines, user_id, fmt, type)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        # Unknown type, or a file that isn't UTF-8 (chunks before the bad bytes stay imported)
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        lines.close()
+
+
+@app.get("/export/{user_id}")
+def export_logs(
+    user_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    types: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a user's full log history as NDJSON or CSV
+    `types` is a comma separated subset of weight,calorie,hydration,exercise (default: all).
+    """
+    if db.query(User.id).filter(User.id == user_id).first() is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        log_types = parse_export_types(types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Get weight history (last 30 days)
-    weight_history = db.query(WeightLog).filter(
-        WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.desc()).limit(30).all()
+    rows = (iter_csv if format == "csv" else iter_ndjson)(user_id, log_types, since, until)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="user-{user_id}-logs.{format}"'}
+    )
+
+
+@app.get("/progress/{user_id}", response_model=ProgressStats)
+def get_progress_stats(user_id: int, db: Session = Depends(get_db)):
+    """
+    Get comprehensive progress statistics
     
-    # Get hydration history (last 7 days)
-    hydration_history = db.query(HydrationLog).filter(
-        HydrationLog.user_id == user_id
-    ).order_by(HydrationLog.date.desc()).limit(7).all()
+    Two queries: today's totals come from the daily_user_summary rollup
+    (maintained by the log endpoints), fetched together with the user in one
+    primary-key lookup; the weight and hydration histories, and the first
+    weight for weight_change, come from one windowed query.
+    """
+    today = date.today()
+    
+    row = db.query(User.id, DailyUserSummary).outerjoin(
+        DailyUserSummary,
+        (DailyUserSummary.user_id == User.id) & (DailyUserSummary.date == today)
+    ).filter(User.id == user_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    summary = row.DailyUserSummary
+    
+    # Last 30 weights and last 7 hydration days, each ranked newest first
+    weights = select(
+        literal("weight").label("kind"), WeightLog.id, WeightLog.date, WeightLog.weight, WeightLog.notes,
+        null().label("glasses"),
+        func.first_value(WeightLog.weight).over(order_by=(WeightLog.date.asc(), WeightLog.id.asc())).label("first_weight"),
+        func.row_number().over(order_by=(WeightLog.date.desc(), WeightLog.id.desc())).label("rank")
+    ).where(WeightLog.user_id == user_id)
+    hydration = select(
+        literal("hydration"), HydrationLog.id, HydrationLog.date, null(), null(), HydrationLog.glasses, null(),
+        func.row_number().over(order_by=(HydrationLog.date.desc(), HydrationLog.id.desc()))
+    ).where(HydrationLog.user_id == user_id)
+    ranked = union_all(weights, hydration).subquery()
+    history = db.execute(
+        select(ranked).where(
+            ((ranked.c.kind == "weight") & (ranked.c.rank <= 30))
+            | ((ranked.c.kind == "hydration") & (ranked.c.rank <= 7))
+        ).order_by(ranked.c.kind, ranked.c.rank)
+    ).all()
+    
+    weight_history = [
+        {"id": r.id, "user_id": user_id, "weight": r.weight, "date": r.date, "notes": r.notes}
+        for r in history if r.kind == "weight"
+    ]
+    hydration_history = [
+        {"id": r.id, "user_id": user_id, "glasses": r.glasses, "date": r.date}
+        for r in history if r.kind == "hydration"
+    ]
+    
+    weight_change = None
+    if weight_history:
+        first_weight = next(r.first_weight for r in history if r.kind == "weight")
+        weight_change = weight_history[0]["weight"] - first_weight
     
     return ProgressStats(
-        current_weight=latest_weight.weight if latest_weight else None,
+        current_weight=weight_history[0]["weight"] if weight_history else None,
         weight_change=weight_change,
-        total_hydration_today=hydration_today,
-        total_calories_today=calories_today,
-        total_exercise_minutes_today=exercise_today,
+        total_hydration_today=summary.hydration_glasses if summary else 0,
+        total_calories_today=summary.calories if summary else 0,
+        total_exercise_minutes_today=summary.exercise_minutes if summary else 0,
         weight_history=weight_history,
         hydration_history=hydration_history
     )
 
 
+# ========== DASHBOARD ENDPOINT ==========
+
+DASHBOARD_FIELDS = (
+    "user",
+    "weight_logs",
+    "calorie_logs",
+    "hydration_logs",
+    "exercise_logs",
+    "calorie_prediction"
+)
+
+
+@app.get("/dashboard/{user_id}")
+def get_dashboard(user_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Get everything the dashboard needs in a single request
+    
+    Replaces the separate /user, log and /predictions/calories calls made on
+    page load. All sections are read from one session, and the log sections
+    match the GET log endpoints with their default `days`. Pass `fields` as a
+    comma-separated list (e.g. `fields=user,calorie_logs`) to return only
+    those sections.
+    """
+    if fields:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - set(DASHBOARD_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown dashboard fields: {', '.join(sorted(unknown))}"
+            )
+    else:
+        requested = set(DASHBOARD_FIELDS)
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Use the batch-computed predictions when available; otherwise compute live
+    cached = get_cached_predictions(db, user_id) if "calorie_prediction" in requested else None
+    compute_prediction = "calorie_prediction" in requested and not cached
+    dashboard = {"user_id": user_id}
+    
+    if "user" in requested:
+        dashboard["user"] = user_profile(user)
+    
+    def recent_logs(model, days: int):
+        # What the GET log endpoint returns by default: the last `days` days, newest first, first page
+        return db.query(model).filter(
+            model.user_id == user_id, *date_window(model.date, None, None, days)
+        ).order_by(model.date.desc(), model.id.desc())
+    
+    # The prediction needs the full weight history, so load it once and
+    # take the section's window from it instead of querying twice
+    weight_logs = []
+    if compute_prediction:
+        weight_logs = db.query(WeightLog).filter(
+            WeightLog.user_id == user_id
+        ).order_by(WeightLog.date.asc(), WeightLog.id.asc()).all()
+        if "weight_logs" in requested:
+            since = window_start(WEIGHT_LOG_DAYS)
+            dashboard["weight_logs"] = [
+                WeightLogResponse.model_validate(log)
+                for log in reversed(weight_logs) if log.date >= since
+            ][:DEFAULT_PAGE_SIZE]
+    elif "weight_logs" in requested:
+        dashboard["weight_logs"] = [
+            WeightLogResponse.model_validate(log)
+            for log in recent_logs(WeightLog, WEIGHT_LOG_DAYS).limit(DEFAULT_PAGE_SIZE)
+        ]
+    
+    # The prediction uses the 30 latest calorie logs, whatever their dates;
+    # the section's window already holds them unless it has fewer than 30
+    prediction_calorie_logs = []
+    if "calorie_logs" in requested:
+        calorie_logs = recent_logs(CalorieLog, LOG_DAYS).limit(max(DEFAULT_PAGE_SIZE, 30)).all()
+        dashboard["calorie_logs"] = [
+            CalorieLogResponse.model_validate(log) for log in calorie_logs[:DEFAULT_PAGE_SIZE]
+        ]
+        prediction_calorie_logs = calorie_logs[:30]
+    if compute_prediction and len(prediction_calorie_logs) < 30:
+        prediction_calorie_logs = db.query(CalorieLog).filter(
+            CalorieLog.user_id == user_id
+        ).order_by(CalorieLog.date.desc(), CalorieLog.id.desc()).limit(30).all()
+    
+    if "hydration_logs" in requested:
+        dashboard["hydration_logs"] = [
+            HydrationLogResponse.model_validate(log)
+            for log in recent_logs(HydrationLog, LOG_DAYS).limit(DEFAULT_PAGE_SIZE)
+        ]
+    
+    if "exercise_logs" in requested:
+        dashboard["exercise_logs"] = [
+            ExerciseLogResponse.model_validate(log)
+            for log in recent_logs(ExerciseLog, LOG_DAYS).limit(DEFAULT_PAGE_SIZE)
+        ]
+    
+    if cached:
+        dashboard["calorie_prediction"] = calorie_prediction_from_report(cached["body"])
+    elif compute_prediction:
+        dashboard["calorie_prediction"] = build_calorie_prediction(
+            user, weight_logs, prediction_calorie_logs
+        )
+    
+    return dashboard
+
+
 # ========== PREDICTION ENDPOINTS ==========
 
 @app.get("/predictions/weight/{user_id}")
@@ -474,7 +857,7 @@ def get_weight_predictions(user_id: int, db: Session = Depends(get_db)):
     # Get weight history
     weight_logs = db.query(WeightLog).filter(
         WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.asc()).all()
+    ).order_by(WeightLog.date.asc(), WeightLog.id.asc()).all()
     
     if not weight_logs:
         return {
@@ -505,6 +888,10 @@ def get_calorie_predictions(user_id: int, db: Session = Depends(get_db)):
     Get intelligent calorie recommendations based on progress
     Adjusts recommendations based on actual results
     """
+    cached = get_cached_predictions(db, user_id)
+    if cached:
+        return calorie_prediction_from_report(cached["body"])
+    
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -512,12 +899,70 @@ def get_calorie_predictions(user_id: int, db: Session = Depends(get_db)):
     # Get historical data
     weight_logs = db.query(WeightLog).filter(
         WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.asc()).all()
+    ).order_by(WeightLog.date.asc(), WeightLog.id.asc()).all()
     
     calorie_logs = db.query(CalorieLog).filter(
         CalorieLog.user_id == user_id
-    ).order_by(CalorieLog.date.desc()).limit(30).all()
+    ).order_by(CalorieLog.date.desc(), CalorieLog.id.desc()).limit(30).all()
     
+    return build_calorie_prediction(user, weight_logs, calorie_logs)
+
+
+def get_cached_predictions(db: Session, user_id: int) -> Optional[dict]:
+    """
+    Cached comprehensive predictions, if still valid
+    Checks the in-memory cache, then the rows precomputed by batch_predictions.py
+    Returns a cache entry (body, etag, last_modified)
+    """
+    cached = prediction_cache.get(user_id)
+    if cached:
+        return cached
+    
+    generation = prediction_cache.generation(user_id)
+    row = db.query(PredictionCache.payload, PredictionCache.computed_at).filter(
+        PredictionCache.user_id == user_id
+    ).first()
+    # Rows without a payload are invalidation tombstones
+    if not row or row.payload is None:
+        return None
+    return prediction_cache.set(
+        user_id, json.loads(row.payload), generation,
+        last_modified=row.computed_at.replace(tzinfo=timezone.utc)
+    )
+
+
+def not_modified(request: Request, cached: dict) -> bool:
+    """Whether the request's conditional headers match the cached entry"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as the ETags are weak
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or cached["etag"].removeprefix("W/") in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return cached["last_modified"] <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def calorie_prediction_from_report(report: dict) -> dict:
+    """The /predictions/calories body, taken from a comprehensive prediction report"""
+    return {
+        "user_id": report["user_id"],
+        "prediction": report["predictions"]["calorie_prediction"],
+        "current_bmr": report["user_profile"]["bmr"],
+        "goal": report["user_profile"]["goal"]
+    }
+
+
+def build_calorie_prediction(user: User, weight_logs: list, calorie_logs: list) -> dict:
+    """
+    Build the calorie prediction payload from already-loaded rows
+    weight_logs must be ordered oldest first
+    """
     weight_history = [{"date": log.date, "weight": log.weight} for log in weight_logs]
     calorie_history = [{"date": log.date, "calories": log.calories} for log in calorie_logs]
     
@@ -537,7 +982,7 @@ def get_calorie_predictions(user_id: int, db: Session = Depends(get_db)):
     prediction = get_calorie_prediction(user_data, weight_history, calorie_history)
     
     return {
-        "user_id": user_id,
+        "user_id": user.id,
         "prediction": prediction,
         "current_bmr": bmr,
         "goal": user.health_goal
@@ -545,7 +990,7 @@ def get_calorie_predictions(user_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/predictions/comprehensive/{user_id}")
-def get_all_predictions(user_id: int, db: Session = Depends(get_db)):
+def get_all_predictions(user_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Get comprehensive predictions including:
     - Weight trends and forecasts
@@ -554,27 +999,50 @@ def get_all_predictions(user_id: int, db: Session = Depends(get_db)):
     - Exercise adherence analysis
     - Meal timing recommendations
     - Plateau risk assessment
+    
+    Responses carry ETag/Last-Modified; a matching conditional request gets a 304
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    with stage_timer("prediction_cache_lookup"):
+        cached = get_cached_predictions(db, user_id)
+    if not cached:
+        generation = prediction_cache.generation(user_id)
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        report = jsonable_encoder(build_prediction_report(db, user))
+        cached = prediction_cache.set(user_id, report, generation)
+    
+    headers = {
+        "ETag": cached["etag"],
+        "Last-Modified": format_datetime(cached["last_modified"], usegmt=True),
+        "Cache-Control": "private, no-cache"
+    }
+    if not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(cached["body"], headers=headers)
+
+
+@timed
+def build_prediction_report(db: Session, user: User) -> dict:
+    """Compute the comprehensive prediction report from the user's logs"""
+    user_id = user.id
     
     # Gather all historical data
     weight_logs = db.query(WeightLog).filter(
         WeightLog.user_id == user_id
-    ).order_by(WeightLog.date.asc()).all()
+    ).order_by(WeightLog.date.asc(), WeightLog.id.asc()).all()
     
     calorie_logs = db.query(CalorieLog).filter(
         CalorieLog.user_id == user_id
-    ).order_by(CalorieLog.date.desc()).limit(30).all()
+    ).order_by(CalorieLog.date.desc(), CalorieLog.id.desc()).limit(30).all()
     
     exercise_logs = db.query(ExerciseLog).filter(
         ExerciseLog.user_id == user_id
-    ).order_by(ExerciseLog.date.desc()).limit(30).all()
+    ).order_by(ExerciseLog.date.desc(), ExerciseLog.id.desc()).limit(30).all()
     
     hydration_logs = db.query(HydrationLog).filter(
         HydrationLog.user_id == user_id
-    ).order_by(HydrationLog.date.desc()).limit(7).all()
+    ).order_by(HydrationLog.date.desc(), HydrationLog.id.desc()).limit(7).all()
     
     # Prepare data structures
     historical_data = {
@@ -592,6 +1060,7 @@ def get_all_predictions(user_id: int, db: Session = Depends(get_db)):
     bmr = calculate_bmr(user.age, user.gender, user.weight, user.height)
     
     user_data = {
+        "id": user.id,
         "bmr": bmr,
         "age": user.age,
         "gender": user.gender,
@@ -602,33 +1071,8 @@ def get_all_predictions(user_id: int, db: Session = Depends(get_db)):
         "food_preferences": user.food_preferences
     }
     
-    # Get comprehensive predictions
-    predictions = get_comprehensive_predictions(user_data, historical_data)
-    
-    # Calculate success probability
-    engine = PredictionEngine()
-    adherence_data = {
-        "exercise_adherence": predictions['exercise_adherence']['adherence_rate'],
-        "diet_adherence": 75,  # Default estimate
-        "logging_consistency": (len(weight_logs) / 30) * 100 if len(weight_logs) > 0 else 0
-    }
-    
-    success_prediction = engine.predict_success_probability(user_data, adherence_data)
-    
-    return {
-        "user_id": user_id,
-        "user_profile": {
-            "age": user.age,
-            "gender": user.gender,
-            "weight": user.weight,
-            "height": user.height,
-            "goal": user.health_goal,
-            "bmr": bmr
-        },
-        "predictions": predictions,
-        "success_prediction": success_prediction,
-        "generated_at": datetime.now().isoformat()
-    }
+    # Comprehensive predictions plus success probability
+    return get_prediction_report(user_data, historical_data)
 
 
 @app.get("/recommendations/{user_id}")
@@ -714,9 +1158,9 @@ def get_smart_recommendations(user_id: int, db: Session = Depends(get_db)):
         })
     
     # Hydration recommendation
-    recent_hydration = db.query(func.sum(HydrationLog.glasses)).filter(
-        HydrationLog.user_id == user_id,
-        HydrationLog.date == date.today()
+    recent_hydration = db.query(DailyUserSummary.hydration_glasses).filter(
+        DailyUserSummary.user_id == user_id,
+        DailyUserSummary.date == date.today()
     ).scalar() or 0
     
     if recent_hydration < 6:
@@ -0,0 +1,283 @@
+"""
+Microbenchmarks with scaling curves
+
+Times every public PredictionEngine method plus the planner's
+generate_meal and generate_python_diet_plan over growing input sizes, and
+records peak memory (tracemalloc) per call. For each benchmark a scaling
+exponent k (time ~ size^k) is fitted over the largest sizes, where fixed
+overhead no longer dominates: a linear method sits near 1, so a quadratic
+loop (like the old per-point variance in predict_weight_trend) stands out
+long before it hurts in production.
+
+Size means history points for methods that take a history (1e6 points is
+~2,700 years of daily logs, i.e. many users' worth). Methods without one,
+and the planner, are timed over `size` calls on a fixed input instead, so
+their time per call should stay flat (k near 1); those stop at a lower
+max size since each call costs microseconds to milliseconds.
+
+Timings are the best of several runs (at least MIN_REPEATS, until
+MIN_TIME seconds); memory is measured in a separate run, since tracemalloc
+slows code down. Inputs are built before timing and not counted.
+
+Exits with status 1 when an exponent exceeds --max-exponent, or with
+--baseline when the time at the largest size both runs share grew by more
+than --threshold.
+
+Usage:
+    python microbench.py [--only predict_weight_trend,generate_meal] [--max-size 1000000]
+                         [--output curves.json] [--baseline old.json] [--threshold 0.25]
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+from calculations import calculate_macros
+from prediction_engine import PredictionEngine
+from python_planner import generate_meal, generate_python_diet_plan
+
+SIZES = [10, 100, 1000, 10_000, 100_000, 1_000_000]
+MIN_REPEATS = 3
+MIN_TIME = 0.2  # seconds of repeated runs per size, once MIN_REPEATS are done
+MAX_REPEATS = 100
+# Points (from the largest size down) used to fit the scaling exponent
+FIT_POINTS = 3
+MAX_EXPONENT = 1.3  # n log n still passes; n^2 is far over
+
+USER_DATA = {
+    "age": 30, "gender": "male", "height": 180, "weight": 82, "bmr": 1800,
+    "activity_level": "moderately_active", "health_goal": "weight_loss",
+    "food_preferences": "balanced", "allergies": "nuts",
+}
+DAILY_CALORIES = 2200
+MACROS = calculate_macros(DAILY_CALORIES, "weight_loss")
+ADHERENCE = {"exercise_adherence": 55, "diet_adherence": 75, "logging_consistency": 40}
+
+
+class Benchmark(NamedTuple):
+    """`setup(size)` builds the arguments, `run(*arguments)` is what gets timed"""
+    unit: str  # "points" (history length) or "calls" (repeated calls)
+    setup: Callable
+    run: Callable
+    max_size: int
+
+
+def weight_history(size: int) -> List[dict]:
+    """Daily weights on a noisy downward trend (starting over every 1,000 days)"""
+    _, weights = weight_arrays(size)
+    start = date(2000, 1, 1)
+    return [{"date": start + timedelta(days=i), "weight": round(w, 1)} for i, w in enumerate(weights.tolist())]
+
+
+def weight_arrays(size: int):
+    """(datetime64 dates, weights) for weight_history(size)"""
+    rng = np.random.default_rng(size)
+    weights = 90 - (0.03 * np.arange(size)) % 30 + rng.normal(0, 0.4, size)
+    return np.datetime64("2000-01-01") + np.arange(size).astype("timedelta64[D]"), weights
+
+
+def calorie_logs(size: int) -> List[dict]:
+    """Three meals a day"""
+    rng = random.Random(size)
+    start = date(2000, 1, 1)
+    return [{"date": start + timedelta(days=i // 3), "calories": rng.randint(300, 900),
+             "meal_type": ("breakfast", "lunch", "dinner")[i % 3]} for i in range(size)]
+
+
+def exercise_logs(size: int) -> List[dict]:
+    """One workout a day"""
+    rng = random.Random(size)
+    start = date(2000, 1, 1)
+    return [{"date": start + timedelta(days=i), "duration_minutes": rng.randint(20, 60)} for i in range(size)]
+
+
+def grouped_rows(size: int):
+    """(user_ids, dates, weights) for `size` rows over one user per year of data, grouped and date ordered"""
+    users = size // 365 + 1
+    user_ids = np.repeat(np.arange(users), -(-size // users))[:size]
+    dates = np.datetime64("2000-01-01") + (np.arange(size) - np.searchsorted(user_ids, user_ids)).astype("timedelta64[D]")
+    weights = 80 + np.random.default_rng(size).normal(0, 0.5, size).cumsum() / 10
+    return user_ids, dates, weights
+
+
+def repeated(func: Callable, *args, **kwargs) -> Callable:
+    """Run function making `size` calls of func(*args, **kwargs)"""
+    def run(size):
+        for _ in range(size):
+            func(*args, **kwargs)
+    return run
+
+
+def build_benchmarks() -> Dict[str, Benchmark]:
+    engine = PredictionEngine()
+    return {
+        # History inputs: one call over `size` points
+        "predict_weight_trend": Benchmark(
+            "points", lambda n: (weight_history(n),), engine.predict_weight_trend, 1_000_000),
+        "predict_weight_trend_arrays": Benchmark(
+            "points", weight_arrays, engine.predict_weight_trend_arrays, 1_000_000),
+        "predict_weight_trends_grouped": Benchmark(
+            "points", grouped_rows, engine.predict_weight_trends_grouped, 1_000_000),
+        "predict_calorie_needs": Benchmark(
+            "points", lambda n: (USER_DATA, weight_history(n), calorie_logs(n)), engine.predict_calorie_needs, 1_000_000),
+        "predict_meal_preferences": Benchmark(
+            "points", lambda n: (USER_DATA, calorie_logs(n)), engine.predict_meal_preferences, 1_000_000),
+        "predict_exercise_adherence": Benchmark(
+            "points", lambda n: (exercise_logs(n),), engine.predict_exercise_adherence, 1_000_000),
+        "predict_plateau_risk": Benchmark(
+            "points", lambda n: (weight_history(n), calorie_logs(n)), engine.predict_plateau_risk, 1_000_000),
+        "predict_plateau_risks_grouped": Benchmark(
+            "points", lambda n: grouped_rows(n)[::2], engine.predict_plateau_risks_grouped, 1_000_000),
+        # No history: `size` calls on a fixed input
+        "predict_hydration_needs": Benchmark(
+            "calls", lambda n: (n,), repeated(engine.predict_hydration_needs, USER_DATA, "moderate"), 1_000_000),
+        "predict_macro_distribution": Benchmark(
+            "calls", lambda n: (n,), repeated(engine.predict_macro_distribution, "muscle_gain", {"energy_level": "low"}),
+            1_000_000),
+        "predict_optimal_meal_timing": Benchmark(
+            "calls", lambda n: (n,), repeated(engine.predict_optimal_meal_timing, USER_DATA), 1_000_000),
+        "predict_success_probability": Benchmark(
+            "calls", lambda n: (n,), repeated(engine.predict_success_probability, USER_DATA, ADHERENCE), 1_000_000),
+        "generate_meal[random]": Benchmark(
+            "calls", lambda n: (n,), repeated(generate_meal, "lunch", 700, 50, 70, 20, False, ["nuts"],
+                                              rng=random.Random(0)), 100_000),
+        "generate_meal[solver]": Benchmark(
+            "calls", lambda n: (n,), repeated(generate_meal, "lunch", 700, 50, 70, 20, False, ["nuts"],
+                                              mode="solver", rng=random.Random(0)), 1_000),
+        "generate_python_diet_plan[random]": Benchmark(
+            "calls", lambda n: (n,), repeated(generate_python_diet_plan, USER_DATA, DAILY_CALORIES, MACROS,
+                                              mode="random", seed=0), 10_000),
+        "generate_python_diet_plan[solver]": Benchmark(
+            "calls", lambda n: (n,), repeated(generate_python_diet_plan, USER_DATA, DAILY_CALORIES, MACROS,
+                                              mode="solver", seed=0), 1_000),
+    }
+
+
+def measure(benchmark: Benchmark, size: int) -> dict:
+    """Best time and peak traced memory of one run at `size`"""
+    args = benchmark.setup(size)
+    times = []
+    while len(times) < MIN_REPEATS or (sum(times) < MIN_TIME and len(times) < MAX_REPEATS):
+        gc.collect()
+        started = time.perf_counter()
+        benchmark.run(*args)
+        times.append(time.perf_counter() - started)
+        # One run of a slow size is enough to place it on the curve
+        if times[0] > 5:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"size": size, "seconds": min(times), "repeats": len(times), "peak_bytes": peak}
+
+
+def scaling_exponent(points: List[dict]):
+    """Slope of log(time) over log(size) for the largest FIT_POINTS sizes (None with fewer than 2)"""
+    tail = points[-FIT_POINTS:]
+    if len(tail) < 2:
+        return None
+    slope, _ = np.polyfit(np.log([p["size"] for p in tail]), np.log([max(p["seconds"], 1e-9) for p in tail]), 1)
+    return round(float(slope), 2)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Benchmarks slower than the baseline by more than `threshold` at the largest shared size"""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        before = {p["size"]: p for p in baseline.get("benchmarks", {}).get(name, {}).get("points", [])}
+        shared = [p for p in result["points"] if p["size"] in before]
+        if not shared:
+            continue
+        after = shared[-1]
+        old = before[after["size"]]["seconds"]
+        if old and after["seconds"] > old * (1 + threshold):
+            regressions.append(f"{name} @ {after['size']:,}: {old * 1000:.3f} -> {after['seconds'] * 1000:.3f} ms "
+                               f"(+{(after['seconds'] / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time prediction and planner functions over growing input sizes")
+    parser.add_argument("--only", default=None, help="comma separated benchmark names (default: all)")
+    parser.add_argument("--max-size", type=int, default=SIZES[-1], help="largest size for any benchmark")
+    parser.add_argument("--output", default=None, help="write the curves as JSON here")
+    parser.add_argument("--baseline", default=None, help="curves JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    parser.add_argument("--max-exponent", type=float, default=MAX_EXPONENT, help="flag steeper scaling than this")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks()
+    names = args.only.split(",") if args.only else list(benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        sys.exit(f"❌ Unknown benchmark(s) {', '.join(unknown)}; expected {', '.join(benchmarks)}")
+
+    results = {"created_at": datetime.utcnow().isoformat(), "max_exponent": args.max_exponent, "benchmarks": {}}
+    for name in names:
+        benchmark = benchmarks[name]
+        sizes = [size for size in SIZES if size <= min(benchmark.max_size, args.max_size)]
+        print(f"\n⏱️  {name} ({benchmark.unit})")
+        print(f"{'size':>10} {'time ms':>12} {'per item us':>12} {'peak mem':>10}")
+        points = []
+        for size in sizes:
+            point = measure(benchmark, size)
+            points.append(point)
+            print(f"{size:>10,} {point['seconds'] * 1000:>12.3f} {point['seconds'] / size * 1e6:>12.3f} "
+                  f"{format_bytes(point['peak_bytes']):>10}")
+        exponent = scaling_exponent(points)
+        results["benchmarks"][name] = {"unit": benchmark.unit, "points": points, "exponent": exponent}
+        if exponent is not None:
+            print(f"   scaling exponent {exponent:.2f}")
+
+    steep = [(name, result["exponent"]) for name, result in results["benchmarks"].items()
+             if result["exponent"] is not None and result["exponent"] > args.max_exponent]
+
+    print(f"\n{'benchmark':<36} {'exponent':>9}")
+    for name, result in results["benchmarks"].items():
+        exponent = result["exponent"]
+        flag = "  ❌" if exponent is not None and exponent > args.max_exponent else ""
+        print(f"{name:<36} {'-' if exponent is None else f'{exponent:.2f}':>9}{flag}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Curves written to {args.output}")
+
+    failed = bool(steep)
+    if steep:
+        print(f"\n❌ {len(steep)} benchmark(s) scale worse than size^{args.max_exponent:g}: "
+              + ", ".join(f"{name} ({exponent:.2f})" for name, exponent in steep))
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            failed = True
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%} vs {args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+        else:
+            print(f"✅ No regressions over {args.threshold:.0%} vs {args.baseline}")
+    if failed:
+        sys.exit(1)
+    print("✅ All benchmarks within the scaling limit")
@@ -0,0 +1,125 @@
+"""
+Versioned schema migrations
+
+`Base.metadata.create_all` only creates missing tables, so it cannot add
+indexes or constraints to an existing diet_fitness.db. Each migration here
+runs once per database, in order, and the applied version is recorded in
+the `schema_version` table. Migrations must be safe to run on a freshly
+created database too (create_all has already built the latest schema).
+
+Run directly to migrate the configured database:
+    python migrations.py
+"""
+
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from database import (
+    WeightLog, HydrationLog, CalorieLog, ExerciseLog, Plan, PlanMeal, PlanItem, DailyUserSummary, PredictionCache
+)
+from log_store import rebuild_daily_summaries
+from plan_store import backfill_plan_rows
+
+
+def _log_table_indexes(conn: Connection):
+    """Add (user_id, date) indexes to all log tables and make hydration unique per day"""
+    # Merge duplicate hydration rows into the oldest one so the unique
+    # index can be created without losing any logged glasses
+    conn.execute(text("""
+        UPDATE hydration_logs
+        SET glasses = (
+            SELECT SUM(h2.glasses) FROM hydration_logs h2
+            WHERE h2.user_id = hydration_logs.user_id AND h2.date = hydration_logs.date
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM hydration_logs
+            GROUP BY user_id, date HAVING COUNT(*) > 1
+        )
+    """))
+    conn.execute(text("""
+        DELETE FROM hydration_logs
+        WHERE id NOT IN (SELECT MIN(id) FROM hydration_logs GROUP BY user_id, date)
+    """))
+    
+    for model in (WeightLog, HydrationLog, CalorieLog, ExerciseLog, Plan):
+        for index in model.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _daily_user_summary(conn: Connection):
+    """Create the daily rollup table and backfill it from existing logs"""
+    DailyUserSummary.__table__.create(conn, checkfirst=True)
+    rebuild_daily_summaries(conn)
+
+
+def _predictions_cache(conn: Connection):
+    """Create the table filled by the nightly batch prediction job"""
+    PredictionCache.__table__.create(conn, checkfirst=True)
+
+
+def _normalized_plans(conn: Connection):
+    """Add typed macro columns and plan_meals/plan_items, then copy the JSON plan data over"""
+    existing = {column["name"] for column in inspect(conn).get_columns(Plan.__tablename__)}
+    for column in ("protein_g", "carbs_g", "fats_g"):
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE plans ADD COLUMN {column} INTEGER"))
+    
+    PlanMeal.__table__.create(conn, checkfirst=True)
+    PlanItem.__table__.create(conn, checkfirst=True)
+    backfill_plan_rows(conn)
+
+
+def _prediction_cache_version(conn: Connection):
+    """Add the invalidation counter used by batch_predictions.py's conditional upsert"""
+    existing = {column["name"] for column in inspect(conn).get_columns(PredictionCache.__tablename__)}
+    if "version" not in existing:
+        conn.execute(text("ALTER TABLE predictions_cache ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+
+
+# (version, description, migration) - append only, never reorder
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "composite (user_id, date) indexes on log tables", _log_table_indexes),
+    (2, "daily_user_summary rollup table", _daily_user_summary),
+    (3, "predictions_cache table", _predictions_cache),
+    (4, "normalized plan storage (plan_meals, plan_items, macro columns)", _normalized_plans),
+    (5, "predictions_cache version column", _prediction_cache_version),
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Return the last applied migration version (0 for an unversioned database)"""
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Apply all pending migrations, each in its own transaction
+    
+    Returns:
+        The schema version after migrating
+    """
+    with engine.begin() as conn:
+        current = get_schema_version(conn)
+    
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+        print(f"✓ Applied migration {version}: {description}")
+        current = version
+    
+    return current
+
+
+if __name__ == "__main__":
+    from database import init_db, engine
+    
+    init_db()
+    with engine.connect() as conn:
+        print(f"✨ Database schema is at version {get_schema_version(conn)}")
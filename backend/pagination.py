@@ -0,0 +1,86 @@
+"""
+Keyset pagination for the listing endpoints
+
+Pages are ordered newest first on (key, id), where key is the row's date
+(logs) or created_at (plans) and id breaks ties. The cursor is an opaque
+token holding the last row's (key, id); the next page is simply the rows
+strictly below it, so each page is one index range scan of `limit` rows
+and costs the same on page 1 as on page 1000, unlike OFFSET.
+"""
+
+import base64
+import os
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.sql import Select
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+
+def encode_cursor(key, row_id: int) -> str:
+    """Opaque cursor for the row (key, row_id)"""
+    return base64.urlsafe_b64encode(f"{key.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type=date) -> Tuple:
+    """
+    (key, id) from a cursor made by encode_cursor
+    Raises ValueError if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        key, row_id = raw.split("|")
+        return key_type.fromisoformat(key), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def window_start(days: int, until: Optional[date] = None) -> date:
+    """First day of a window of `days` days ending at `until` (or today)"""
+    return (until or date.today()) - timedelta(days=days - 1)
+
+
+def date_window(column, since: Optional[date], until: Optional[date], days: Optional[int] = None) -> list:
+    """
+    Filters for since <= column <= until (both inclusive, either optional)
+    With no `since`, `days` gives a window of that many days ending at `until` (or today).
+    DateTime columns match whole days.
+    """
+    if since is None and days is not None:
+        since = window_start(days, until)
+
+    is_datetime = column.type.python_type is datetime
+    filters = []
+    if since is not None:
+        filters.append(column >= (datetime.combine(since, datetime.min.time()) if is_datetime else since))
+    if until is not None:
+        if is_datetime:
+            filters.append(column < datetime.combine(until + timedelta(days=1), datetime.min.time()))
+        else:
+            filters.append(column <= until)
+    return filters
+
+
+def keyset_page(stmt: Select, key_column, id_column, limit: int, cursor: Optional[str] = None) -> Select:
+    """
+    Restrict a select to one page, newest first
+    Fetches limit + 1 rows so split_page can tell whether another page exists.
+    """
+    if cursor:
+        key, row_id = decode_cursor(cursor, key_column.type.python_type)
+        # (key, id) < (:key, :id), spelled with a plain upper bound on key so the
+        # planner seeks the index there instead of scanning the user's whole range
+        stmt = stmt.where(key_column <= key, or_(key_column < key, id_column < row_id))
+    return stmt.order_by(key_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows: List, limit: int, key_attr: str = "date", id_attr: str = "id") -> Tuple[List, Optional[str]]:
+    """The page's rows and the cursor for the next page (None on the last page)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, key_attr), getattr(last, id_attr))
@@ -0,0 +1,180 @@
+"""
+Plan storage
+
+Plans keep their macros as integer columns on `plans`, one row per meal in
+plan_meals and one row per exercise or grocery entry in plan_items. The
+history endpoint builds its response straight from those rows, with no
+JSON parsing, and every write is a handful of executemany inserts.
+"""
+
+import json
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database import Plan, PlanMeal, PlanItem
+from pagination import date_window, keyset_page, split_page
+
+# Plan response list field -> plan_items.kind
+PLAN_ITEM_KINDS = {"exercises": "exercise", "grocery_list": "grocery"}
+MACRO_COLUMNS = {"protein": "protein_g", "carbs": "carbs_g", "fats": "fats_g"}
+
+BACKFILL_CHUNK = 1000
+
+
+def grams(value) -> Optional[int]:
+    """Macro string like "150g" as an int"""
+    if value is None:
+        return None
+    return int(float(str(value).strip().rstrip("g")))
+
+
+def plan_child_rows(plan_id: int, meal_plan: Dict[str, str], lists: Dict[str, List[str]]):
+    """plan_meals and plan_items rows for one plan"""
+    meals = [
+        {"plan_id": plan_id, "position": position, "meal_type": meal_type, "description": description}
+        for position, (meal_type, description) in enumerate(meal_plan.items())
+    ]
+    items = [
+        {"plan_id": plan_id, "kind": kind, "position": position, "text": text}
+        for field, kind in PLAN_ITEM_KINDS.items()
+        for position, text in enumerate(lists.get(field) or [])
+    ]
+    return meals, items
+
+
+def save_plans(session: Session, user_ids: List[int], bmrs: List[float], daily_calories: List[int],
+               macros: List[dict], ai_plans: List[dict], created_at: Optional[datetime] = None) -> List[int]:
+    """
+    Insert plans and their meals/items with one executemany per table
+    
+    Returns:
+        plan ids, in input order
+    """
+    created_at = created_at or datetime.utcnow()
+    plan_ids = session.execute(
+        insert(Plan).returning(Plan.id, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": user_id,
+                "bmr": bmr,
+                "daily_calories": calories,
+                **{column: grams(user_macros.get(key)) for key, column in MACRO_COLUMNS.items()},
+                "created_at": created_at
+            }
+            for user_id, bmr, calories, user_macros in zip(user_ids, bmrs, daily_calories, macros)
+        ]
+    ).scalars().all()
+    
+    meal_rows, item_rows = [], []
+    for plan_id, ai_plan in zip(plan_ids, ai_plans):
+        meals, items = plan_child_rows(plan_id, ai_plan["meal_plan"], ai_plan)
+        meal_rows.extend(meals)
+        item_rows.extend(items)
+    if meal_rows:
+        session.execute(insert(PlanMeal), meal_rows)
+    if item_rows:
+        session.execute(insert(PlanItem), item_rows)
+    return plan_ids
+
+
+def load_plan_history(session: Session, user_id: int, limit: int, cursor: Optional[str] = None,
+                      since: Optional[date] = None, until: Optional[date] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a user's plans, newest first, in the /history response shape
+    
+    Returns:
+        (plans, cursor for the next page or None)
+    Raises ValueError for a malformed cursor
+    """
+    # Plain Core rows: no ORM identity map or object loading for read-only data
+    conn = session.connection()
+    plans, next_cursor = split_page(conn.execute(keyset_page(
+        select(Plan.id, Plan.bmr, Plan.daily_calories, Plan.protein_g, Plan.carbs_g, Plan.fats_g, Plan.created_at)
+        .where(Plan.user_id == user_id, *date_window(Plan.created_at, since, until)),
+        Plan.created_at, Plan.id, limit, cursor
+    )).all(), limit, key_attr="created_at")
+    if not plans:
+        return [], None
+    
+    # Children of this page's plans only, so the cost doesn't grow with the user's total history
+    plan_ids = [plan.id for plan in plans]
+    meal_plans = defaultdict(dict)
+    for plan_id, meal_type, description in conn.execute(
+        select(PlanMeal.plan_id, PlanMeal.meal_type, PlanMeal.description)
+        .where(PlanMeal.plan_id.in_(plan_ids))
+        .order_by(PlanMeal.plan_id, PlanMeal.position)
+    ):
+        meal_plans[plan_id][meal_type] = description
+    
+    lists = defaultdict(lambda: {field: [] for field in PLAN_ITEM_KINDS})
+    fields = {kind: field for field, kind in PLAN_ITEM_KINDS.items()}
+    for plan_id, kind, text in conn.execute(
+        select(PlanItem.plan_id, PlanItem.kind, PlanItem.text)
+        .where(PlanItem.plan_id.in_(plan_ids))
+        .order_by(PlanItem.plan_id, PlanItem.kind, PlanItem.position)
+    ):
+        lists[plan_id][fields[kind]].append(text)
+    
+    history = []
+    for plan_id, bmr, daily_calories, protein, carbs, fats, created_at in plans:
+        plan_lists = lists[plan_id]
+        history.append({
+            "id": plan_id,
+            "bmr": bmr,
+            "daily_calories": daily_calories,
+            "meal_plan": meal_plans.get(plan_id, {}),
+            "macros": {
+                key: f"{grams}g"
+                for key, grams in (("protein", protein), ("carbs", carbs), ("fats", fats)) if grams is not None
+            },
+            "exercises": plan_lists["exercises"],
+            "grocery_list": plan_lists["grocery_list"],
+            "created_at": created_at.isoformat()
+        })
+    return history, next_cursor
+
+
+def backfill_plan_rows(conn: Connection):
+    """Copy legacy JSON plan columns into the macro columns and child tables (for migrations)"""
+    set_macros = update(Plan).where(Plan.id == bindparam("b_id")).values(
+        {column: bindparam(f"b_{column}") for column in MACRO_COLUMNS.values()}
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(Plan.id, Plan.meal_plan, Plan.macros, Plan.exercises, Plan.grocery_list)
+            .where(Plan.id > last_id, Plan.meal_plan.is_not(None))
+            .order_by(Plan.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        
+        macro_rows, meal_rows, item_rows = [], [], []
+        for row in rows:
+            try:
+                macros = json.loads(row.macros or "{}")
+                meals, items = plan_child_rows(row.id, json.loads(row.meal_plan), {
+                    "exercises": json.loads(row.exercises or "[]"),
+                    "grocery_list": json.loads(row.grocery_list or "[]"),
+                })
+                macro_values = {column: grams(macros.get(key)) for key, column in MACRO_COLUMNS.items()}
+            except (ValueError, TypeError, AttributeError):
+                print(f"⚠️  Skipping plan {row.id}: unreadable JSON")
+                continue
+            macro_rows.append({"b_id": row.id, **{f"b_{column}": value for column, value in macro_values.items()}})
+            meal_rows.extend(meals)
+            item_rows.extend(items)
+        
+        if macro_rows:
+            conn.execute(set_macros, macro_rows)
+        if meal_rows:
+            conn.execute(insert(PlanMeal), meal_rows)
+        if item_rows:
+            conn.execute(insert(PlanItem), item_rows)
@@ -8,6 +8,10 @@ from typing import Dict, List, Optional, Tuple
 import json
 from collections import defaultdict
 
+import numpy as np
+
+from metrics import timed
+
 
 class PredictionEngine:
     """
@@ -20,6 +24,7 @@ class PredictionEngine:
         self.weight_trend_window = 14  # days to analyze
         self.calorie_adjustment_factor = 7700  # calories per kg (scientific constant)
         
+    @timed
     def predict_weight_trend(self, weight_history: List[Dict]) -> Dict:
         """
         Predict future weight based on historical data using linear regression
@@ -33,26 +38,41 @@ class PredictionEngine:
                 "weekly_change": 0
             }
         
-        # Sort by date
-        sorted_history = sorted(weight_history, key=lambda x: x['date'])
+        dates = np.array([entry['date'] for entry in weight_history], dtype='datetime64[D]')
+        weights = np.array([entry['weight'] for entry in weight_history], dtype=float)
+        return self.predict_weight_trend_arrays(dates, weights)
+    
+    @timed
+    def predict_weight_trend_arrays(self, dates: np.ndarray, weights: np.ndarray) -> Dict:
+        """
+        Array version of predict_weight_trend for long histories
         
-        # Calculate trend (simple linear regression)
-        n = len(sorted_history)
-        weights = [entry['weight'] for entry in sorted_history]
+        Fits weight against day number by ordinary least squares in O(n),
+        without sorting. Confidence is based on the residual variance around
+        the fitted line, so a steady trend is not penalised as noise.
         
-        # Calculate average weekly change
-        if n >= 2:
-            first_weight = weights[0]
-            last_weight = weights[-1]
-            days_span = (sorted_history[-1]['date'] - sorted_history[0]['date']).days
-            
-            if days_span > 0:
-                daily_change = (last_weight - first_weight) / days_span
-                weekly_change = daily_change * 7
-            else:
-                weekly_change = 0
-        else:
-            weekly_change = 0
+        Args:
+            dates: datetime64[D] array (any order)
+            weights: weights in kg, aligned with dates
+        """
+        n = len(weights)
+        if n < 3:
+            return {
+                "trend": "insufficient_data",
+                "predictions": {},
+                "confidence": 0,
+                "weekly_change": 0
+            }
+        
+        days = (dates - dates.min()).astype(np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        
+        # Least-squares slope in kg/day
+        day_offsets = days - days.mean()
+        weight_mean = weights.mean()
+        spread = day_offsets @ day_offsets
+        daily_change = float(day_offsets @ (weights - weight_mean) / spread) if spread > 0 else 0.0
+        weekly_change = daily_change * 7
         
         # Determine trend
         if abs(weekly_change) < 0.1:
@@ -62,16 +82,18 @@ class PredictionEngine:
         else:
             trend = "increasing"
         
-        # Predict future weights
-        current_weight = weights[-1]
+        # Latest entry (last one logged on the most recent date)
+        latest = n - 1 - int(np.argmax(days[::-1]))
+        current_weight = float(weights[latest])
         predictions = {
             "7_days": round(current_weight + (daily_change * 7), 1),
             "14_days": round(current_weight + (daily_change * 14), 1),
             "30_days": round(current_weight + (daily_change * 30), 1)
         }
         
-        # Calculate confidence based on data consistency
-        variance = sum((w - sum(weights)/n)**2 for w in weights) / n
+        # Calculate confidence based on how closely the data follows the trend
+        residuals = weights - (weight_mean + daily_change * day_offsets)
+        variance = float(residuals @ residuals) / n
         confidence = max(0, min(100, 100 - (variance * 10)))
         
         return {
@@ -82,14 +104,89 @@ class PredictionEngine:
             "current_weight": current_weight
         }
     
+    @timed
+    def predict_weight_trends_grouped(self, user_ids: np.ndarray, dates: np.ndarray,
+                                      weights: np.ndarray) -> Dict[int, Dict]:
+        """
+        predict_weight_trend_arrays for many users at once
+        
+        Per-user least-squares sums are accumulated with np.bincount, so the
+        cost is a handful of passes over all rows regardless of user count.
+        
+        Args:
+            user_ids: user id per row, rows grouped by user (e.g. ORDER BY user_id)
+            dates: datetime64[D] per row
+            weights: weight per row
+        
+        Returns:
+            trend dict per user id
+        """
+        if len(user_ids) == 0:
+            return {}
+        
+        starts, ends, group = _group_bounds(user_ids)
+        counts = (ends - starts).astype(np.float64)
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        
+        # Shift each user's values to their first row to keep the sums small
+        x = (days - days[starts][group]).astype(np.float64)
+        y = weights - weights[starts][group]
+        sum_x = np.bincount(group, x)
+        sum_y = np.bincount(group, y)
+        spread = np.bincount(group, x * x) - sum_x * sum_x / counts
+        covariance = np.bincount(group, x * y) - sum_x * sum_y / counts
+        total_y = np.bincount(group, y * y) - sum_y * sum_y / counts
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            daily_changes = np.where(spread > 0, covariance / spread, 0.0)
+        variances = np.maximum(total_y - daily_changes * covariance, 0.0) / counts
+        
+        # Latest entry per user: last row on the user's most recent date
+        is_latest_day = days == np.maximum.reduceat(days, starts)[group]
+        latest = np.maximum.reduceat(np.where(is_latest_day, np.arange(len(days)), -1), starts)
+        
+        trends = {}
+        for g, user_id in enumerate(user_ids[starts].tolist()):
+            if counts[g] < 3:
+                trends[user_id] = self.predict_weight_trend([])
+                continue
+            daily_change = float(daily_changes[g])
+            weekly_change = daily_change * 7
+            current_weight = float(weights[latest[g]])
+            
+            if abs(weekly_change) < 0.1:
+                trend = "stable"
+            elif weekly_change < 0:
+                trend = "decreasing"
+            else:
+                trend = "increasing"
+            
+            trends[user_id] = {
+                "trend": trend,
+                "weekly_change": round(weekly_change, 2),
+                "predictions": {
+                    "7_days": round(current_weight + (daily_change * 7), 1),
+                    "14_days": round(current_weight + (daily_change * 14), 1),
+                    "30_days": round(current_weight + (daily_change * 30), 1)
+                },
+                "confidence": round(max(0, min(100, 100 - (float(variances[g]) * 10))), 1),
+                "current_weight": current_weight
+            }
+        
+        return trends
+    
+    @timed
     def predict_calorie_needs(self, user_data: Dict, weight_history: List[Dict], 
-                            calorie_logs: List[Dict]) -> Dict:
+                            calorie_logs: List[Dict], weight_trend: Optional[Dict] = None) -> Dict:
         """
         Predict optimal calorie intake based on goals and actual progress
         Adjusts recommendations based on real results
+        Pass weight_trend if predict_weight_trend has already been run
         """
         # Get weight trend
-        weight_trend = self.predict_weight_trend(weight_history)
+        if weight_trend is None:
+            weight_trend = self.predict_weight_trend(weight_history)
         
         # Get current BMR (should be passed or calculated)
         current_bmr = user_data.get('bmr', 1500)
@@ -158,6 +255,7 @@ class PredictionEngine:
             "weekly_target": goal_adjustments.get(goal, 0) / 1100  # kg change
         }
     
+    @timed
     def predict_meal_preferences(self, user_data: Dict, meal_history: List[Dict]) -> Dict:
         """
         Predict preferred meal types and timing based on past plans
@@ -186,6 +284,7 @@ class PredictionEngine:
         
         return preferences
     
+    @timed
     def predict_exercise_adherence(self, exercise_logs: List[Dict]) -> Dict:
         """
         Predict likelihood of exercise completion based on patterns
@@ -222,6 +321,7 @@ class PredictionEngine:
             "recommendation": recommendation
         }
     
+    @timed
     def predict_hydration_needs(self, user_data: Dict, activity_level: str) -> Dict:
         """
         Calculate recommended water intake based on weight and activity
@@ -252,6 +352,7 @@ class PredictionEngine:
             "timing": self._get_hydration_timing(glasses)
         }
     
+    @timed
     def predict_macro_distribution(self, goal: str, current_performance: Dict) -> Dict:
         """
         Predict optimal macro distribution based on goal and progress
@@ -277,6 +378,7 @@ class PredictionEngine:
         
         return base_dist
     
+    @timed
     def predict_optimal_meal_timing(self, user_data: Dict) -> Dict:
         """
         Predict best meal timing based on activity level and goals
@@ -311,6 +413,7 @@ class PredictionEngine:
                 "note": "Balanced timing for steady energy"
             }
     
+    @timed
     def predict_plateau_risk(self, weight_history: List[Dict], 
                             calorie_logs: List[Dict]) -> Dict:
         """
@@ -330,23 +433,40 @@ class PredictionEngine:
         avg_weight = sum(weights) / len(weights)
         variance = sum((w - avg_weight)**2 for w in weights) / len(weights)
         
-        # Low variance = potential plateau
-        if variance < 0.5:  # Less than 0.5kg variance
-            risk_level = "high"
-            recommendation = "Consider calorie cycling or changing workout routine"
-        elif variance < 1.0:
-            risk_level = "moderate"
-            recommendation = "Monitor closely, may need adjustments soon"
-        else:
-            risk_level = "low"
-            recommendation = "Good progress, continue current plan"
+        return self._plateau_risk_from_variance(variance)
+    
+    @timed
+    def predict_plateau_risks_grouped(self, user_ids: np.ndarray, weights: np.ndarray) -> Dict[int, Dict]:
+        """
+        predict_plateau_risk for many users at once
         
-        return {
-            "risk_level": risk_level,
-            "recommendation": recommendation,
-            "variance": round(variance, 2)
-        }
+        Args:
+            user_ids: user id per row, rows grouped by user and ordered by date
+            weights: weight per row
+        
+        Returns:
+            plateau risk dict per user id (users with fewer than 14 rows get "unknown")
+        """
+        if len(user_ids) == 0:
+            return {}
+        
+        starts, ends, _ = _group_bounds(user_ids)
+        weights = np.asarray(weights, dtype=np.float64)
+        enough = (ends - starts) >= 14
+        
+        # Variance of each user's last 14 weights, one (users x 14) array
+        recent = weights[ends[enough][:, None] - np.arange(14, 0, -1)]
+        variances = iter(recent.var(axis=1).tolist())
+        
+        risks = {}
+        for user_id, has_enough in zip(user_ids[starts].tolist(), enough.tolist()):
+            if has_enough:
+                risks[user_id] = self._plateau_risk_from_variance(next(variances))
+            else:
+                risks[user_id] = self.predict_plateau_risk([], [])
+        return risks
     
+    @timed
     def predict_success_probability(self, user_data: Dict, 
                                    adherence_data: Dict) -> Dict:
         """
@@ -406,6 +526,25 @@ class PredictionEngine:
             else:
                 return "Gaining too fast - slightly reducing calories"
     
+    def _plateau_risk_from_variance(self, variance: float) -> Dict:
+        """Classify plateau risk from the variance of the last 14 weights"""
+        # Low variance = potential plateau
+        if variance < 0.5:  # Less than 0.5kg variance
+            risk_level = "high"
+            recommendation = "Consider calorie cycling or changing workout routine"
+        elif variance < 1.0:
+            risk_level = "moderate"
+            recommendation = "Monitor closely, may need adjustments soon"
+        else:
+            risk_level = "low"
+            recommendation = "Good progress, continue current plan"
+        
+        return {
+            "risk_level": risk_level,
+            "recommendation": recommendation,
+            "variance": round(variance, 2)
+        }
+    
     def _get_hydration_timing(self, total_glasses: int) -> List[str]:
         """Generate hydration timing recommendations"""
         timings = []
@@ -456,28 +595,91 @@ def get_calorie_prediction(user_data: Dict, weight_history: List[Dict],
     return engine.predict_calorie_needs(user_data, weight_history, calorie_logs)
 
 
-def get_comprehensive_predictions(user_data: Dict, historical_data: Dict) -> Dict:
+def get_comprehensive_predictions(user_data: Dict, historical_data: Dict,
+                                  precomputed: Optional[Dict] = None) -> Dict:
     """
     Get all predictions in one call
+    
+    `precomputed` can supply "weight_prediction" and/or "plateau_risk"
+    results computed elsewhere (e.g. by the grouped batch job); the weight
+    history is then not needed for them.
     """
     engine = PredictionEngine()
+    precomputed = precomputed or {}
     
     weight_history = historical_data.get('weight_logs', [])
     calorie_logs = historical_data.get('calorie_logs', [])
     exercise_logs = historical_data.get('exercise_logs', [])
     
+    weight_prediction = precomputed.get('weight_prediction')
+    if weight_prediction is None:
+        weight_prediction = engine.predict_weight_trend(weight_history)
+    
+    plateau_risk = precomputed.get('plateau_risk')
+    if plateau_risk is None:
+        plateau_risk = engine.predict_plateau_risk(weight_history, calorie_logs)
+    
     return {
-        "weight_prediction": engine.predict_weight_trend(weight_history),
+        "weight_prediction": weight_prediction,
         "calorie_prediction": engine.predict_calorie_needs(
-            user_data, weight_history, calorie_logs
+            user_data, weight_history, calorie_logs, weight_trend=weight_prediction
         ),
         "hydration_needs": engine.predict_hydration_needs(
             user_data, user_data.get('activity_level', 'moderate')
         ),
         "exercise_adherence": engine.predict_exercise_adherence(exercise_logs),
         "meal_timing": engine.predict_optimal_meal_timing(user_data),
-        "plateau_risk": engine.predict_plateau_risk(weight_history, calorie_logs),
+        "plateau_risk": plateau_risk,
         "macro_distribution": engine.predict_macro_distribution(
             user_data.get('health_goal', 'maintenance'), {}
         )
     }
+
+
+@timed
+def get_prediction_report(user_data: Dict, historical_data: Dict,
+                          precomputed: Optional[Dict] = None) -> Dict:
+    """
+    Comprehensive predictions plus success probability for one user
+    This is the /predictions/comprehensive response body
+    
+    user_data needs id, bmr and the profile fields. historical_data may carry
+    "weight_log_count" when the full weight history isn't included.
+    """
+    engine = PredictionEngine()
+    predictions = get_comprehensive_predictions(user_data, historical_data, precomputed)
+    
+    # Calculate success probability
+    weight_log_count = historical_data.get(
+        'weight_log_count', len(historical_data.get('weight_logs', []))
+    )
+    adherence_data = {
+        "exercise_adherence": predictions['exercise_adherence']['adherence_rate'],
+        "diet_adherence": 75,  # Default estimate
+        "logging_consistency": (weight_log_count / 30) * 100 if weight_log_count > 0 else 0
+    }
+    
+    return {
+        "user_id": user_data.get('id'),
+        "user_profile": {
+            "age": user_data.get('age'),
+            "gender": user_data.get('gender'),
+            "weight": user_data.get('weight'),
+            "height": user_data.get('height'),
+            "goal": user_data.get('health_goal'),
+            "bmr": user_data.get('bmr')
+        },
+        "predictions": predictions,
+        "success_prediction": engine.predict_success_probability(user_data, adherence_data),
+        "generated_at": datetime.now().isoformat()
+    }
+
+
+def _group_bounds(user_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Start/end offsets of each run of equal user ids, and the run index of every row"""
+    user_ids = np.asarray(user_ids)
+    boundaries = np.flatnonzero(user_ids[1:] != user_ids[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(user_ids)]))
+    group = np.repeat(np.arange(len(starts)), ends - starts)
+    return starts, ends, group
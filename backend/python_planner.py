@@ -3,8 +3,38 @@ Python-based diet and exercise plan generator
 No AI/LLM required - uses nutritional science and algorithms
 """
 
+import math
+import multiprocessing
+import os
 import random
-from typing import Dict, List
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from metrics import timed
+
+# "random" picks foods and sizes portions per macro; "solver" fits portions to all targets
+PLANNER_MODES = ("random", "solver")
+PLANNER_MODE = os.getenv("PLANNER_MODE", "random")
+PLANNER_TIME_BUDGET_MS = float(os.getenv("PLANNER_TIME_BUDGET_MS", "50"))
+
+# Batch generation: worker processes (default: CPU count) and the batch size below which plans are made inline
+PLANNER_WORKERS = int(os.getenv("PLANNER_WORKERS", "0")) or os.cpu_count() or 1
+PLANNER_POOL_MIN_BATCH = int(os.getenv("PLANNER_POOL_MIN_BATCH", "64"))
+
+# Plan memo: max entries (0 disables) and the calorie/macro bucket widths profiles are rounded to
+PLANNER_MEMO_SIZE = int(os.getenv("PLANNER_MEMO_SIZE", "4096"))
+PLAN_CALORIE_BUCKET = 50
+PLAN_MACRO_BUCKET = 5
 
 
 # Food database with nutritional information (per 100g)
@@ -54,6 +84,218 @@ FOODS_DATABASE = {
     }
 }
 
+# Foods suitable for vegetarians (by FOODS_DATABASE key); anything not listed is treated as non-vegetarian
+VEGETARIAN_PROTEINS = frozenset([
+    "tofu", "lentils", "chickpeas", "tempeh", "greek_yogurt", "cottage_cheese", "eggs", "protein_powder"
+])
+
+# Allergen -> words that identify it in a user's allergy list (matched as whole
+# words, singular or plural, so "coconut" or "eggplant" match nothing)
+ALLERGEN_KEYWORDS = {
+    "nuts": ("nut", "almond", "peanut", "walnut", "cashew", "hazelnut", "pecan", "pistachio", "macadamia"),
+    "dairy": ("dairy", "milk", "lactose", "yogurt", "cheese"),
+    "eggs": ("egg",),
+    "fish": ("fish", "salmon", "tuna", "seafood"),
+    "soy": ("soy", "soya", "soybean", "tofu", "tempeh"),
+    "gluten": ("gluten", "wheat"),
+}
+
+# Allergens contained in each food (by FOODS_DATABASE key)
+FOOD_ALLERGENS = {
+    "almonds": ("nuts",),
+    "peanut_butter": ("nuts",),
+    "walnuts": ("nuts",),
+    "greek_yogurt": ("dairy",),
+    "cottage_cheese": ("dairy",),
+    "protein_powder": ("dairy",),
+    "eggs": ("eggs",),
+    "salmon": ("fish",),
+    "tuna": ("fish",),
+    "tofu": ("soy",),
+    "tempeh": ("soy",),
+    "whole_wheat_bread": ("gluten",),
+    "pasta": ("gluten",),
+}
+
+# Meal type -> preferred foods per category (categories not listed use the whole category)
+MEAL_CHOICES = {
+    "breakfast": {
+        "proteins": ["eggs", "greek_yogurt", "protein_powder", "cottage_cheese"],
+        "carbs": ["oatmeal", "whole_wheat_bread", "banana", "berries"],
+    },
+    "lunch": {
+        "proteins": ["chicken_breast", "tuna", "turkey", "tofu", "chickpeas"],
+        "carbs": ["brown_rice", "quinoa", "sweet_potato", "whole_wheat_bread"],
+    },
+    "dinner": {
+        "proteins": ["salmon", "chicken_breast", "turkey", "tempeh", "lentils"],
+        "carbs": ["brown_rice", "quinoa", "sweet_potato", "pasta"],
+    },
+    "snacks": {
+        "proteins": ["greek_yogurt", "cottage_cheese", "protein_powder"],
+        "carbs": ["apple", "banana", "berries"],
+    },
+}
+
+ALLERGEN_BITS = {allergen: 1 << bit for bit, allergen in enumerate(ALLERGEN_KEYWORDS)}
+_ALLERGEN_BY_WORD = {
+    form: allergen
+    for allergen, keywords in ALLERGEN_KEYWORDS.items()
+    for keyword in keywords
+    for form in (keyword, keyword + "s", keyword + "es")
+}
+
+
+class Food(NamedTuple):
+    key: str
+    name: str
+    calories: float
+    protein: float
+    carbs: float
+    fats: float
+    allergens: int  # ALLERGEN_BITS mask
+    vegetarian: bool
+
+
+def allergen_mask(allergies: List[str]) -> int:
+    """ALLERGEN_BITS mask for a user's free-text allergy list"""
+    mask = 0
+    for allergy in allergies:
+        for word in re.findall(r"[a-z]+", allergy.lower()):
+            allergen = _ALLERGEN_BY_WORD.get(word)
+            if allergen:
+                mask |= ALLERGEN_BITS[allergen]
+    return mask
+
+
+def _build_food_index() -> MappingProxyType:
+    """
+    Candidate foods for every (category, meal type, vegetarian, allergen mask)
+    
+    Built once at import; generate_meal only does a lookup. A meal type's
+    preferred foods are used when any survive the filters, otherwise the
+    whole category (an empty tuple means nothing in the category is safe).
+    """
+    foods = {
+        category: [
+            Food(
+                key, data["name"], data["calories"], data["protein"], data["carbs"], data["fats"],
+                sum(ALLERGEN_BITS[a] for a in FOOD_ALLERGENS.get(key, ())),
+                category != "proteins" or key in VEGETARIAN_PROTEINS
+            )
+            for key, data in items.items()
+        ]
+        for category, items in FOODS_DATABASE.items()
+    }
+    
+    index = {}
+    for mask in range(1 << len(ALLERGEN_BITS)):
+        for is_vegetarian in (False, True):
+            for category, category_foods in foods.items():
+                allowed = tuple(
+                    food for food in category_foods
+                    if not food.allergens & mask and (food.vegetarian or not is_vegetarian)
+                )
+                for meal_type, choices in MEAL_CHOICES.items():
+                    preferred = choices.get(category)
+                    pool = allowed
+                    if preferred:
+                        by_key = {food.key: food for food in allowed}
+                        pool = tuple(by_key[key] for key in preferred if key in by_key) or allowed
+                    index[(category, meal_type, is_vegetarian, mask)] = pool
+    return MappingProxyType(index)
+
+
+FOOD_INDEX = _build_food_index()
+
+# Read-only from here on: plans must never change the shared food data
+FOODS_DATABASE = MappingProxyType({
+    category: MappingProxyType({key: MappingProxyType(data) for key, data in items.items()})
+    for category, items in FOODS_DATABASE.items()
+})
+
+
+# Solver: portion bounds and default (regularization) portion per category, in grams
+PORTION_BOUNDS = {
+    "proteins": (50, 300),
+    "carbs": (30, 200),
+    "vegetables": (50, 250),
+    "fats": (5, 50),
+}
+DEFAULT_PORTIONS = {"proteins": 150, "carbs": 100, "vegetables": 150, "fats": 15}
+
+# Relative weight of calories, protein, carbs and fats errors in the fit
+NUTRIENT_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+# Pull toward DEFAULT_PORTIONS; keeps portions sensible where the targets leave freedom
+PORTION_REGULARIZATION = 0.01
+SOLVER_SWEEPS = 10
+SOLVER_CHUNK = 512
+# Combinations within this much of the best fit are considered equally good (picked at random)
+SOLVER_TOLERANCE = 0.002
+
+
+class MealCombos(NamedTuple):
+    foods: Tuple[Tuple["Food", ...], ...]  # one food per category, per combination
+    nutrients: np.ndarray                   # (combinations, 4 nutrients, categories) per gram
+    lower: np.ndarray
+    upper: np.ndarray
+    default: np.ndarray
+
+
+@lru_cache(maxsize=None)
+def _meal_combos(meal_type: str, is_vegetarian: bool, mask: int) -> MealCombos:
+    """Every food combination for a meal as one nutrient array (built once per key)"""
+    categories = [
+        category for category in PORTION_BOUNDS
+        if FOOD_INDEX[(category, meal_type, is_vegetarian, mask)]
+    ]
+    foods = tuple(product(*(FOOD_INDEX[(c, meal_type, is_vegetarian, mask)] for c in categories)))
+    nutrients = np.array([
+        [[food.calories, food.protein, food.carbs, food.fats] for food in combo]
+        for combo in foods
+    ], dtype=np.float64).transpose(0, 2, 1) / 100
+    return MealCombos(
+        foods,
+        nutrients,
+        np.array([PORTION_BOUNDS[c][0] for c in categories], dtype=np.float64),
+        np.array([PORTION_BOUNDS[c][1] for c in categories], dtype=np.float64),
+        np.array([DEFAULT_PORTIONS[c] for c in categories], dtype=np.float64),
+    )
+
+
+def _fit_portions(nutrients: np.ndarray, targets: np.ndarray, lower: np.ndarray,
+                  upper: np.ndarray, default: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bounded least squares over portion sizes for a batch of food combinations
+    
+    Minimizes the weighted relative error of (calories, protein, carbs, fats)
+    plus a small pull toward the default portions, with each portion kept in
+    [lower, upper]. Solved by projected coordinate descent, vectorized over
+    the combinations.
+    
+    Returns:
+        (portions per combination, weighted squared relative error per combination)
+    """
+    scale = np.sqrt(NUTRIENT_WEIGHTS) / targets
+    scaled = nutrients * scale[None, :, None]
+    regularization = PORTION_REGULARIZATION / default ** 2
+    
+    gram = np.einsum('kjm,kjn->kmn', scaled, scaled)
+    gram[:, np.arange(len(default)), np.arange(len(default))] += regularization
+    rhs = np.einsum('kjm,j->km', scaled, np.sqrt(NUTRIENT_WEIGHTS)) + regularization * default
+    diagonal = np.diagonal(gram, axis1=1, axis2=2)
+    
+    # Start from the unconstrained optimum (clipped), then enforce the bounds
+    portions = np.clip(np.linalg.solve(gram, rhs[..., None])[..., 0], lower, upper)
+    for _ in range(SOLVER_SWEEPS):
+        for i in range(len(default)):
+            others = np.einsum('kn,kn->k', gram[:, i, :], portions) - diagonal[:, i] * portions[:, i]
+            portions[:, i] = np.clip((rhs[:, i] - others) / diagonal[:, i], lower[i], upper[i])
+    
+    relative = (np.einsum('kjm,km->kj', nutrients, portions) - targets) / targets
+    return portions, (relative ** 2) @ NUTRIENT_WEIGHTS
+
+
 # Exercise database categorized by goal
 EXERCISES_DATABASE = {
     "weight_loss": {
@@ -113,108 +355,214 @@ EXERCISES_DATABASE = {
 
 
 def generate_meal(meal_type: str, calories_target: int, protein_g: int, carbs_g: int, fats_g: int, 
-                 is_vegetarian: bool, allergies: List[str]) -> Dict:
-    """Generate a meal based on nutritional targets"""
+                 is_vegetarian: bool, allergies: List[str], mode: str = "random",
+                 time_budget_ms: Optional[float] = None, rng: Optional[random.Random] = None) -> Dict:
+    """
+    Generate a meal based on nutritional targets
+    mode "solver" fits portions to all four targets within time_budget_ms
+    rng defaults to the global random module
+    """
+    rng = rng or random
+    mask = allergen_mask(allergies) if allergies else 0
+    if mode == "solver":
+        budget = PLANNER_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+        return _solve_meal(meal_type, calories_target, protein_g, carbs_g, fats_g, is_vegetarian, mask,
+                           time.perf_counter() + budget / 1000, rng)
+    return _generate_meal(meal_type, protein_g, carbs_g, fats_g, is_vegetarian, mask, rng)
+
+
+def _generate_meal(meal_type: str, protein_g: int, carbs_g: int, fats_g: int,
+                   is_vegetarian: bool, mask: int, rng) -> Dict:
+    """generate_meal with the allergy list already reduced to an ALLERGEN_BITS mask"""
     
-    # Filter foods based on preferences
-    proteins = {k: v for k, v in FOODS_DATABASE["proteins"].items() 
-                if not (not is_vegetarian or k in ["tofu", "lentils", "chickpeas", "tempeh"]) if is_vegetarian}
+    # Candidate foods come precomputed from FOOD_INDEX (diet and allergens already applied)
+    if meal_type not in MEAL_CHOICES:
+        meal_type = "snacks"
     
-    if not is_vegetarian:
-        proteins = FOODS_DATABASE["proteins"]
-    else:
-        proteins = {k: v for k, v in FOODS_DATABASE["proteins"].items() 
-                   if k in ["tofu", "lentils", "chickpeas", "tempeh", "greek_yogurt", "cottage_cheese", "eggs", "protein_powder"]}
-    
-    # Remove allergens
-    if allergies:
-        allergen_keywords = [a.lower() for a in allergies]
-        if any(word in allergen_keywords for word in ["nut", "almond", "peanut"]):
-            FOODS_DATABASE["fats"] = {k: v for k, v in FOODS_DATABASE["fats"].items() 
-                                      if k not in ["almonds", "peanut_butter", "walnuts"]}
-    
-    # Select foods based on meal type
-    if meal_type == "breakfast":
-        protein_choices = ["eggs", "greek_yogurt", "protein_powder", "cottage_cheese"]
-        carb_choices = ["oatmeal", "whole_wheat_bread", "banana", "berries"]
-    elif meal_type == "lunch":
-        protein_choices = ["chicken_breast", "tuna", "turkey", "tofu", "chickpeas"]
-        carb_choices = ["brown_rice", "quinoa", "sweet_potato", "whole_wheat_bread"]
-    elif meal_type == "dinner":
-        protein_choices = ["salmon", "chicken_breast", "turkey", "tempeh", "lentils"]
-        carb_choices = ["brown_rice", "quinoa", "sweet_potato", "pasta"]
-    else:  # snacks
-        protein_choices = ["greek_yogurt", "cottage_cheese", "protein_powder"]
-        carb_choices = ["apple", "banana", "berries"]
-    
-    # Filter based on diet
-    if is_vegetarian:
-        protein_choices = [p for p in protein_choices if p in ["eggs", "greek_yogurt", "protein_powder", 
-                                                                "cottage_cheese", "tofu", "chickpeas", "tempeh", "lentils"]]
+    def pick(category: str):
+        pool = FOOD_INDEX[(category, meal_type, is_vegetarian, mask)]
+        return rng.choice(pool) if pool else None
     
-    # Select primary protein
-    protein_food = random.choice([p for p in protein_choices if p in proteins])
-    protein_data = proteins[protein_food]
+    portions = []
     
-    # Calculate portions (rough estimates)
-    protein_portion = int(protein_g * 100 / protein_data["protein"]) if protein_data["protein"] > 0 else 100
-    protein_portion = min(max(protein_portion, 50), 300)  # Between 50-300g
+    # Select primary protein
+    protein_data = pick("proteins")
+    if protein_data:
+        # Calculate portions (rough estimates)
+        protein_portion = int(protein_g * 100 / protein_data.protein) if protein_data.protein > 0 else 100
+        protein_portion = min(max(protein_portion, 50), 300)  # Between 50-300g
+        portions.append((protein_portion, protein_data))
     
     # Select carb source
-    carb_food = random.choice(carb_choices)
-    carb_data = FOODS_DATABASE["carbs"][carb_food]
-    carb_portion = int(carbs_g * 100 / carb_data["carbs"]) if carb_data["carbs"] > 0 else 100
-    carb_portion = min(max(carb_portion, 30), 200)
+    carb_data = pick("carbs")
+    if carb_data:
+        carb_portion = int(carbs_g * 100 / carb_data.carbs) if carb_data.carbs > 0 else 100
+        carb_portion = min(max(carb_portion, 30), 200)
+        portions.append((carb_portion, carb_data))
     
     # Select vegetable
-    veg_food = random.choice(list(FOODS_DATABASE["vegetables"].keys()))
-    veg_data = FOODS_DATABASE["vegetables"][veg_food]
-    veg_portion = 150  # Standard portion
+    veg_data = pick("vegetables")
+    if veg_data:
+        veg_portion = 150  # Standard portion
+        portions.append((veg_portion, veg_data))
     
     # Select fat source
-    fat_food = random.choice(list(FOODS_DATABASE["fats"].keys()))
-    fat_data = FOODS_DATABASE["fats"][fat_food]
-    fat_portion = int(fats_g * 100 / fat_data["fats"]) if fat_data["fats"] > 0 else 15
-    fat_portion = min(max(fat_portion, 10), 50)
-    
-    # Calculate actual calories
-    actual_calories = (
-        protein_portion * protein_data["calories"] / 100 +
-        carb_portion * carb_data["calories"] / 100 +
-        veg_portion * veg_data["calories"] / 100 +
-        fat_portion * fat_data["calories"] / 100
-    )
+    fat_data = pick("fats")
+    if fat_data:
+        fat_portion = int(fats_g * 100 / fat_data.fats) if fat_data.fats > 0 else 15
+        fat_portion = min(max(fat_portion, 10), 50)
+        portions.append((fat_portion, fat_data))
+    
+    return _describe_meal(portions)
+
+
+def _solve_meal(meal_type: str, calories_target: int, protein_g: int, carbs_g: int, fats_g: int,
+                is_vegetarian: bool, mask: int, deadline: float, rng) -> Dict:
+    """
+    Pick the food combination and portions that best fit all four targets
+    
+    Combinations are fitted in chunks, starting at a random offset, until
+    all are done or the deadline passes (at least one chunk always runs).
+    One of the near-best combinations is picked at random for variety.
+    """
+    if meal_type not in MEAL_CHOICES:
+        meal_type = "snacks"
+    combos = _meal_combos(meal_type, is_vegetarian, mask)
+    targets = np.maximum([calories_target, protein_g, carbs_g, fats_g], 1).astype(np.float64)
+    
+    count = len(combos.foods)
+    order = np.roll(np.arange(count), -rng.randrange(count))
+    fitted, portions, errors = [], [], []
+    for start in range(0, count, SOLVER_CHUNK):
+        chunk = order[start:start + SOLVER_CHUNK]
+        chunk_portions, chunk_errors = _fit_portions(
+            combos.nutrients[chunk], targets, combos.lower, combos.upper, combos.default
+        )
+        fitted.append(chunk)
+        portions.append(chunk_portions)
+        errors.append(chunk_errors)
+        if time.perf_counter() >= deadline:
+            break
+    
+    fitted, portions, errors = np.concatenate(fitted), np.concatenate(portions), np.concatenate(errors)
+    near_best = np.flatnonzero(errors <= errors.min() + SOLVER_TOLERANCE)
+    best = rng.choice(near_best.tolist())
+    
+    foods = combos.foods[fitted[best]]
+    return _describe_meal([(int(round(grams)), food) for grams, food in zip(portions[best], foods)])
+
+
+def _describe_meal(portions: List[Tuple[int, "Food"]]) -> Dict:
+    """Meal dict (description, calories, macros, items) for (grams, food) portions"""
+    
+    # Calculate actual calories and macros
+    actual_calories = sum(portion * food.calories / 100 for portion, food in portions)
     
     # Build meal description
-    meal = f"{protein_portion}g {protein_data['name']}, {carb_portion}g {carb_data['name']}, "
-    meal += f"{veg_portion}g {veg_data['name']}, {fat_portion}g {fat_data['name']}"
+    meal = ", ".join(f"{portion}g {food.name}" for portion, food in portions)
     meal += f" (~{int(actual_calories)} kcal)"
     
     return {
         "description": meal,
         "calories": int(actual_calories),
-        "items": [protein_data['name'], carb_data['name'], veg_data['name'], fat_data['name']]
+        "macros": {
+            "protein": round(sum(portion * food.protein / 100 for portion, food in portions), 1),
+            "carbs": round(sum(portion * food.carbs / 100 for portion, food in portions), 1),
+            "fats": round(sum(portion * food.fats / 100 for portion, food in portions), 1)
+        },
+        "items": [food.name for _, food in portions]
     }
 
 
-def generate_python_diet_plan(user_data: dict, daily_calories: int, macros: dict) -> dict:
+class PlanProfile(NamedTuple):
+    """Everything a plan depends on, normalized; also the PlanMemo key"""
+    mode: str
+    goal: str  # EXERCISES_DATABASE key
+    is_vegetarian: bool
+    allergens: int  # ALLERGEN_BITS mask
+    calories: int
+    protein: int
+    carbs: int
+    fats: int
+
+
+def _exercise_goal(goal: str) -> str:
+    """EXERCISES_DATABASE key for a free-text health goal"""
+    goal = goal.lower()
+    if 'weight_loss' in goal or 'loss' in goal:
+        return "weight_loss"
+    elif 'muscle' in goal or 'gain' in goal:
+        return "muscle_gain"
+    elif 'endurance' in goal:
+        return "endurance"
+    return "maintenance"
+
+
+def _bucket(value: float, size: int) -> int:
+    return int(round(value / size)) * size
+
+
+def plan_profile(user_data: dict, daily_calories: int, macros: dict, mode: Optional[str] = None,
+                 bucketed: bool = False) -> PlanProfile:
     """
-    Generate diet and exercise plan using Python algorithms (no AI/LLM)
+    Normalize plan inputs
+    With bucketed=True calories and macros are rounded to PLAN_CALORIE_BUCKET/PLAN_MACRO_BUCKET
     """
+    mode = mode or PLANNER_MODE
+    if mode not in PLANNER_MODES:
+        raise ValueError(f"Unknown planner mode '{mode}'; expected one of {', '.join(PLANNER_MODES)}")
     
     # Parse user data
-    goal = user_data.get('health_goal', 'maintenance').lower()
-    preferences = user_data.get('food_preferences', '').lower()
+    preferences = (user_data.get('food_preferences') or '').lower()
     allergies_str = user_data.get('allergies', '') or ''
     allergies = [a.strip() for a in allergies_str.split(',') if a.strip()]
     
-    is_vegetarian = any(word in preferences for word in ['vegetarian', 'vegan', 'plant-based'])
-    
     # Parse macros
     protein_g = int(macros['protein'].replace('g', ''))
     carbs_g = int(macros['carbs'].replace('g', ''))
     fats_g = int(macros['fats'].replace('g', ''))
     
+    if bucketed:
+        daily_calories = _bucket(daily_calories, PLAN_CALORIE_BUCKET)
+        protein_g, carbs_g, fats_g = (_bucket(g, PLAN_MACRO_BUCKET) for g in (protein_g, carbs_g, fats_g))
+    
+    return PlanProfile(
+        mode,
+        _exercise_goal(user_data.get('health_goal') or 'maintenance'),
+        any(word in preferences for word in ['vegetarian', 'vegan', 'plant-based']),
+        allergen_mask(allergies),
+        int(daily_calories),
+        protein_g,
+        carbs_g,
+        fats_g
+    )
+
+
+@timed
+def generate_python_diet_plan(user_data: dict, daily_calories: int, macros: dict,
+                              mode: Optional[str] = None, time_budget_ms: Optional[float] = None,
+                              seed: Optional[int] = None, rng: Optional[random.Random] = None) -> dict:
+    """
+    Generate diet and exercise plan using Python algorithms (no AI/LLM)
+    
+    mode is "random" or "solver" (default PLANNER_MODE). The solver shares
+    time_budget_ms (default PLANNER_TIME_BUDGET_MS) across the four meals.
+    
+    Pass seed (or an rng) for a reproducible plan; by default the global
+    random module is used. Solver plans are only reproducible when the time
+    budget doesn't cut the search short.
+    """
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
+    return _build_plan(plan_profile(user_data, daily_calories, macros, mode), time_budget_ms, rng)
+
+
+def _build_plan(profile: PlanProfile, time_budget_ms: Optional[float], rng) -> dict:
+    """Generate the plan for a normalized profile"""
+    budget = PLANNER_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+    started = time.perf_counter()
+    daily_calories, protein_g, carbs_g, fats_g = profile.calories, profile.protein, profile.carbs, profile.fats
+    
     # Distribute calories across meals
     breakfast_cal = int(daily_calories * 0.25)
     lunch_cal = int(daily_calories * 0.35)
@@ -228,17 +576,30 @@ def generate_python_diet_plan(user_data: dict, daily_calories: int, macros: dict
     snack_p, snack_c, snack_f = int(protein_g * 0.10), int(carbs_g * 0.10), int(fats_g * 0.10)
     
     # Generate meals
-    breakfast = generate_meal("breakfast", breakfast_cal, breakfast_p, breakfast_c, breakfast_f, is_vegetarian, allergies)
-    lunch = generate_meal("lunch", lunch_cal, lunch_p, lunch_c, lunch_f, is_vegetarian, allergies)
-    dinner = generate_meal("dinner", dinner_cal, dinner_p, dinner_c, dinner_f, is_vegetarian, allergies)
-    snacks = generate_meal("snacks", snack_cal, snack_p, snack_c, snack_f, is_vegetarian, allergies)
+    meal_targets = [
+        ("breakfast", breakfast_cal, breakfast_p, breakfast_c, breakfast_f),
+        ("lunch", lunch_cal, lunch_p, lunch_c, lunch_f),
+        ("dinner", dinner_cal, dinner_p, dinner_c, dinner_f),
+        ("snacks", snack_cal, snack_p, snack_c, snack_f),
+    ]
+    meals = []
+    for done, (meal_type, cal, p, c, f) in enumerate(meal_targets):
+        if profile.mode == "solver":
+            # Each meal gets an equal share of what is left of the budget
+            remaining = started + budget / 1000 - time.perf_counter()
+            deadline = time.perf_counter() + remaining / (len(meal_targets) - done)
+            meals.append(_solve_meal(meal_type, cal, p, c, f, profile.is_vegetarian, profile.allergens,
+                                     deadline, rng))
+        else:
+            meals.append(_generate_meal(meal_type, p, c, f, profile.is_vegetarian, profile.allergens, rng))
+    breakfast, lunch, dinner, snacks = meals
     
     # Generate exercise plan
-    if 'weight_loss' in goal or 'loss' in goal:
+    if profile.goal == "weight_loss":
         exercises = EXERCISES_DATABASE["weight_loss"]["cardio"][:3] + EXERCISES_DATABASE["weight_loss"]["strength"][:2]
-    elif 'muscle' in goal or 'gain' in goal:
+    elif profile.goal == "muscle_gain":
         exercises = EXERCISES_DATABASE["muscle_gain"]["strength"][:5] + EXERCISES_DATABASE["muscle_gain"]["cardio"][:1]
-    elif 'endurance' in goal:
+    elif profile.goal == "endurance":
         exercises = EXERCISES_DATABASE["endurance"]["cardio"][:3] + EXERCISES_DATABASE["endurance"]["strength"][:2]
     else:
         exercises = EXERCISES_DATABASE["maintenance"]["balanced"]
@@ -262,5 +623,188 @@ def generate_python_diet_plan(user_data: dict, daily_calories: int, macros: dict
             "snacks": snacks["description"]
         },
         "exercises": exercises,
-        "grocery_list": grocery_list
+        "grocery_list": grocery_list,
+        "nutrition": {
+            "calories": sum(meal["calories"] for meal in meals),
+            "protein": round(sum(meal["macros"]["protein"] for meal in meals), 1),
+            "carbs": round(sum(meal["macros"]["carbs"] for meal in meals), 1),
+            "fats": round(sum(meal["macros"]["fats"] for meal in meals), 1)
+        }
     }
+
+
+def _budget_bucket(mode: str, time_budget_ms: Optional[float]) -> Optional[int]:
+    """Solver time budget rounded to a power of two ms for memo keys (None in random mode, which ignores it)"""
+    if mode != "solver":
+        return None
+    budget = PLANNER_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+    return 2 ** round(math.log2(max(budget, 1)))
+
+
+def _profile_seed(profile: PlanProfile) -> int:
+    """Stable seed for a profile, so a memoized plan is the same in every process and after eviction"""
+    return zlib.crc32(repr(tuple(profile)).encode())
+
+
+def _copy_plan(plan: dict) -> dict:
+    """Copy of a plan that callers can modify without touching the memoized one"""
+    return {key: value.copy() for key, value in plan.items()}
+
+
+class PlanMemo:
+    """
+    LRU memo of plans per bucketed profile (see plan_profile)
+    
+    Profiles that land in the same bucket share one plan, generated from
+    the bucket's calorie/macro values with a seed derived from the bucket,
+    so the plan is deterministic. Solver plans are also keyed by their time
+    budget, in power-of-two buckets: a plan solved in 5ms is not served to
+    a caller that allowed 200ms. Keeps hit, miss and eviction counts.
+    """
+    
+    def __init__(self, max_entries: int = PLANNER_MEMO_SIZE):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def lookup(self, profile: PlanProfile, time_budget_ms: Optional[float] = None) -> Optional[dict]:
+        key = (profile, _budget_bucket(profile.mode, time_budget_ms))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._plans.move_to_end(key)
+            return _copy_plan(plan)
+    
+    def store(self, profile: PlanProfile, plan: dict, time_budget_ms: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        key = (profile, _budget_bucket(profile.mode, time_budget_ms))
+        with self._lock:
+            self._plans[key] = _copy_plan(plan)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+    
+    @timed
+    def get_plan(self, user_data: dict, daily_calories: int, macros: dict, mode: Optional[str] = None,
+                 time_budget_ms: Optional[float] = None) -> dict:
+        """Memoized generate_python_diet_plan"""
+        profile = plan_profile(user_data, daily_calories, macros, mode, bucketed=True)
+        plan = self.lookup(profile, time_budget_ms)
+        if plan is None:
+            plan = _build_plan(profile, time_budget_ms, random.Random(_profile_seed(profile)))
+            self.store(profile, plan, time_budget_ms)
+        return plan
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._plans),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+plan_memo = PlanMemo()
+
+
+_plan_pool = None
+_plan_pool_lock = threading.Lock()
+
+
+def _seed_worker():
+    # Workers forked from the same forkserver share its random state; without this they would all produce the same plans
+    random.seed()
+
+
+def _get_plan_pool() -> ProcessPoolExecutor:
+    """The batch worker pool, started on first use"""
+    global _plan_pool
+    with _plan_pool_lock:
+        if _plan_pool is None:
+            # Never plain fork: the server is threaded, and a forked child can inherit a lock some other thread held
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _plan_pool = ProcessPoolExecutor(
+                max_workers=PLANNER_WORKERS, mp_context=multiprocessing.get_context(start_method),
+                initializer=_seed_worker,
+            )
+        return _plan_pool
+
+
+def _build_plan_job(job: Tuple[PlanProfile, Optional[float], Optional[int]]) -> dict:
+    profile, time_budget_ms, seed = job
+    return _build_plan(profile, time_budget_ms, random.Random(seed) if seed is not None else random)
+
+
+@timed
+def generate_python_diet_plan_batch(users: List[dict], daily_calories: List[int], macros: List[dict],
+                                    mode: Optional[str] = None, time_budget_ms: Optional[float] = None,
+                                    memo: Optional[PlanMemo] = None) -> List[dict]:
+    """
+    generate_python_diet_plan for many users, in a process pool
+    
+    With a memo, plans are looked up per bucketed profile and only the
+    distinct missing profiles are generated. Batches smaller than
+    PLANNER_POOL_MIN_BATCH are generated inline, where the pool's IPC would
+    cost more than it saves. Plans are returned in input order.
+    """
+    profiles = [
+        plan_profile(user_data, calories, user_macros, mode, bucketed=memo is not None)
+        for user_data, calories, user_macros in zip(users, daily_calories, macros)
+    ]
+    
+    plans = [None] * len(profiles)
+    if memo is None:
+        jobs = [(profile, time_budget_ms, None) for profile in profiles]
+    else:
+        missing = {}
+        for i, profile in enumerate(profiles):
+            if profile in missing:
+                # Generated once below; the repeats are then served from the memo
+                missing[profile].append(i)
+                continue
+            plans[i] = memo.lookup(profile, time_budget_ms)
+            if plans[i] is None:
+                missing[profile] = [i]
+        jobs = [(profile, time_budget_ms, _profile_seed(profile)) for profile in missing]
+    
+    if len(jobs) < PLANNER_POOL_MIN_BATCH or PLANNER_WORKERS == 1:
+        generated = [_build_plan_job(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (PLANNER_WORKERS * 4))
+        generated = list(_get_plan_pool().map(_build_plan_job, jobs, chunksize=chunksize))
+    
+    if memo is None:
+        return generated
+    for (profile, _, _), plan in zip(jobs, generated):
+        memo.store(profile, plan, time_budget_ms)
+        first, *repeats = missing[profile]
+        plans[first] = plan
+        for i in repeats:
+            plans[i] = memo.lookup(profile, time_budget_ms) or _copy_plan(plan)
+    return plans
+
+
+def shutdown_plan_pool():
+    """Stop the batch worker processes (called on app shutdown)"""
+    global _plan_pool
+    with _plan_pool_lock:
+        if _plan_pool is not None:
+            _plan_pool.shutdown()
+            _plan_pool = None
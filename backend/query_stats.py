@@ -0,0 +1,116 @@
+"""
+Per-request SQL instrumentation (opt-in)
+
+Enabled with SQL_INSTRUMENTATION=1 (or DEBUG=1). Cursor events on the
+engines count every statement against the request that issued it (tracked
+with a context variable, which also follows sync handlers into the
+threadpool) and:
+
+  - log statements slower than SLOW_QUERY_MS with their bound parameters
+  - at the end of a request, flag statements run SQL_REPEAT_THRESHOLD or
+    more times: the same SQL with different parameters is a likely N+1
+    loop, the same SQL with the same parameters is a plain duplicate
+  - with DEBUG=1, add X-DB-Query-Count and X-DB-Query-Time-Ms response headers
+
+Statements run by the write queue's own task (log writes under the
+high-concurrency profile) are not attributed to the request.
+"""
+
+import os
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+SQL_INSTRUMENTATION = DEBUG or os.getenv("SQL_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "3"))
+
+# Longest statement/parameter text printed in a log line
+MAX_LOGGED_CHARS = 500
+
+
+class QueryStats:
+    """Statements issued while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # statement -> {repr(parameters): executions}
+        self.statements = defaultdict(lambda: defaultdict(int))
+
+    def record(self, statement: str, parameters, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement][_shorten(repr(parameters))] += 1
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD):
+        """(statement, executions, distinct parameter sets) for statements run `threshold`+ times"""
+        return [
+            (statement, sum(by_params.values()), len(by_params))
+            for statement, by_params in self.statements.items()
+            if sum(by_params.values()) >= threshold
+        ]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _shorten(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= MAX_LOGGED_CHARS else text[:MAX_LOGGED_CHARS] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_stats_started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, parameters, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        print(f"🐢 Slow query ({elapsed * 1000:.1f} ms): {_shorten(statement)} | params: {_shorten(repr(parameters))}")
+
+
+def instrument_queries(engine):
+    """Attach the per-request counters and slow-query log to a (sync) engine"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware giving each request its own QueryStats and reporting on it"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if DEBUG and message["type"] == "http.response.start":
+                # The handler has run by now; statements from a streamed body come after the headers
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-query-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            for statement, executions, distinct in stats.repeated():
+                kind = "possible N+1" if distinct > 1 else "duplicate"
+                print(f"⚠️  {kind}: ran {executions}x ({distinct} distinct parameter sets) "
+                      f"in {scope['method']} {scope['path']}: {_shorten(statement)}")
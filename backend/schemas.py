@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, List
-from datetime import date
+from typing import Optional, Dict, List, Any
+from datetime import date as Date
 
 
 class UserInput(BaseModel):
@@ -40,18 +40,26 @@ class PlanResponse(BaseModel):
     created_at: str
 
 
+class PlanBatchRequest(BaseModel):
+    users: List[UserInput]
+
+
+class PlanBatchResponse(BaseModel):
+    plans: List[PlanResponse]
+
+
 # Progress Tracking Schemas
 class WeightLogCreate(BaseModel):
     weight: float
     notes: Optional[str] = None
-    date: Optional[date] = None
+    date: Optional[Date] = None
 
 
 class WeightLogResponse(BaseModel):
     id: int
     user_id: int
     weight: float
-    date: date
+    date: Date
     notes: Optional[str]
     
     class Config:
@@ -60,14 +68,14 @@ class WeightLogResponse(BaseModel):
 
 class HydrationLogCreate(BaseModel):
     glasses: int
-    date: Optional[date] = None
+    date: Optional[Date] = None
 
 
 class HydrationLogResponse(BaseModel):
     id: int
     user_id: int
     glasses: int
-    date: date
+    date: Date
     
     class Config:
         from_attributes = True
@@ -77,7 +85,7 @@ class CalorieLogCreate(BaseModel):
     calories: int
     meal_type: str
     description: str
-    date: Optional[date] = None
+    date: Optional[Date] = None
 
 
 class CalorieLogResponse(BaseModel):
@@ -86,7 +94,7 @@ class CalorieLogResponse(BaseModel):
     calories: int
     meal_type: str
     description: str
-    date: date
+    date: Date
     
     class Config:
         from_attributes = True
@@ -96,7 +104,7 @@ class ExerciseLogCreate(BaseModel):
     exercise_name: str
     duration_minutes: int
     calories_burned: Optional[int] = None
-    date: Optional[date] = None
+    date: Optional[Date] = None
 
 
 class ExerciseLogResponse(BaseModel):
@@ -105,7 +113,7 @@ class ExerciseLogResponse(BaseModel):
     exercise_name: str
     duration_minutes: int
     calories_burned: Optional[int]
-    date: date
+    date: Date
     
     class Config:
         from_attributes = True
@@ -119,3 +127,25 @@ class ProgressStats(BaseModel):
     total_exercise_minutes_today: int
     weight_history: List[WeightLogResponse]
     hydration_history: List[HydrationLogResponse]
+
+
+# Batch Log Ingestion Schemas
+class LogBatchRequest(BaseModel):
+    # Each entry is {"type": "weight" | "calorie" | "hydration" | "exercise", ...fields}
+    # with the fields of the matching *LogCreate schema. Entries are validated
+    # one by one so a bad entry is reported without rejecting the batch.
+    entries: List[Any]
+
+
+class LogBatchItemResult(BaseModel):
+    index: int
+    type: Optional[str]
+    status: str  # created, invalid
+    id: Optional[int] = None
+    errors: Optional[List[str]] = None
+
+
+class LogBatchResponse(BaseModel):
+    created: int
+    invalid: int
+    results: List[LogBatchItemResult]
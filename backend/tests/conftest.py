@@ -0,0 +1,46 @@
+"""
+Shared test setup
+
+database.py and cache.py read their paths at import time, so the app is
+pointed at a throwaway directory here, before any test module imports it.
+The API tests share one TestClient (and so one event loop for the async
+engine's pooled connections) and isolate themselves by creating users.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TEST_DIR = Path(tempfile.mkdtemp(prefix="diet-fitness-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR / 'test.db'}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["AI_CACHE_PATH"] = str(TEST_DIR / "ai_plan_cache.db")
+
+USER = {
+    "age": 30, "gender": "female", "height": 165, "weight": 60,
+    "activity_level": "moderately_active", "health_goal": "weight_loss",
+    "food_preferences": "balanced",
+}
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user_id(client) -> int:
+    """A new user (with one plan) for each test"""
+    response = client.post("/generate-plan", json=USER)
+    assert response.status_code == 200, response.text
+    return response.json()["user_id"]
@@ -0,0 +1,156 @@
+"""
+generate_diet_plan_async against a local stub model
+
+The stub stands in for the Gemini model (model_name + generate_content_async),
+so the deadline, retry, fallback, cache and concurrency paths run without
+network access or an API key.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ai_service
+from cache import DiskCache
+from python_planner import plan_memo
+
+USER = {
+    "age": 30, "gender": "female", "height": 165, "weight": 60,
+    "activity_level": "moderately_active", "health_goal": "weight_loss",
+    "food_preferences": "balanced", "allergies": "", "medical_conditions": "",
+}
+CALORIES = 1800
+MACROS = {"protein": "112g", "carbs": "169g", "fats": "60g"}
+PLAN = {"meal_plan": {"breakfast": "Oats"}, "exercises": ["Walk"], "grocery_list": ["Oats"]}
+
+
+class StubModel:
+    """Replies with each entry of `replies` in turn (the last one repeats); exceptions are raised"""
+
+    model_name = "stub-model"
+
+    def __init__(self, *replies, delay: float = 0.0):
+        self.replies = replies
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_content_async(self, prompt):
+        reply = self.replies[min(self.calls, len(self.replies) - 1)]
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(text=reply)
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_service, "plan_cache", DiskCache(path=str(tmp_path / "plans.db")))
+    monkeypatch.setattr(ai_service, "GEMINI_BACKOFF", 0.01)
+    monkeypatch.setattr(ai_service, "GEMINI_MAX_RETRIES", 2)
+    # The semaphore binds to the event loop that first uses it; every test runs its own loop
+    monkeypatch.setattr(ai_service, "_semaphore", None)
+
+
+def generate(model, user=USER, **kwargs):
+    return asyncio.run(ai_service.generate_diet_plan_async(user, CALORIES, MACROS, model=model, **kwargs))
+
+
+def local_plan(user=USER):
+    return plan_memo.get_plan(user, CALORIES, MACROS)
+
+
+def test_success_is_cached():
+    model = StubModel(json.dumps(PLAN))
+    assert generate(model) == PLAN
+    assert generate(model) == PLAN
+    assert model.calls == 1
+
+
+def test_quota_errors_are_retried_then_fall_back():
+    model = StubModel(Exception("429 Resource has been exhausted (quota)"))
+    assert generate(model) == local_plan()
+    assert model.calls == ai_service.GEMINI_MAX_RETRIES + 1
+
+
+def test_quota_error_then_success():
+    model = StubModel(Exception("429 rate limit"), json.dumps(PLAN))
+    assert generate(model) == PLAN
+    assert model.calls == 2
+
+
+def test_missed_deadline_returns_local_plan():
+    model = StubModel(json.dumps(PLAN), delay=5)
+    started = time.perf_counter()
+    assert generate(model, timeout=0.2) == local_plan()
+    assert 0.2 <= time.perf_counter() - started < 1.0
+
+
+def test_bad_json_falls_back():
+    model = StubModel("Sorry, I can't help with that")
+    assert generate(model) == local_plan()
+    # Fallback plans are never cached as model responses
+    assert generate(model) == local_plan()
+    assert model.calls == 2
+
+
+def test_bad_json_raises_without_fallback():
+    with pytest.raises(json.JSONDecodeError):
+        generate(StubModel("not json"), fallback=False)
+
+
+def test_other_errors_propagate():
+    model = StubModel(RuntimeError("permission denied"))
+    with pytest.raises(RuntimeError):
+        generate(model)
+    assert model.calls == 1
+
+
+def test_concurrency_is_capped(monkeypatch):
+    monkeypatch.setattr(ai_service, "GEMINI_CONCURRENCY", 2)
+    model = StubModel(json.dumps(PLAN), delay=0.05)
+
+    async def burst():
+        # Distinct weights so no call is served from the cache
+        return await asyncio.gather(*(
+            ai_service.generate_diet_plan_async({**USER, "weight": 60 + i}, CALORIES, MACROS, model=model)
+            for i in range(8)
+        ))
+
+    assert asyncio.run(burst()) == [PLAN] * 8
+    assert model.calls == 8
+    assert model.peak == 2
+
+
+@pytest.mark.parametrize("planner", [lambda *args: None, lambda *args: 1 // 0], ids=["none", "raises"])
+def test_broken_local_planner_uses_goal_fallback(monkeypatch, planner):
+    monkeypatch.setattr(plan_memo, "get_plan", planner)
+    plan = generate(StubModel("not json"))
+    assert plan == ai_service.get_goal_fallback(USER, CALORIES, MACROS)
+
+
+def test_failed_local_plan_is_reported_on_success(monkeypatch, capsys):
+    monkeypatch.setattr(plan_memo, "get_plan", lambda *args: 1 // 0)
+
+    async def run():
+        # The delay lets the local plan fail before the model answers
+        plan = await ai_service.generate_diet_plan_async(USER, CALORIES, MACROS, model=StubModel(json.dumps(PLAN), delay=0.1))
+        await asyncio.sleep(0)
+        return plan
+
+    assert asyncio.run(run()) == PLAN
+    assert "Local planner failed (integer division or modulo by zero)" in capsys.readouterr().out
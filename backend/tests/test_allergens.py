@@ -0,0 +1,47 @@
+"""
+allergen_mask: whole-word matching of free-text allergy lists
+"""
+
+import pytest
+
+from python_planner import ALLERGEN_BITS, allergen_mask, plan_profile
+
+
+def bits(*allergens) -> int:
+    mask = 0
+    for allergen in allergens:
+        mask |= ALLERGEN_BITS[allergen]
+    return mask
+
+
+@pytest.mark.parametrize("allergies, expected", [
+    (["nuts"], bits("nuts")),
+    (["Tree nuts"], bits("nuts")),
+    (["peanut butter"], bits("nuts")),
+    (["Almonds", "cashews"], bits("nuts")),
+    (["eggs"], bits("eggs")),
+    (["egg whites"], bits("eggs")),
+    (["milk (lactose intolerant)"], bits("dairy")),
+    (["soy/wheat"], bits("soy", "gluten")),
+    (["Fish", "Cheeses"], bits("fish", "dairy")),
+    # Words that merely contain an allergen keyword
+    (["coconut"], 0),
+    (["nutmeg"], 0),
+    (["eggplant"], 0),
+    (["buckwheat"], 0),
+    (["coconut", "nutmeg", "eggplant"], 0),
+    ([], 0),
+])
+def test_allergen_mask(allergies, expected):
+    assert allergen_mask(allergies) == expected
+
+
+@pytest.mark.parametrize("allergies, expected", [
+    ("coconut, nutmeg, eggplant", 0),
+    ("Tree nuts, eggs", bits("nuts", "eggs")),
+    (None, 0),
+])
+def test_plan_profile_parses_allergy_string(allergies, expected):
+    user = {"health_goal": "maintenance", "food_preferences": "balanced", "allergies": allergies}
+    macros = {"protein": "90g", "carbs": "225g", "fats": "55g"}
+    assert plan_profile(user, 1800, macros).allergens == expected
@@ -0,0 +1,87 @@
+"""
+Parallel POST /hydration-log increments must add up exactly
+
+hydration_upsert adds to the day's row in one statement, so N concurrent
+requests for the same user and date must leave a single row holding the
+sum of all of them (and the same total in daily_user_summary), both with
+pooled async sessions and through the high-concurrency write queue.
+
+database.py reads DATABASE_URL and SQLITE_PROFILE at import time, so each
+profile runs in a fresh interpreter: the test runs this file as a script.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REQUESTS = 50
+DAY = "2024-03-01"
+
+
+async def fire_increments(count: int) -> dict:
+    """Create a user, POST `count` increments at once, and read back the stored totals"""
+    import httpx
+    from sqlalchemy import select
+
+    from database import SessionLocal, User, HydrationLog, DailyUserSummary
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        with SessionLocal() as session:
+            user = User(age=30, gender="female", height=165, weight=60, activity_level="sedentary",
+                        health_goal="maintenance", food_preferences="balanced")
+            session.add(user)
+            session.commit()
+            user_id = user.id
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post(f"/hydration-log/{user_id}", json={"glasses": glasses, "date": DAY})
+                for glasses in range(1, count + 1)
+            ))
+
+    with SessionLocal() as session:
+        rows = session.scalars(select(HydrationLog.glasses).where(HydrationLog.user_id == user_id)).all()
+        summary = session.scalar(select(DailyUserSummary.hydration_glasses).where(
+            DailyUserSummary.user_id == user_id))
+    return {
+        "statuses": [response.status_code for response in responses],
+        "errors": [response.text for response in responses if response.status_code != 200],
+        "rows": rows,
+        "summary": summary,
+    }
+
+
+@pytest.mark.parametrize("profile", ["default", "high_concurrency"])
+def test_parallel_increments_sum_exactly(tmp_path, profile):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'test.db'}",
+        SQLITE_PROFILE=profile,
+        PYTHONPATH=str(BACKEND_DIR),
+    )
+    env.pop("ASYNC_DATABASE_URL", None)
+    # Run from the temp dir so file caches (AI_CACHE_PATH etc.) land there too
+    result = subprocess.run(
+        [sys.executable, __file__, str(REQUESTS)],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    expected = REQUESTS * (REQUESTS + 1) // 2
+    assert report["errors"] == []
+    assert report["statuses"] == [200] * REQUESTS
+    assert report["rows"] == [expected]
+    assert report["summary"] == expected
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(fire_increments(int(sys.argv[1])))))
@@ -0,0 +1,108 @@
+"""
+Log import: dedupe against stored rows, result counts, and CSV/NDJSON parity
+"""
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from log_import import import_logs
+
+YESTERDAY = str(date.today() - timedelta(days=1))
+TODAY = str(date.today())
+ROWS = [
+    {"type": "weight", "date": YESTERDAY, "weight": 61.2},
+    {"type": "weight", "date": TODAY, "weight": 61.0},
+    {"type": "calorie", "date": TODAY, "calories": 450, "meal_type": "breakfast", "description": "Oats"},
+    {"type": "calorie", "date": TODAY, "calories": 650, "meal_type": "lunch", "description": "Salad"},
+    {"type": "hydration", "date": TODAY, "glasses": 3},
+    {"type": "exercise", "date": TODAY, "exercise_name": "Run", "duration_minutes": 30, "calories_burned": 300},
+]
+LISTINGS = ["weight-log", "calorie-log", "hydration-log", "exercise-log"]
+
+
+def as_ndjson(rows) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def as_csv(rows) -> str:
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    out = io.StringIO()
+    writer = csv.DictWriter(out, columns)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def upload(client, user_id, body: str, fmt: str) -> dict:
+    response = client.post(f"/import/{user_id}", params={"format": fmt}, content=body.encode())
+    assert response.status_code == 200, response.text
+    return {key: response.json()[key] for key in ("rows", "created", "duplicates", "invalid", "errors")}
+
+
+def stored(client, user_id) -> dict:
+    """The user's logs without ids, per listing"""
+    return {
+        path: [{key: value for key, value in row.items() if key not in ("id", "user_id")}
+               for row in client.get(f"/{path}/{user_id}").json()]
+        for path in LISTINGS
+    }
+
+
+@pytest.mark.parametrize("fmt, encode", [("ndjson", as_ndjson), ("csv", as_csv)])
+def test_reimport_reports_everything_as_duplicates(client, user_id, fmt, encode):
+    first = upload(client, user_id, encode(ROWS), fmt)
+    assert first == {"rows": 6, "created": 6, "duplicates": 0, "invalid": 0, "errors": []}
+    before = stored(client, user_id)
+
+    again = upload(client, user_id, encode(ROWS), fmt)
+    assert again == {"rows": 6, "created": 0, "duplicates": 6, "invalid": 0, "errors": []}
+    assert stored(client, user_id) == before
+
+
+def test_csv_and_ndjson_import_the_same(client):
+    users = []
+    for _ in range(2):
+        response = client.post("/generate-plan", json={
+            "age": 40, "gender": "male", "height": 180, "weight": 80, "activity_level": "sedentary",
+            "health_goal": "maintenance", "food_preferences": "balanced",
+        })
+        users.append(response.json()["user_id"])
+    # An invalid row too, so the error reports are compared as well
+    rows = ROWS + [{"type": "weight", "date": TODAY, "weight": "heavy"}]
+
+    ndjson_report = upload(client, users[0], as_ndjson(rows), "ndjson")
+    csv_report = upload(client, users[1], as_csv(rows), "csv")
+
+    assert ndjson_report["invalid"] == 1
+    # CSV line numbers count the header
+    assert [error["line"] for error in csv_report["errors"]] == [error["line"] + 1 for error in ndjson_report["errors"]]
+    for report in (ndjson_report, csv_report):
+        for error in report["errors"]:
+            del error["line"]
+    assert csv_report == ndjson_report
+    assert stored(client, users[1]) == stored(client, users[0])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100])
+def test_same_day_hydration_rows_add_up(client, user_id, chunk_size):
+    rows = [
+        {"type": "hydration", "date": TODAY, "glasses": 3},
+        {"type": "hydration", "date": TODAY, "glasses": 2},
+        {"type": "hydration", "date": YESTERDAY, "glasses": 4},
+    ]
+
+    report = import_logs(io.StringIO(as_ndjson(rows)), user_id, chunk_size=chunk_size)
+    assert (report["created"], report["duplicates"]) == (3, 0)
+    glasses = {row["date"]: row["glasses"] for row in client.get(f"/hydration-log/{user_id}").json()}
+    assert glasses == {TODAY: 5, YESTERDAY: 4}
+    summary = client.get(f"/progress/{user_id}").json()
+    assert summary["total_hydration_today"] == 5
+
+    # Days already stored are duplicates, however many rows the file has for them
+    report = import_logs(io.StringIO(as_ndjson(rows)), user_id, chunk_size=chunk_size)
+    assert (report["created"], report["duplicates"]) == (0, 3)
+    assert {row["date"]: row["glasses"] for row in client.get(f"/hydration-log/{user_id}").json()} == glasses
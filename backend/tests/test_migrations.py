@@ -0,0 +1,144 @@
+"""
+init_db() on a database created before versioned migrations
+
+The schema below is what the original database.py (before migrations.py
+existed) created. Migration 1 merges duplicate hydration rows before
+adding the unique (user_id, date) index, 2 and 4 backfill from existing
+rows, and 5 adds a column, so all of them run against real baseline data.
+"""
+
+import json
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+import database
+from migrations import MIGRATIONS
+
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, age INTEGER, gender VARCHAR, height FLOAT, weight FLOAT,
+    activity_level VARCHAR, health_goal VARCHAR, food_preferences VARCHAR,
+    allergies VARCHAR, medical_conditions VARCHAR, created_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE plans (
+    id INTEGER NOT NULL, user_id INTEGER, bmr FLOAT, daily_calories INTEGER, meal_plan TEXT,
+    macros TEXT, exercises TEXT, grocery_list TEXT, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_plans_id ON plans (id);
+CREATE TABLE weight_logs (
+    id INTEGER NOT NULL, user_id INTEGER, weight FLOAT, date DATE, notes VARCHAR, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_weight_logs_id ON weight_logs (id);
+CREATE TABLE hydration_logs (
+    id INTEGER NOT NULL, user_id INTEGER, glasses INTEGER, date DATE, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_hydration_logs_id ON hydration_logs (id);
+CREATE TABLE calorie_logs (
+    id INTEGER NOT NULL, user_id INTEGER, calories INTEGER, meal_type VARCHAR, description VARCHAR,
+    date DATE, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_calorie_logs_id ON calorie_logs (id);
+CREATE TABLE exercise_logs (
+    id INTEGER NOT NULL, user_id INTEGER, exercise_name VARCHAR, duration_minutes INTEGER,
+    calories_burned INTEGER, date DATE, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_exercise_logs_id ON exercise_logs (id);
+"""
+
+# (id, user_id, glasses, date): the first three share a day, as do the last two
+HYDRATION = [
+    (1, 1, 3, "2024-03-01"), (2, 1, 2, "2024-03-01"), (3, 1, 4, "2024-03-01"),
+    (4, 1, 5, "2024-03-02"),
+    (5, 2, 1, "2024-03-01"), (6, 2, 1, "2024-03-01"),
+]
+MEAL_PLAN = {"breakfast": "Oats", "lunch": "Salad", "dinner": "Fish", "snacks": "Apple"}
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    path = tmp_path / "baseline.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executemany(
+            "INSERT INTO users (id, age, gender, height, weight, activity_level, health_goal, food_preferences) "
+            "VALUES (?, 30, 'female', 165, 60, 'sedentary', 'weight_loss', 'balanced')", [(1,), (2,)]
+        )
+        conn.executemany("INSERT INTO hydration_logs (id, user_id, glasses, date) VALUES (?, ?, ?, ?)", HYDRATION)
+        conn.executemany(
+            "INSERT INTO calorie_logs (user_id, calories, meal_type, description, date) VALUES (?, ?, 'lunch', 'x', ?)",
+            [(1, 500, "2024-03-01"), (1, 700, "2024-03-01"), (2, 300, "2024-03-02")]
+        )
+        conn.execute(
+            "INSERT INTO exercise_logs (user_id, exercise_name, duration_minutes, calories_burned, date) "
+            "VALUES (1, 'run', 30, 300, '2024-03-01')"
+        )
+        conn.execute(
+            "INSERT INTO plans (id, user_id, bmr, daily_calories, meal_plan, macros, exercises, grocery_list, created_at) "
+            "VALUES (1, 1, 1400, 1800, ?, ?, ?, ?, '2024-03-01 09:00:00')",
+            (json.dumps(MEAL_PLAN), json.dumps({"protein": "112g", "carbs": "169g", "fats": "60g"}),
+             json.dumps(["Walk 30 min"]), json.dumps(["Oats", "Apples"]))
+        )
+
+    engine = create_engine(f"sqlite:///{path}")
+    monkeypatch.setattr(database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def dump(engine) -> list:
+    """Every schema object and row in the database"""
+    raw = engine.raw_connection()
+    try:
+        return list(raw.driver_connection.iterdump())
+    finally:
+        raw.close()
+
+
+def test_init_db_migrates_baseline_database(baseline_db, capsys):
+    database.init_db()
+
+    with baseline_db.connect() as conn:
+        versions = [row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_version ORDER BY version")]
+        hydration = conn.exec_driver_sql(
+            "SELECT id, user_id, date, glasses FROM hydration_logs ORDER BY id"
+        ).all()
+        summaries = conn.exec_driver_sql(
+            "SELECT user_id, date, hydration_glasses, calories, exercise_minutes FROM daily_user_summary "
+            "ORDER BY user_id, date"
+        ).all()
+        macros = conn.exec_driver_sql("SELECT protein_g, carbs_g, fats_g FROM plans").one()
+        meal_count = conn.exec_driver_sql("SELECT COUNT(*) FROM plan_meals").scalar()
+
+    assert versions == [version for version, _, _ in MIGRATIONS]
+    # Duplicates merged into the oldest row of each day, with no glasses lost
+    assert [tuple(row) for row in hydration] == [
+        (1, 1, "2024-03-01", 9), (4, 1, "2024-03-02", 5), (5, 2, "2024-03-01", 2)
+    ]
+    assert [tuple(row) for row in summaries] == [
+        (1, "2024-03-01", 9, 1200, 30), (1, "2024-03-02", 5, 0, 0), (2, "2024-03-01", 2, 0, 0),
+        (2, "2024-03-02", 0, 300, 0),
+    ]
+    assert tuple(macros) == (112, 169, 60)
+    assert meal_count == len(MEAL_PLAN)
+    assert "version" in {column["name"] for column in inspect(baseline_db).get_columns("predictions_cache")}
+    assert "Applied migration 5" in capsys.readouterr().out
+
+
+def test_rerunning_init_db_changes_nothing(baseline_db, capsys):
+    database.init_db()
+    migrated = dump(baseline_db)
+    capsys.readouterr()
+
+    database.init_db()
+
+    assert dump(baseline_db) == migrated
+    assert "Applied migration" not in capsys.readouterr().out
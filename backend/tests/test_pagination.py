@@ -0,0 +1,118 @@
+"""
+Keyset pagination of the log listings and /history
+
+Pages must cover every row exactly once, in (key, id) order newest first,
+including rows that tie on the key, and malformed cursors must be a 400.
+"""
+
+import base64
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+BAD_CURSORS = [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"2024-01-01").decode(),  # no id
+    base64.urlsafe_b64encode(b"yesterday|7").decode(),  # bad key
+    base64.urlsafe_b64encode(b"2024-01-01|seven").decode(),  # bad id
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),  # not UTF-8
+]
+
+
+def add_weights(client, user_id, days_ago):
+    today = date.today()
+    entries = [
+        {"type": "weight", "weight": 60 + i / 10, "date": str(today - timedelta(days=days))}
+        for i, days in enumerate(days_ago)
+    ]
+    response = client.post(f"/logs/batch/{user_id}", json={"entries": entries})
+    assert response.json()["created"] == len(entries)
+
+
+def follow_log_pages(client, url, limit):
+    """Every row of a log listing, fetched `limit` at a time through X-Next-Cursor, and the responses"""
+    rows, responses, params = [], [], {"limit": limit}
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        rows += response.json()
+        responses.append(response)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows, responses
+        params = {"limit": limit, "cursor": cursor}
+
+
+@pytest.mark.parametrize("key", [date(2024, 3, 1), datetime(2024, 3, 1, 12, 30, 15, 250)])
+def test_cursor_round_trip(key):
+    assert decode_cursor(encode_cursor(key, 42), type(key)) == (key, 42)
+
+
+@pytest.mark.parametrize("cursor", BAD_CURSORS)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 100])
+def test_log_pages_cover_every_row_once_with_ties(client, user_id, limit):
+    # Several logs on the same days, so page boundaries fall inside ties on date
+    add_weights(client, user_id, [0, 0, 0, 1, 2, 2, 5, 5, 5, 5])
+
+    rows, responses = follow_log_pages(client, f"/weight-log/{user_id}", limit)
+
+    keys = [(row["date"], row["id"]) for row in rows]
+    assert len(keys) == 10
+    assert keys == sorted(set(keys), reverse=True)
+    # A full last page has no cursor, so there is never a trailing empty page
+    assert len(responses) == -(-10 // limit)
+
+
+def test_link_header_points_at_the_next_page(client, user_id):
+    add_weights(client, user_id, [0, 1, 2])
+
+    first = client.get(f"/weight-log/{user_id}", params={"limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    link = first.headers["Link"]
+    assert link.startswith("<") and link.endswith('>; rel="next"')
+    assert f"cursor={cursor}" in link and "limit=2" in link
+
+    # Following the Link URL gives the last page, which has no next link
+    last = client.get(link[1:link.index(">")])
+    assert [row["date"] for row in last.json()] == [str(date.today() - timedelta(days=2))]
+    assert "Link" not in last.headers and "X-Next-Cursor" not in last.headers
+
+
+@pytest.mark.parametrize("cursor", BAD_CURSORS)
+@pytest.mark.parametrize("path", ["weight-log", "hydration-log", "history"])
+def test_bad_cursor_is_a_400(client, user_id, path, cursor):
+    response = client.get(f"/{path}/{user_id}", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_history_pages_with_tied_created_at(client, user_id):
+    from database import SessionLocal
+    from plan_store import save_plans
+
+    # Five more plans sharing one created_at, next to the one /generate-plan made
+    created_at = datetime(2024, 3, 1, 9, 0)
+    plan = {"meal_plan": {"breakfast": "Oats"}, "exercises": ["Walk"], "grocery_list": ["Oats"]}
+    with SessionLocal() as session:
+        save_plans(session, [user_id] * 5, [1400.0] * 5, [1800] * 5,
+                   [{"protein": "110g", "carbs": "170g", "fats": "60g"}] * 5, [plan] * 5, created_at)
+        session.commit()
+
+    plans, params = [], {"limit": 2}
+    while True:
+        body = client.get(f"/history/{user_id}", params=params).json()
+        plans += body["plans"]
+        if not body["next_cursor"]:
+            break
+        params = {"limit": 2, "cursor": body["next_cursor"]}
+
+    keys = [(plan["created_at"], plan["id"]) for plan in plans]
+    assert len(keys) == 6
+    assert keys == sorted(set(keys), reverse=True)
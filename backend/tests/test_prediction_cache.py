@@ -0,0 +1,96 @@
+"""
+Cached predictions: ETag/304, invalidation on log writes, and the batch job's versions
+
+/predictions/comprehensive and /dashboard share the in-memory entries of
+cache.prediction_cache, backed by the predictions_cache rows written by
+batch_predictions.py.
+"""
+
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from batch_predictions import cache_versions, save_results
+from cache import prediction_cache
+from database import SessionLocal, PredictionCache, engine
+from log_store import invalidate_cached_predictions
+
+BATCH_REPORT = {"user_id": None, "source": "batch job"}
+
+
+def predictions(client, user_id, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/predictions/comprehensive/{user_id}", headers=headers)
+
+
+def log_weight(client, user_id, weight, days_ago=0):
+    day = str(date.today() - timedelta(days=days_ago))
+    response = client.post(f"/weight-log/{user_id}", json={"weight": weight, "date": day})
+    assert response.status_code == 200, response.text
+
+
+def test_matching_etag_gets_304(client, user_id):
+    first = predictions(client, user_id)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = predictions(client, user_id, etag)
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+    assert predictions(client, user_id, 'W/"something-else"').status_code == 200
+
+
+def test_log_write_changes_etag(client, user_id):
+    for days_ago, weight in enumerate([62.0, 61.6, 61.1]):
+        log_weight(client, user_id, weight, days_ago + 1)
+    etag = predictions(client, user_id).headers["ETag"]
+
+    log_weight(client, user_id, 59.0)
+
+    after = predictions(client, user_id, etag)
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+
+
+def test_rolled_back_write_keeps_cache_entry(client, user_id):
+    etag = predictions(client, user_id).headers["ETag"]
+    entry = prediction_cache.get(user_id)
+    generation = prediction_cache.generation(user_id)
+
+    with SessionLocal() as session:
+        invalidate_cached_predictions(session, user_id)
+        session.rollback()
+        # The tombstone went with the rollback too
+        assert session.get(PredictionCache, user_id) is None
+
+    assert prediction_cache.get(user_id) is entry
+    assert prediction_cache.generation(user_id) == generation
+    assert predictions(client, user_id, etag).status_code == 304
+
+    # The same invalidation, committed, does evict it
+    with SessionLocal() as session:
+        invalidate_cached_predictions(session, user_id)
+        session.commit()
+    assert prediction_cache.get(user_id) is None
+
+
+def test_batch_result_from_stale_version_is_ignored(client, user_id):
+    log_weight(client, user_id, 60.0, 1)
+    with engine.connect() as conn:
+        versions = cache_versions(conn, [SimpleNamespace(id=user_id)])
+
+    # Written after the batch job read the version (and the user's data)
+    log_weight(client, user_id, 59.5)
+    save_results([(user_id, json.dumps({**BATCH_REPORT, "user_id": user_id}))], versions)
+
+    with SessionLocal() as session:
+        assert session.get(PredictionCache, user_id).payload is None
+    assert predictions(client, user_id).json().get("source") != "batch job"
+
+    # With the current version the batch result is stored and served
+    with engine.connect() as conn:
+        versions = cache_versions(conn, [SimpleNamespace(id=user_id)])
+    save_results([(user_id, json.dumps({**BATCH_REPORT, "user_id": user_id}))], versions)
+    prediction_cache.invalidate(user_id)
+    assert predictions(client, user_id).json()["source"] == "batch job"
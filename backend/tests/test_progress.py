@@ -0,0 +1,63 @@
+"""
+/progress: today's summary and the weight/hydration histories in two queries
+"""
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from database import engine
+
+
+@contextmanager
+def count_statements():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def day(days_ago: int) -> str:
+    return str(date.today() - timedelta(days=days_ago))
+
+
+def test_progress_histories_and_totals(client, user_id):
+    # 35 weights (two on the oldest day) and 10 days of hydration
+    weights = [{"type": "weight", "weight": 70 - i / 10, "date": day(34 - i)} for i in range(35)]
+    weights.insert(0, {"type": "weight", "weight": 71.5, "date": day(34)})
+    hydration = [{"type": "hydration", "glasses": i + 1, "date": day(9 - i)} for i in range(10)]
+    today = [
+        {"type": "calorie", "calories": 500, "meal_type": "lunch", "description": "Salad", "date": day(0)},
+        {"type": "exercise", "exercise_name": "Run", "duration_minutes": 25, "date": day(0)},
+    ]
+    response = client.post(f"/logs/batch/{user_id}", json={"entries": weights + hydration + today})
+    assert response.json()["created"] == len(weights + hydration + today)
+
+    with count_statements() as statements:
+        stats = client.get(f"/progress/{user_id}").json()
+    assert len(statements) == 2
+
+    weight_log = client.get(f"/weight-log/{user_id}", params={"days": 60, "limit": 100}).json()
+    hydration_log = client.get(f"/hydration-log/{user_id}", params={"days": 60, "limit": 100}).json()
+    assert stats["weight_history"] == weight_log[:30]
+    assert stats["hydration_history"] == hydration_log[:7]
+    assert stats["current_weight"] == weight_log[0]["weight"]
+    # Against the first weight logged on the oldest day
+    assert stats["weight_change"] == weight_log[0]["weight"] - 71.5
+    assert (stats["total_hydration_today"], stats["total_calories_today"], stats["total_exercise_minutes_today"]) == (10, 500, 25)
+
+
+def test_progress_without_logs(client, user_id):
+    stats = client.get(f"/progress/{user_id}").json()
+    assert stats == {
+        "current_weight": None, "weight_change": None, "total_hydration_today": 0, "total_calories_today": 0,
+        "total_exercise_minutes_today": 0, "weight_history": [], "hydration_history": [],
+    }
+
+
+def test_progress_unknown_user(client):
+    assert client.get("/progress/999999").status_code == 404
@@ -0,0 +1,96 @@
+"""
+Single-writer queue for log ingestion
+
+SQLite allows one writer at a time. When many requests commit at once, the
+losers wait on the file lock and eventually fail with "database is locked".
+With SQLITE_PROFILE=high_concurrency every log write is queued and executed
+by one background task on a dedicated connection, so writes never contend
+with each other and (under WAL) readers never wait for them.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database import AsyncSessionLocal, WriterSessionLocal, SQLITE_HIGH_CONCURRENCY
+
+WriteWork = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """
+    Runs queued write jobs one at a time, each in its own transaction
+    
+    A job is an async callable taking a session. Its return value (or
+    exception) is handed back to the submitter; a failing job is rolled
+    back without affecting the jobs queued behind it.
+    """
+    
+    def __init__(self, session_factory: async_sessionmaker, maxsize: int = 10000):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        """Start the writer task on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Finish the queued jobs, then stop the writer task"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+    
+    async def submit(self, work: WriteWork) -> Any:
+        """Queue a job and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((work, future))
+        return await future
+    
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+            work, future = item
+            async with self.session_factory() as session:
+                try:
+                    result = await work(session)
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+
+
+write_queue = WriteQueue(WriterSessionLocal)
+
+
+async def run_write(work: WriteWork) -> Any:
+    """
+    Run a write job in its own transaction
+    
+    Goes through the single-writer queue when the high-concurrency SQLite
+    profile is enabled, otherwise uses a regular pooled async session.
+    """
+    if SQLITE_HIGH_CONCURRENCY and write_queue.running:
+        return await write_queue.submit(work)
+    
+    async with AsyncSessionLocal() as db:
+        result = await work(db)
+        await db.commit()
+        return result
@@ -29,4 +29,36 @@ export const getUserHistory = async (userId) => {
     }
 };
 
+// Largest pages the backend allows, so full listings take as few requests as possible
+const HISTORY_PAGE_LIMIT = 100;
+const LOG_PAGE_LIMIT = 500;
+
+// Every plan in a user's history, following next_cursor page by page
+export const getAllPlans = async (userId) => {
+    const plans = [];
+    let cursor = null;
+    do {
+        const response = await api.get(`/history/${userId}`, {
+            params: { limit: HISTORY_PAGE_LIMIT, ...(cursor && { cursor }) },
+        });
+        plans.push(...response.data.plans);
+        cursor = response.data.next_cursor;
+    } while (cursor);
+    return plans;
+};
+
+// Every log a listing endpoint returns for its date window, following the X-Next-Cursor header
+export const getAllLogs = async (path, params = {}) => {
+    const logs = [];
+    let cursor = null;
+    do {
+        const response = await api.get(path, {
+            params: { limit: LOG_PAGE_LIMIT, ...params, ...(cursor && { cursor }) },
+        });
+        logs.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return logs;
+};
+
 export default api;
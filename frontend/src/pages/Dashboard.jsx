@@ -52,100 +52,67 @@ const Dashboard = ({ userId = 1 }) => {
   const fetchDashboardData = async () => {
     setLoading(true);
     try {
-      // Fetch user profile
-      const profileResponse = await axios.get(`http://localhost:8000/user/${userId}`);
-      const profile = profileResponse.data;
+      // Fetch profile, logs and calorie prediction in a single request
+      const dashboardResponse = await axios.get(`http://localhost:8000/dashboard/${userId}`);
+      const dashboard = dashboardResponse.data;
+      const profile = dashboard.user;
       setUserProfile(profile);
 
-      // Fetch weight logs to get current weight and change
+      // Current weight and change from weight logs
       let currentWeight = profile.weight || 0;
       let weightChange = 0;
       
-      try {
-        const weightResponse = await axios.get(`http://localhost:8000/weight-log/${userId}`);
-        const weightLogs = weightResponse.data;
+      const weightLogs = dashboard.weight_logs || [];
+      if (weightLogs.length > 0) {
+        const sortedWeights = weightLogs.sort((a, b) => 
+          new Date(b.date) - new Date(a.date)
+        );
+        currentWeight = sortedWeights[0].weight;
         
-        if (weightLogs.length > 0) {
-          const sortedWeights = weightLogs.sort((a, b) => 
-            new Date(b.date) - new Date(a.date)
-          );
-          currentWeight = sortedWeights[0].weight;
-          
-          if (sortedWeights.length > 1) {
-            weightChange = sortedWeights[0].weight - sortedWeights[sortedWeights.length - 1].weight;
-          }
+        if (sortedWeights.length > 1) {
+          weightChange = sortedWeights[0].weight - sortedWeights[sortedWeights.length - 1].weight;
         }
-      } catch (err) {
-        console.warn('Could not fetch weight logs:', err);
       }
 
-      // Fetch today's calorie logs
-      let caloriesConsumed = 0;
-      let meals = [];
+      // Today's calorie logs
+      const today = new Date();
+      const calorieLogs = dashboard.calorie_logs || [];
+      const todayCalories = calorieLogs.filter(log => {
+        const logDate = new Date(log.date);
+        return logDate.toDateString() === today.toDateString();
+      });
       
-      try {
-        const calorieResponse = await axios.get(`http://localhost:8000/calorie-log/${userId}`);
-        const calorieLogs = calorieResponse.data;
-        const today = new Date();
-        const todayCalories = calorieLogs.filter(log => {
-          const logDate = new Date(log.date);
-          return logDate.toDateString() === today.toDateString();
-        });
-        
-        caloriesConsumed = todayCalories.reduce((sum, log) => sum + log.calories_consumed, 0);
-        
-        // Build today's meals from calorie logs
-        meals = todayCalories.map(log => ({
-          name: log.meal_type ? log.meal_type.charAt(0).toUpperCase() + log.meal_type.slice(1) : 'Meal',
-          calories: log.calories_consumed,
-          time: format(new Date(log.date), 'hh:mm a')
-        }));
-      } catch (err) {
-        console.warn('Could not fetch calorie logs:', err);
-      }
+      const caloriesConsumed = todayCalories.reduce((sum, log) => sum + log.calories_consumed, 0);
+      
+      // Build today's meals from calorie logs
+      const meals = todayCalories.map(log => ({
+        name: log.meal_type ? log.meal_type.charAt(0).toUpperCase() + log.meal_type.slice(1) : 'Meal',
+        calories: log.calories_consumed,
+        time: format(new Date(log.date), 'hh:mm a')
+      }));
 
-      // Fetch today's hydration logs
-      let hydrationCurrent = 0;
+      // Today's hydration logs
+      const hydrationLogs = dashboard.hydration_logs || [];
+      const todayHydration = hydrationLogs.filter(log => {
+        const logDate = new Date(log.date);
+        return logDate.toDateString() === today.toDateString();
+      });
       
-      try {
-        const hydrationResponse = await axios.get(`http://localhost:8000/hydration-log/${userId}`);
-        const hydrationLogs = hydrationResponse.data;
-        const today = new Date();
-        const todayHydration = hydrationLogs.filter(log => {
-          const logDate = new Date(log.date);
-          return logDate.toDateString() === today.toDateString();
-        });
-        
-        hydrationCurrent = todayHydration.reduce((sum, log) => sum + log.glasses, 0);
-      } catch (err) {
-        console.warn('Could not fetch hydration logs:', err);
-      }
+      const hydrationCurrent = todayHydration.reduce((sum, log) => sum + log.glasses, 0);
 
-      // Fetch today's exercise logs
-      let exerciseMinutes = 0;
+      // Today's exercise logs
+      const exerciseLogs = dashboard.exercise_logs || [];
+      const todayExercise = exerciseLogs.filter(log => {
+        const logDate = new Date(log.date);
+        return logDate.toDateString() === today.toDateString();
+      });
       
-      try {
-        const exerciseResponse = await axios.get(`http://localhost:8000/exercise-log/${userId}`);
-        const exerciseLogs = exerciseResponse.data;
-        const today = new Date();
-        const todayExercise = exerciseLogs.filter(log => {
-          const logDate = new Date(log.date);
-          return logDate.toDateString() === today.toDateString();
-        });
-        
-        exerciseMinutes = todayExercise.reduce((sum, log) => sum + log.duration, 0);
-      } catch (err) {
-        console.warn('Could not fetch exercise logs:', err);
-      }
+      const exerciseMinutes = todayExercise.reduce((sum, log) => sum + log.duration, 0);
 
-      // Get calorie predictions for daily goal (with fallback)
-      let dailyCalorieGoal = 2000; // Default fallback
+      // Calorie prediction for daily goal (with fallback)
+      let dailyCalorieGoal = dashboard.calorie_prediction?.prediction?.recommended_calories;
       
-      try {
-        const predictionResponse = await axios.get(`http://localhost:8000/predictions/calories/${userId}`);
-        dailyCalorieGoal = predictionResponse.data.prediction?.recommended_calories || 2000;
-      } catch (err) {
-        console.warn('Could not fetch calorie predictions, using default:', err);
+      if (!dailyCalorieGoal) {
         // Fallback: calculate basic TDEE from profile
         const bmr = profile.gender === 'male'
           ? 10 * profile.weight + 6.25 * profile.height - 5 * profile.age + 5
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { Plus, History, Calendar, Target } from 'lucide-react';
-import axios from 'axios';
+import { getAllPlans } from '../api/api';
 import UserForm from '../components/UserForm';
 import PlanResults from '../components/PlanResults';
 
@@ -21,14 +21,8 @@ const Plans = () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await axios.get(`http://localhost:8000/history/${userId}`);
-      
-      // Handle response
-      if (response.data) {
-        setPlanHistory(Array.isArray(response.data) ? response.data : []);
-      } else {
-        setPlanHistory([]);
-      }
+      // /history is paginated; load every page so older plans still show up
+      setPlanHistory(await getAllPlans(userId));
     } catch (err) {
       console.error('Error fetching plan history:', err);
       
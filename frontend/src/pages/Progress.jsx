@@ -14,6 +14,7 @@ import {
 import { TrendingUp, Droplet, Flame, Dumbbell, Calendar, Loader, RefreshCw } from 'lucide-react';
 import { format, subDays } from 'date-fns';
 import axios from 'axios';
+import { getAllLogs } from '../api/api';
 
 const Progress = ({ userId = 1 }) => {
   const [loading, setLoading] = useState(true);
@@ -36,8 +37,8 @@ const Progress = ({ userId = 1 }) => {
 
     try {
       // Fetch weight logs
-      const weightResponse = await axios.get(`http://localhost:8000/weight-log/${userId}`);
-      const weights = weightResponse.data
+      const weightLogs = await getAllLogs(`/weight-log/${userId}`);
+      const weights = weightLogs
         .sort((a, b) => new Date(a.date) - new Date(b.date))
         .slice(-7)
         .map(log => ({
@@ -52,11 +53,11 @@ const Progress = ({ userId = 1 }) => {
       const calorieGoal = predictionResponse.data.prediction?.recommended_calories || 2000;
 
       // Fetch calorie logs for last 7 days
-      const calorieResponse = await axios.get(`http://localhost:8000/calorie-log/${userId}`);
+      const calorieLogs = await getAllLogs(`/calorie-log/${userId}`);
       const last7Days = Array.from({ length: 7 }, (_, i) => {
         const date = subDays(new Date(), 6 - i);
         const dateStr = format(date, 'yyyy-MM-dd');
-        const dayLogs = calorieResponse.data.filter(log => 
+        const dayLogs = calorieLogs.filter(log => 
           format(new Date(log.date), 'yyyy-MM-dd') === dateStr
         );
         const consumed = dayLogs.reduce((sum, log) => sum + log.calories_consumed, 0);
@@ -70,11 +71,11 @@ const Progress = ({ userId = 1 }) => {
       setCalorieData(last7Days);
 
       // Fetch hydration logs for last 7 days
-      const hydrationResponse = await axios.get(`http://localhost:8000/hydration-log/${userId}`);
+      const hydrationLogs = await getAllLogs(`/hydration-log/${userId}`);
       const hydrationLast7Days = Array.from({ length: 7 }, (_, i) => {
         const date = subDays(new Date(), 6 - i);
         const dateStr = format(date, 'yyyy-MM-dd');
-        const dayLogs = hydrationResponse.data.filter(log => 
+        const dayLogs = hydrationLogs.filter(log => 
           format(new Date(log.date), 'yyyy-MM-dd') === dateStr
         );
         const glasses = dayLogs.reduce((sum, log) => sum + log.glasses, 0);
@@ -87,11 +88,11 @@ const Progress = ({ userId = 1 }) => {
       setHydrationData(hydrationLast7Days);
 
       // Fetch exercise logs for last 7 days
-      const exerciseResponse = await axios.get(`http://localhost:8000/exercise-log/${userId}`);
+      const exerciseLogs = await getAllLogs(`/exercise-log/${userId}`);
       const exerciseLast7Days = Array.from({ length: 7 }, (_, i) => {
         const date = subDays(new Date(), 6 - i);
         const dateStr = format(date, 'yyyy-MM-dd');
-        const dayLogs = exerciseResponse.data.filter(log => 
+        const dayLogs = exerciseLogs.filter(log => 
           format(new Date(log.date), 'yyyy-MM-dd') === dateStr
         );
         const minutes = dayLogs.reduce((sum, log) => sum + log.duration, 0);